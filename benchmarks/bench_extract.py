@@ -0,0 +1,101 @@
+# benchmarks/bench_extract.py
+# 对比搜索结果页提取：旧版 BeautifulSoup find_previous 遍历 vs 单次遍历提取器
+#
+# 用法（在项目根目录运行）:
+#   python benchmarks/bench_extract.py                 # 使用合成的结果页
+#   python benchmarks/bench_extract.py page1.html ...  # 使用保存下来的搜索结果页
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from modules import module1_capture
+
+def legacy_extract(html_text):
+    """优化前 new_search_and_extract 中的提取逻辑，仅用于对比"""
+    results = []
+    soup = BeautifulSoup(html_text, 'html.parser')
+    for img in soup.find_all('img', src='copy.png'):
+        tip_text = None
+        extracted_content = None
+        onclick_value = None
+        clickable_element = img.find_parent(attrs={'onclick': True})
+        if img.has_attr('onclick'):
+            onclick_value = img['onclick']
+        elif clickable_element:
+            onclick_value = clickable_element['onclick']
+        if onclick_value:
+            extracted_content = module1_capture.extract_onclick_content(onclick_value)
+        channel_div = img.find_previous('div', class_='channel')
+        if channel_div:
+            tip_div = channel_div.find('div', class_='tip')
+            if tip_div:
+                tip_text = tip_div.get_text(strip=True)
+        if tip_text and extracted_content:
+            results.append([tip_text, extracted_content])
+    return results
+
+def synthetic_page(results=500, seed=0):
+    """生成与 tonkiang 搜索结果结构相近的页面"""
+    rng = random.Random(seed)
+    parts = ['<html><head><title>IPTV</title></head><body><div class="tables">']
+    for i in range(results):
+        name = rng.choice(['CCTV1', 'CCTV-5+', '东方卫视', '上海新闻综合', '哈哈炫动'])
+        url = f"http://{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}:9901/tsfile/live/{i:04d}_1.m3u8"
+        parts.append(
+            f'<div class="result"><div class="channel"><a href="channellist.html?ip={i}">'
+            f'<div class="tip" data-title="{name}">{name} <b>高清</b></div></a></div>'
+            f'<div class="m3u8"><table><tr>'
+            f'<td style="padding-left: 6px;" onclick="glshow(\'{url}\')"><img src="copy.png" height="18px"></td>'
+            f'<td>{url}</td></tr></table></div>'
+            f'<div style="font-size:11px;">&nbsp;上线 {rng.randint(1, 99)} 天&nbsp;</div></div>'
+        )
+    parts.append('</div></body></html>')
+    return ''.join(parts)
+
+def stdlib_extract(html_text):
+    """强制使用标准库解析器的单次遍历提取"""
+    saved = module1_capture.etree
+    module1_capture.etree = None
+    try:
+        return module1_capture.extract_tip_links(html_text)
+    finally:
+        module1_capture.etree = saved
+
+def timed(func, html_text, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(html_text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(paths, repeat=5):
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [(f"synthetic-{n}", synthetic_page(n)) for n in (50, 500, 2000)]
+
+    candidates = [('single-pass stdlib', stdlib_extract)]
+    if module1_capture.etree is not None:
+        candidates.append(('single-pass lxml', module1_capture.extract_tip_links))
+
+    for label, html_text in pages:
+        base_time, base_result = timed(legacy_extract, html_text, repeat)
+        print(f"{label}: {len(html_text) / 1024:.0f} KB, {len(base_result)} 条结果")
+        print(f"  {'bs4 html.parser':<20} {base_time * 1000:9.2f} ms")
+        for name, func in candidates:
+            elapsed, result = timed(func, html_text, repeat)
+            status = 'OK' if result == base_result else 'MISMATCH'
+            print(f"  {name:<20} {elapsed * 1000:9.2f} ms  x{base_time / elapsed:6.1f}  {status}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,196 @@
+# benchmarks/bench_stages.py
+# 各阶段单独计时：解析(parse)、清理字段(normalize)、去重(dedup)、黑名单(clean)、拆分(split)、
+# 白名单优选(pick)、生成结果(render)。去重和拆分分别测默认模式用的 pandas 实现（*_pandas）
+# 和 --stream/--pipeline 用的逐条实现（*_stream）。输入由 gen_sources.py 按固定种子合成到临时文件，
+# 每个阶段的输入预先算好，只统计该阶段本身的耗时（不含读写文件）；内存为单独一次运行中 tracemalloc 记录的峰值。
+#
+# 用法（在项目根目录运行）:
+#   python benchmarks/bench_stages.py                        # 10k 和 100k 行
+#   python benchmarks/bench_stages.py --sizes 10k,1m,10m --repeat 1
+#   python benchmarks/bench_stages.py --stages dedup_pandas,dedup_stream,clean --json output/bench/stages.json
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from modules import module2_combine, module3_clean, module4_split, module5_pick, module6_result
+from modules.run_report import count_lines
+from gen_sources import generate, parse_size, CONFIG_DIR
+
+STAGES = ['parse', 'normalize', 'dedup_pandas', 'dedup_stream', 'clean', 'split_pandas', 'split_stream',
+          'pick', 'render']
+# 不输出解析进度
+NO_PROGRESS = 1 << 62
+
+def parse_sources(txt_path, m3u_path):
+    """与 process_url 相同：TXT 逐行解析，M3U 整体转换成 TXT 行后再解析"""
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        records = list(module2_combine.iter_parse_lines(f, NO_PROGRESS))
+    with open(m3u_path, 'r', encoding='utf-8') as f:
+        m3u_lines = module2_combine.convert_m3u_to_txt(f.read()).split('\n')
+    records.extend(module2_combine.iter_parse_lines(m3u_lines, NO_PROGRESS))
+    return records
+
+def records_frame(records):
+    """split_pandas 的输入：与模块4用 pd.read_csv 读入 allsourcecleaned.txt 得到的列相同"""
+    return pd.DataFrame([(name, url, None) for name, url, *_ in records], columns=['name', 'url', 'extra'])
+
+def split_records(records, channel_dict):
+    channels = {}
+    for channel, url in module4_split.iter_split(records, channel_dict, {}):
+        channels.setdefault(channel, []).append(url)
+    return channels
+
+def pick_channels(channels, channel_names, whitelist):
+    picked = {}
+    for channel in channel_names:
+        if channel in channels:
+            lines = [f"{channel},{url}\n" for url in channels[channel]]
+            picked[channel] = module5_pick.pick_lines(channel, lines, whitelist)
+    return picked
+
+def render(user_lines, picked):
+    return module6_result.build_final_lines(
+        user_lines, lambda channel: ''.join(picked[channel]) if channel in picked else None)
+
+def clear_caches():
+    """清空按名称/地址的缓存，每次计时都从冷缓存开始"""
+    module2_combine.normalize_channel_name.cache_clear()
+    module2_combine.canonical_url.cache_clear()
+
+def measure(func, repeat, memory):
+    """返回 (最快一次的秒数, tracemalloc 峰值字节数或 None, 结果)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        clear_caches()
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak, result
+
+def count(value):
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values())
+    return len(value)
+
+def bench_size(lines, stages, seed, repeat, memory):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = generate(lines, os.path.join(tmp_dir, "synthetic"), seed)
+        return bench_stages(paths, lines, stages, repeat, memory)
+
+def bench_stages(paths, lines, stages, repeat, memory):
+    blacklist = module3_clean.load_blacklist(os.path.join(CONFIG_DIR, "blacklist.txt"))
+    whitelist = module5_pick.load_whitelist(os.path.join(CONFIG_DIR, "whitelist.txt"))
+    channel_dict = module4_split.load_channel_dict(os.path.join(CONFIG_DIR, "othernames.txt")) or {}
+    user_demo = os.path.join(CONFIG_DIR, "user_demo.txt")
+    channel_names = module5_pick.load_channels_list(user_demo)
+    with open(user_demo, 'r', encoding='utf-8') as f:
+        user_lines = f.readlines()
+
+    # (阶段, 输入取自哪个阶段的输出, 输入的预处理（不计时）, 阶段函数)；
+    # 下游用逐条实现的输出，pandas 实现只计时、与逐条实现的输入相同。
+    # 未选中的阶段如果是下游的输入，也要执行一次（不计时）
+    steps = [
+        ('parse', None, None, lambda _: parse_sources(*paths)),
+        ('normalize', 'parse', None, lambda records: list(map(module2_combine.normalize_record, records))),
+        # 默认模式的 deduplicate 对原始解析结果做字段清理和去重（清理按不同的值计算一次）
+        ('dedup_pandas', 'parse', None, lambda records: module2_combine.deduplicate(records)),
+        ('dedup_stream', 'normalize', None, lambda records: list(module2_combine.iter_unique(records))),
+        ('clean', 'dedup_stream', None,
+         lambda records: [r for r in records if module3_clean.keep_line(f"{r[0]},{r[1]}", blacklist)]),
+        ('split_pandas', 'clean', records_frame, lambda df: module4_split.split_dataframe(df, channel_dict)),
+        ('split_stream', 'clean', None, lambda records: split_records(records, channel_dict)),
+        ('pick', 'split_stream', None, lambda channels: pick_channels(channels, channel_names, whitelist)),
+        ('render', 'pick', None, lambda picked: render(user_lines, picked)),
+    ]
+    needed = set(stages)
+    for name, source, _, _ in reversed(steps):
+        if name in needed and source:
+            needed.add(source)
+
+    rows = []
+    outputs = {}
+    for name, source, prepare, step in steps:
+        if name not in needed:
+            continue
+        current = outputs.get(source)
+        if prepare is not None:
+            current = prepare(current)
+        if name == 'parse':
+            records_in = count_lines(paths)
+        elif name == 'render':
+            records_in = len(user_lines)
+        else:
+            records_in = count(current)
+        if name in stages:
+            seconds, peak, data = measure(lambda: step(current), repeat, memory)
+            rows.append({
+                'stage': name,
+                'lines': lines,
+                'records_in': records_in,
+                'records_out': count(data),
+                'seconds': round(seconds, 4),
+                'records_per_s': round(records_in / seconds) if seconds > 0 else None,
+                'peak_mb': round(peak / 1024 / 1024, 1) if peak is not None else None,
+            })
+        else:
+            clear_caches()
+            data = step(current)
+        outputs[name] = data
+    return rows
+
+def print_rows(rows):
+    print(f"{'lines':>10} {'stage':<13} {'in':>10} {'out':>10} {'ms':>10} {'records/s':>12} {'peak MB':>8}")
+    for row in rows:
+        peak = '-' if row['peak_mb'] is None else f"{row['peak_mb']:.1f}"
+        print(f"{row['lines']:>10} {row['stage']:<13} {row['records_in']:>10} {row['records_out']:>10} "
+              f"{row['seconds'] * 1000:>10.1f} {row['records_per_s'] or 0:>12} {peak:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="各阶段基准测试")
+    parser.add_argument('--sizes', default='10k,100k', help="逗号分隔的行数，如 10k,1m,10m")
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"逗号分隔，可选: {','.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="每个阶段计时的次数，取最快的一次")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="不做 tracemalloc 内存测量（大数据量时可省时间）")
+    parser.add_argument('--json', help="另外把结果写到 JSON 文件")
+    args = parser.parse_args(argv)
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(sorted(unknown))}")
+    # 各模块的 INFO 日志（每个频道一行）会干扰计时和输出
+    logging.disable(logging.INFO)
+
+    rows = []
+    for size in args.sizes.split(','):
+        rows.extend(bench_size(parse_size(size), stages, args.seed, args.repeat, not args.no_memory))
+    print_rows(rows)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'repeat': args.repeat, 'python': sys.version.split()[0], 'results': rows},
+                      f, ensure_ascii=False, indent=1)
+
+if __name__ == '__main__':
+    main()
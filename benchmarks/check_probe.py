@@ -0,0 +1,151 @@
+# benchmarks/check_probe.py
+# 用本地替身 HTTP/HLS 服务器检查探测阶段：可用、拒绝连接、重定向、404、空响应、超时，
+# 以及深度探测的主播放列表、媒体播放列表、子播放列表 404、没有分片、分片 404 等情况。
+# 不需要外网；任何一项结果与预期不符时退出码为 1。
+#
+# 用法（在项目根目录运行）:
+#   python benchmarks/check_probe.py
+#   python benchmarks/check_probe.py -v        # 同时打印每个 URL 的完整结果
+
+import os
+import sys
+import json
+import socket
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+from modules import probe
+from modules.circuit_breaker import HostCircuitBreaker
+
+SEGMENT_BYTES = 256 * 1024
+# 普通探测的单个请求超时；/slow 的响应比它慢
+TIMEOUT = 1
+
+MASTER = "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\nlow/index.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=2000000\nhigh/index.m3u8\n"
+MEDIA = "#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXTINF:4,\nseg0.ts\n#EXTINF:4,\nseg1.ts\n#EXTINF:4,\nseg2.ts\n"
+
+async def live(request):
+    return web.Response(body=b'\x47' * 4096, content_type='video/mp2t')
+
+async def redirect(request):
+    raise web.HTTPFound('/live')
+
+async def not_found(request):
+    raise web.HTTPNotFound()
+
+async def empty(request):
+    return web.Response(body=b'', content_type='video/mp2t')
+
+async def slow(request):
+    await asyncio.sleep(TIMEOUT * 3)
+    return web.Response(body=b'\x47' * 4096, content_type='video/mp2t')
+
+def playlist(text):
+    async def handler(request):
+        return web.Response(text=text, content_type='application/vnd.apple.mpegurl')
+    return handler
+
+async def segment(request):
+    return web.Response(body=b'\x47' * SEGMENT_BYTES, content_type='video/mp2t')
+
+def build_app():
+    app = web.Application()
+    app.router.add_get('/live', live)
+    app.router.add_get('/redirect', redirect)
+    app.router.add_get('/notfound', not_found)
+    app.router.add_get('/empty', empty)
+    app.router.add_get('/slow', slow)
+    app.router.add_get('/hls/master.m3u8', playlist(MASTER))
+    app.router.add_get('/hls/{variant}/index.m3u8', playlist(MEDIA))
+    app.router.add_get('/hls/media.m3u8', playlist(MEDIA))
+    app.router.add_get('/hls/{variant}/{segment}.ts', segment)
+    app.router.add_get('/hls/{segment}.ts', segment)
+    app.router.add_get('/hls/bad-master.m3u8', playlist("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=100\nmissing.m3u8\n"))
+    app.router.add_get('/hls/noseg.m3u8', playlist("#EXTM3U\n#EXT-X-TARGETDURATION:4\n"))
+    app.router.add_get('/hls/badseg.m3u8', playlist("#EXTM3U\n#EXTINF:4,\n/gone.ts\n"))
+    return app
+
+def closed_port():
+    """一个当前没有进程监听的本地端口（连接会被拒绝）"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def cases(base, dead):
+    """(URL, 是否深度探测, 预期)；预期中 error 为错误信息的前缀，其余键要求与结果相等或存在"""
+    return [
+        (f"{base}/live", False, {'ok': True, 'status': 200, 'bytes': 2048}),
+        (f"{base}/redirect", False, {'ok': True, 'status': 200}),
+        (f"{base}/notfound", False, {'ok': False, 'status': 404, 'error': 'HTTP 404'}),
+        (f"{base}/empty", False, {'ok': False, 'status': 200, 'error': 'empty body'}),
+        (f"{base}/slow", False, {'ok': False, 'error': 'timeout'}),
+        (f"http://127.0.0.1:{dead}/live", False, {'ok': False, 'status': None, 'error': 'connect'}),
+        ("rtp://239.3.1.1:8000", False, {'ok': False, 'error': 'unsupported scheme'}),
+        (f"{base}/hls/master.m3u8", True, {'ok': True, 'playlist': 'master', 'variant_bandwidth': 2000000,
+                                           'segments': 2, 'segment_bytes': 2 * SEGMENT_BYTES,
+                                           'throughput_kbps': ..., 'bandwidth_ratio': ...}),
+        (f"{base}/hls/media.m3u8", True, {'ok': True, 'playlist': 'media', 'segments': 2, 'throughput_kbps': ...}),
+        (f"{base}/hls/bad-master.m3u8", True, {'ok': False, 'playlist': 'master', 'error': 'variant: HTTP 404'}),
+        (f"{base}/hls/noseg.m3u8", True, {'ok': False, 'error': 'no segments'}),
+        (f"{base}/hls/badseg.m3u8", True, {'ok': False, 'error': 'ClientResponseError'}),
+        (f"{base}/live", True, {'ok': True, 'status': 200, 'deep': True}),
+    ]
+
+def mismatches(result, expected):
+    """返回结果与预期不符的项"""
+    if result is None:
+        return ['URL 不在结果中']
+    problems = []
+    for key, value in expected.items():
+        if value is ...:
+            if result.get(key) is None:
+                problems.append(f"缺少 {key}")
+        elif key == 'error':
+            if not str(result.get('error') or '').startswith(value):
+                problems.append(f"error={result.get('error')!r}，预期以 {value!r} 开头")
+        elif result.get(key) != value:
+            problems.append(f"{key}={result.get(key)!r}，预期 {value!r}")
+    return problems
+
+async def run_checks(verbose=False):
+    runner = web.AppRunner(build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        all_cases = cases(f"http://127.0.0.1:{port}", closed_port())
+        results = {}
+        for deep in (False, True):
+            urls = [url for url, case_deep, _ in all_cases if case_deep == deep]
+            # 每次用新的熔断器，互不影响，也不影响全局熔断状态
+            results[deep] = await probe.probe_urls_async(urls, timeout=TIMEOUT, deadline=60, deep=deep,
+                                                         breaker=HostCircuitBreaker())
+    finally:
+        await runner.cleanup()
+
+    failed = 0
+    for url, deep, expected in all_cases:
+        result = results[deep].get(url)
+        problems = mismatches(result, expected)
+        failed += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<4} {'deep' if deep else 'head'} {url}"
+              + (f"  {'; '.join(problems)}" if problems else ''))
+        if verbose or problems:
+            print('     ' + json.dumps(result, ensure_ascii=False))
+    print(f"{len(all_cases) - failed}/{len(all_cases)} 项符合预期")
+    return failed == 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用本地替身服务器检查探测阶段")
+    parser.add_argument('-v', '--verbose', action='store_true', help="打印每个 URL 的完整结果")
+    args = parser.parse_args(argv)
+    logging.getLogger('modules.probe').setLevel(logging.WARNING)
+    return 0 if asyncio.run(run_checks(args.verbose)) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
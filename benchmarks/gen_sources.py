@@ -0,0 +1,182 @@
+# benchmarks/gen_sources.py
+# 合成订阅源：TXT 与 M3U 混合，频道名取自 othernames.txt 的别名（含繁体名和各种修饰），
+# URL 带 $ 后缀、# 连接的多地址，重复记录的写法各不相同（大小写、$ 后缀、名称修饰），部分主机取自黑白名单
+#
+# 用法（在项目根目录运行）:
+#   python benchmarks/gen_sources.py 100k                    # 写出 output/bench/synthetic_100k.txt 和 .m3u
+#   python benchmarks/gen_sources.py 1m --seed 1 --m3u-ratio 0.3 -o /tmp/sources
+
+import os
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_DIR = os.path.join(ROOT, "config")
+
+# 繁体频道名，经模块2繁转简后才能与别名匹配
+TRADITIONAL_NAMES = [
+    '東方衛視', '湖南衛視', '浙江衛視', '江蘇衛視', '廣東衛視', '鳳凰衛視中文台', '鳳凰衛視資訊台',
+    '翡翠台', '明珠台', '無綫新聞台', '廣東體育', '深圳衛視', '北京衛視', '東森新聞', '中視新聞',
+    '華視', '台視', '民視', '緯來體育', '國家地理頻道',
+]
+# 模块2会从频道名中去掉的修饰
+NAME_DECORATIONS = ['', '', '', '', '高清', '[HD]', '「IPV4」', '「IPV6」', ' ', '-HD', '(1080p)', '_电信', '超清']
+URL_PATHS = ['/tsfile/live/{n:04d}_1.m3u8', '/hls/{n}/index.m3u8', '/live/{n}.m3u8',
+             '/newlive/live/hls/{n}/live.m3u8', '/udp/239.1.1.{m}:5002', '/rtp/239.3.1.{m}:8000',
+             '/PLTV/88888888/224/3221225{n:03d}/index.m3u8']
+URL_QUERIES = ['', '', '', '?key=txiptv&playlive=1&authid=0', '?playlive=1&key=txiptv', '?token={n}']
+DOLLAR_SUFFIXES = ['$电信', '$移动', '$1920x1080', '$IPV6', '$LR•IPV4『线路1』']
+
+def parse_size(text):
+    """'10k'、'1m'、'2500' 之类的行数"""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000 * 1000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def read_rules(path):
+    """黑白名单中带路径的规则，用作合成 URL 的 主机[:端口]/路径 前缀"""
+    rules = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '/' in line and '://' not in line:
+                    rules.append(line)
+    return rules
+
+def read_aliases(path):
+    """othernames.txt 中的全部别名（含频道名本身）"""
+    aliases = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('[') and ']:' in line:
+                    channel, names = line[1:].split(']:', 1)
+                    aliases.append(channel)
+                    aliases.extend(name for name in names.split(',') if name)
+    return aliases
+
+class SourceGenerator:
+    """
+    按固定种子生成记录，同样的参数每次生成的内容相同。
+    dup_ratio 为重复记录的比例，其中一部分改写成大小写、$ 后缀或名称修饰不同的等价写法；
+    whitelist_ratio / blacklist_ratio 为取自白名单/黑名单前缀的地址比例；
+    multi_ratio 为用 # 连接多个地址的行的比例。
+    """
+
+    def __init__(self, seed=0, config_dir=CONFIG_DIR, dup_ratio=0.15, whitelist_ratio=0.1,
+                 blacklist_ratio=0.02, multi_ratio=0.03):
+        self.rng = random.Random(seed)
+        self.aliases = read_aliases(os.path.join(config_dir, "othernames.txt")) or ['CCTV1']
+        self.whitelist = read_rules(os.path.join(config_dir, "whitelist.txt"))
+        self.blacklist = read_rules(os.path.join(config_dir, "blacklist.txt"))
+        self.dup_ratio = dup_ratio
+        self.whitelist_ratio = whitelist_ratio
+        self.blacklist_ratio = blacklist_ratio
+        self.multi_ratio = multi_ratio
+        self.recent = []  # 最近生成的 (频道名, 地址)，重复记录从中抽取
+
+    def name(self):
+        rng = self.rng
+        base = rng.choice(TRADITIONAL_NAMES) if rng.random() < 0.1 else rng.choice(self.aliases)
+        return base + rng.choice(NAME_DECORATIONS)
+
+    def fresh_url(self):
+        rng = self.rng
+        n, m = rng.randrange(1, 1000), rng.randrange(1, 255)
+        roll = rng.random()
+        if roll < self.whitelist_ratio and self.whitelist:
+            return f"http://{rng.choice(self.whitelist)}/{n}.m3u8"
+        if roll < self.whitelist_ratio + self.blacklist_ratio and self.blacklist:
+            return f"http://{rng.choice(self.blacklist)}/{n}.m3u8"
+        host = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        port = rng.choice(['', ':80', ':8080', ':9901', ':8154', ':6080', ':4022'])
+        scheme = 'https' if rng.random() < 0.1 else 'http'
+        path = rng.choice(URL_PATHS).format(n=n, m=m)
+        return f"{scheme}://{host}{port}{path}{rng.choice(URL_QUERIES).format(n=n)}"
+
+    def url(self):
+        url = self.fresh_url()
+        if self.rng.random() < 0.05:
+            url += self.rng.choice(DOLLAR_SUFFIXES)
+        return url
+
+    def record(self):
+        """(频道名, 地址)；重复记录经清理后与原记录相同，但写法可能不同（修饰、大小写、$ 后缀）"""
+        rng = self.rng
+        if self.recent and rng.random() < self.dup_ratio:
+            name, url = rng.choice(self.recent)
+            variant = rng.random()
+            if variant < 0.2:
+                url = url.replace('http://', 'HTTP://', 1)
+            elif variant < 0.4:
+                url += rng.choice(DOLLAR_SUFFIXES)
+            elif variant < 0.6:
+                name += rng.choice(NAME_DECORATIONS)
+            return name, url
+        name, url = self.name(), self.url()
+        if len(self.recent) < 4096:
+            self.recent.append((name, url))
+        else:
+            self.recent[rng.randrange(4096)] = (name, url)
+        return name, url
+
+    def iter_txt_lines(self, count):
+        """逐行产出 TXT 订阅源内容（含分组行和注释行）"""
+        rng = self.rng
+        for i in range(count):
+            if i % 500 == 0:
+                yield f"{rng.choice(['央视频道', '卫视频道', '地方频道', '港澳台'])},#genre#"
+                continue
+            if rng.random() < 0.005:
+                yield f"#{self.name()},{self.url()}"
+                continue
+            if rng.random() < self.multi_ratio:
+                yield f"{self.name()},{'#'.join(self.url() for _ in range(rng.randint(2, 4)))}"
+            else:
+                name, url = self.record()
+                yield f"{name},{url}"
+
+    def iter_m3u_lines(self, count):
+        """逐行产出 M3U 订阅源内容，每个频道占 #EXTINF 和 URL 两行"""
+        yield '#EXTM3U x-tvg-url="http://epg.example.com/e.xml"'
+        for i in range(count // 2):
+            name, url = self.record()
+            yield f'#EXTINF:-1 tvg-id="{i}" tvg-name="{name}" group-title="合成",{name}'
+            yield url
+
+def generate(lines, base, seed=0, m3u_ratio=0.2, **options):
+    """
+    生成 lines 行，逐行写出 base.txt 和 base.m3u（M3U 约占 m3u_ratio），
+    千万行时也不需要把全部内容放在内存中；返回 (TXT 路径, M3U 路径)
+    """
+    generator = SourceGenerator(seed, **options)
+    m3u_lines = int(lines * m3u_ratio)
+    paths = (base + '.txt', base + '.m3u')
+    # 两个文件共用一个随机数发生器，先写完 TXT 再写 M3U，同样的参数生成的内容相同
+    for path, content in zip(paths, (generator.iter_txt_lines(lines - m3u_lines),
+                                     generator.iter_m3u_lines(m3u_lines))):
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in content:
+                f.write(line + '\n')
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成合成订阅源")
+    parser.add_argument('size', help="行数，如 10k、1m、10m")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--m3u-ratio', type=float, default=0.2)
+    parser.add_argument('-o', '--output-dir', default=os.path.join(ROOT, "output", "bench"))
+    args = parser.parse_args(argv)
+
+    lines = parse_size(args.size)
+    m3u_lines = int(lines * args.m3u_ratio)
+    os.makedirs(args.output_dir, exist_ok=True)
+    txt_path, m3u_path = generate(lines, os.path.join(args.output_dir, f"synthetic_{args.size.lower()}"),
+                                  args.seed, args.m3u_ratio)
+    print(f"已写出 {txt_path}（{lines - m3u_lines} 行）和 {m3u_path}（{m3u_lines} 行）")
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,190 @@
-# 导入所有模块
-from modules import module1_capture, module2_combine, module3_clean, module4_split, module5_pick,module6_result # 注意导入顺序
-import os
-
-if __name__ == '__main__':
-    print("开始执行模块1：捕获信号源")
-    input_file = os.path.join("config", "channels.txt")
-    output_file = os.path.join("output", "ownsource.txt")
-    module1_capture.main(input_file, output_file)
-
-    print("开始执行模块2：组合信号源")
-    flag=module2_combine.combine_sources()
-
-    print("开始执行模块3：清理信号源") # <<< 新增 >>>
-    module3_clean.main() # <<< 新增 >>>
-
-    print("开始执行模块4：拆分信号源")
-    # 注意：模块3现在应该读取清理后的文件
-    module4_split.split_channels()
-
-    print("开始执行模块5：优选频道信号源") # <<< 新增 >>>
-    module5_pick.main() # <<< 新增 >>>
-
-    print("开始执行模块6：替换用户频道列表") # <<< 新增 >>>
-    module6_result.main() # <<< 新增 >>>
-
-    print("✅ 所有模块执行完成")
-
-
-
-
+# 导入所有模块
+from modules import module1_capture, module2_combine, module3_clean, module4_split, module5_pick,module6_result # 注意导入顺序
+import os
+import glob
+import argparse
+from modules import circuit_breaker
+from modules.run_manifest import RunManifest, files_digest, dir_digest, value_digest
+from modules.run_report import RunReport, count_lines
+from modules.probe_cache import load_probe_results
+from modules.binfmt import binary_path
+from modules.source_catalog import SourceCatalog, load_channel_lookup
+
+STAGES = ['module1', 'fetch', 'catalog', 'module2', 'module3', 'module4', 'probe', 'module5', 'module6', 'pipeline']
+
+def is_channel_file(name):
+    return name.endswith('.txt') and not name.endswith('_picked.txt')
+
+def is_picked_file(name):
+    return name.endswith('_picked.txt')
+
+def channel_files(channels_dir, picked=False):
+    return [path for path in glob.glob(os.path.join(channels_dir, '*.txt'))
+            if (is_picked_file if picked else is_channel_file)(os.path.basename(path))]
+
+def run_stage(manifest, report, name, inputs, outputs, func, records_in=None, records_out=None):
+    """输入有变化时在运行报告中计时执行 func，否则在报告中记为跳过；返回是否执行了 func"""
+    manifest.run(name, inputs, outputs, lambda: report.measure(name, func, records_in, records_out))
+    if name in report:
+        return True
+    report.skip(name)
+    return False
+
+def run_modules(args, report):
+    """模块2~6依次执行，通过 output 下的文件传递数据；输入与上次相同的模块按运行清单跳过"""
+    # 运行清单：某个阶段的输入（配置文件、上游输出、下载到的订阅内容）与上次相同时跳过该阶段
+    manifest = RunManifest(force=args.force)
+    allsource = os.path.join("output", "allsource.txt")
+    cleaned = os.path.join("output", "allsourcecleaned.txt")
+    channels_dir = os.path.join("output", "channels")
+    user_demo = os.path.join("config", "user_demo.txt")
+    probe_file = os.path.join("output", "probe_results.json")
+
+    print("开始执行模块2：组合信号源")
+    # 订阅源每次都要下载（有 HTTP 缓存），各订阅源内容的 sha1 和解析版本作为模块2的输入之一，
+    # 不需要把全部记录序列化一遍来计算摘要；下载失败或超时的订阅源记为 None
+    fingerprints = {}
+    feeds = report.measure('fetch', lambda: module2_combine.fetch_subscription_feeds(fingerprints=fingerprints))
+    feed_records = sum(map(len, feeds))
+    inputs = files_digest([os.path.join("config", "subscribe.txt"), *module2_combine.LOCAL_SOURCE_PATHS])
+    inputs['feeds'] = value_digest([fingerprints.get(url) for url in module2_combine.subscription_urls()])
+    inputs['binary'] = args.binary
+    inputs['stream'] = args.stream
+    inputs['catalog'] = args.catalog
+
+    def binary_outputs(path):
+        # 二进制模式下 .bin 文件也是输出，缺失或被改动时需要重新执行
+        return [binary_path(path)] if args.binary else []
+
+    combine = lambda: not module2_combine.combine_sources(stream=args.stream, feeds=feeds, binary=args.binary)
+    catalog = None
+    try:
+        if args.catalog:
+            # 源目录每次运行都要更新（记录最近出现时间），模块2的输出改为从源目录查询导出
+            catalog = SourceCatalog()
+            feed_urls = module2_combine.subscription_urls()
+            report.measure('catalog', lambda: catalog.update(
+                module2_combine.iter_origin_records(feeds, feed_urls), load_channel_lookup()))
+            combine = lambda: catalog.export_outputs(binary=args.binary)
+
+        run_stage(manifest, report, 'module2', inputs,
+                  lambda: files_digest([allsource, os.path.join("output", "netsource.txt"), *binary_outputs(allsource)]),
+                  combine,
+                  lambda: feed_records + count_lines(module2_combine.LOCAL_SOURCE_PATHS),
+                  lambda: count_lines([allsource]))
+        del feeds
+
+        print("开始执行模块3：清理信号源") # <<< 新增 >>>
+        inputs = files_digest([allsource, os.path.join("config", "blacklist.txt"), *binary_outputs(allsource)])
+        run_stage(manifest, report, 'module3', inputs,
+                  lambda: files_digest([cleaned, *binary_outputs(cleaned)]), lambda: module3_clean.main(binary=args.binary),
+                  lambda: count_lines([allsource]), lambda: count_lines([cleaned])) # <<< 新增 >>>
+
+        print("开始执行模块4：拆分信号源")
+        # 注意：模块3现在应该读取清理后的文件
+        inputs = files_digest([cleaned, os.path.join("config", "othernames.txt"), *binary_outputs(cleaned)])
+        inputs['stream'] = args.stream
+        run_stage(manifest, report, 'module4', inputs,
+                  lambda: {'channels': dir_digest(channels_dir, is_channel_file)},
+                  lambda: module4_split.split_channels(stream=args.stream, binary=args.binary),
+                  lambda: count_lines([cleaned]), lambda: count_lines(channel_files(channels_dir)))
+
+        # 模块5只用到 user_demo.txt 中的频道名，只改动模板的分组、顺序时不需要重新优选
+        channel_names = module5_pick.load_channels_list(user_demo)
+
+        if args.probe or args.deep_probe:
+            from modules import probe  # 需要 aiohttp，只在探测时导入
+            print("开始执行探测阶段：检测频道源可用性")
+            # 探测结果随时间变化，每次都执行（探测缓存决定哪些 URL 需要重新探测）
+            report.measure('probe', lambda: probe.main(deep=args.deep_probe),
+                           records_out=lambda: len(load_probe_results(probe_file)))
+            if catalog:
+                catalog.record_probe(load_probe_results(probe_file))
+
+        print("开始执行模块5：优选频道信号源") # <<< 新增 >>>
+        inputs = files_digest([os.path.join("config", "whitelist.txt")])
+        inputs['channels'] = dir_digest(channels_dir, is_channel_file)
+        inputs['channel_names'] = value_digest(channel_names)
+        inputs['params'] = value_digest({'score': args.score, 'top_k': args.top_k if args.score else None})
+        if args.score:
+            inputs.update(files_digest([probe_file]))
+        run_stage(manifest, report, 'module5', inputs, lambda: {'picked': dir_digest(channels_dir, is_picked_file)},
+                  lambda: module5_pick.main(score=args.score, top_k=args.top_k),
+                  lambda: count_lines(channel_files(channels_dir)),
+                  lambda: count_lines(channel_files(channels_dir, picked=True))) # <<< 新增 >>>
+
+        print("开始执行模块6：替换用户频道列表") # <<< 新增 >>>
+        inputs = files_digest([user_demo])
+        inputs['picked'] = dir_digest(channels_dir, is_picked_file)
+        result_file = os.path.join("output", "new_result.txt")
+        # 输出摘要不含更新时间行：跳过时只刷新更新时间，下次运行仍可跳过
+        if not run_stage(manifest, report, 'module6', inputs,
+                         lambda: {result_file: module6_result.result_digest(result_file)}, module6_result.main,
+                         lambda: count_lines([user_demo]), lambda: count_lines([result_file])): # <<< 新增 >>>
+            module6_result.refresh_update_time(result_file)
+    finally:
+        if catalog:
+            catalog.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="电视源抓取及清理")
+    parser.add_argument('--stream', action='store_true',
+                        help="流式模式：本地源和模块3/4逐条处理记录，不构建 DataFrame（订阅源仍整体下载解析）")
+    parser.add_argument('--probe', action='store_true',
+                        help="在拆分和优选之间并发探测各频道源，结果写入 output/probe_results.json")
+    parser.add_argument('--deep-probe', action='store_true',
+                        help="深度探测（包含 --probe）：解析 HLS 播放列表并下载前两个分片，记录实际下载速率")
+    parser.add_argument('--score', action='store_true',
+                        help="模块5按白名单和探测结果打分，每个频道只保留得分最高的若干个源")
+    parser.add_argument('--top-k', type=int, default=module5_pick.PICK_TOP_K,
+                        help="打分模式下每个频道保留的源数量")
+    parser.add_argument('--binary', action='store_true',
+                        help="模块2~4之间另用二进制中间文件 allsource.bin / allsourcecleaned.bin（mmap 读取，不再解析 CSV）")
+    parser.add_argument('--catalog', action='store_true',
+                        help="把源增量写入 output/cache/sources.sqlite3（首次/最近出现时间、来源、探测统计），"
+                             "allsource.txt / netsource.txt 由查询导出")
+    parser.add_argument('--force', action='store_true',
+                        help="忽略运行清单，模块2~6全部重新执行")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="进程内流水线：模块2~6在内存中传递记录，只写出 output/new_result.txt")
+    parser.add_argument('--debug-output', action='store_true',
+                        help="流水线模式下仍写出 allsource.txt、channels/ 等中间文件")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="运行报告中用 tracemalloc 记录每个阶段的 Python 内存峰值（会明显变慢）")
+    parser.add_argument('--profile', choices=STAGES, metavar='STAGE',
+                        help=f"在 cProfile 下运行指定阶段，结果写到 output/profile/STAGE.prof，可选: {', '.join(STAGES)}")
+    args = parser.parse_args()
+    if args.pipeline:
+        # 流水线模式不经过中间文件，也不使用运行清单
+        incompatible = [flag for flag, value in (('--stream', args.stream), ('--binary', args.binary),
+                                                  ('--catalog', args.catalog), ('--force', args.force)) if value]
+        if incompatible:
+            parser.error(f"--pipeline 不能与 {', '.join(incompatible)} 同时使用（流水线每次都完整执行，不读写中间文件）")
+    elif args.debug_output:
+        parser.error("--debug-output 只能与 --pipeline 同时使用")
+
+    # 运行报告：每个阶段的耗时、CPU 时间、内存峰值和记录数，写到 output/run_report.json
+    report = RunReport(trace_memory=args.trace_memory, profile_stage=args.profile)
+
+    print("开始执行模块1：捕获信号源")
+    input_file = os.path.join("config", "channels.txt")
+    output_file = os.path.join("output", "ownsource.txt")
+    report.measure('module1', lambda: module1_capture.main(input_file, output_file),
+                   lambda: count_lines([input_file]), lambda: count_lines([output_file]))
+
+    if args.pipeline:
+        from modules import pipeline
+        print("开始执行流水线：模块2~6")
+        result_file = os.path.join("output", "new_result.txt")
+        report.measure('pipeline', lambda: pipeline.run_pipeline(
+                           debug_output=args.debug_output, probe=args.probe, deep=args.deep_probe,
+                           score=args.score, top_k=args.top_k),
+                       records_out=lambda: count_lines([result_file]))
+    else:
+        run_modules(args, report)
+
+    # 订阅下载和探测阶段中被熔断的主机
+    circuit_breaker.get_breaker().save_report()
+    report.save()
+
+    print("✅ 所有模块执行完成")
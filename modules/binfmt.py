@@ -0,0 +1,210 @@
+# modules/binfmt.py
+# allsource / allsourcecleaned 的二进制中间格式：频道名放在字符串表中（每个名称只存一次），
+# 每行只存名称编号和 URL 的偏移；读取时用 mmap 映射整个文件，按需解码，不需要逐行解析 CSV
+#
+# 文件布局（小端，各段按 8 字节对齐）：
+#   头部    magic(8) 行数(u64) 名称数(u64) 名称偏移段/名称数据段/名称编号段/URL偏移段/URL数据段 的起始位置(5 x u64)
+#   名称偏移  u64 x (名称数 + 1)，名称数据为 UTF-8 拼接
+#   名称编号  u32 x 行数
+#   URL偏移  u64 x (行数 + 1)，URL数据为 UTF-8 拼接
+
+import os
+import sys
+import mmap
+import struct
+import logging
+from array import array
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAGIC = b'IPTVREC\x01'
+HEADER = struct.Struct('<8s7Q')
+ALIGN = 8
+
+def binary_path(text_path):
+    """allsource.txt -> allsource.bin"""
+    return os.path.splitext(text_path)[0] + '.bin'
+
+def is_binary_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+class RecordWriter:
+    """
+    逐条 add(name, url)，close() 时一次写出（先写临时文件再替换）。
+    可作为上下文管理器使用，出错时不写出。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name_ids = {}
+        self.names = []
+        self.ids = array('I')
+        self.url_offsets = array('Q', [0])
+        self.url_data = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, name, url):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        self.ids.append(name_id)
+        self.url_data += url.encode('utf-8')
+        self.url_offsets.append(len(self.url_data))
+
+    def mark(self):
+        """当前位置，可用 truncate() 撤销之后 add 的记录"""
+        return len(self.ids), len(self.names)
+
+    def truncate(self, mark):
+        """撤销 mark() 之后 add 的记录（之后才出现的名称只会被这些记录引用，一并去掉）"""
+        count, name_count = mark
+        for name in self.names[name_count:]:
+            del self.name_ids[name]
+        del self.names[name_count:]
+        del self.ids[count:]
+        del self.url_offsets[count + 1:]
+        del self.url_data[self.url_offsets[-1]:]
+
+    def close(self):
+        name_offsets = array('Q', [0])
+        name_data = bytearray()
+        for name in self.names:
+            name_data += name.encode('utf-8')
+            name_offsets.append(len(name_data))
+
+        sections = [_little_endian(name_offsets).tobytes(), bytes(name_data),
+                    _little_endian(self.ids).tobytes(),
+                    _little_endian(self.url_offsets).tobytes(), bytes(self.url_data)]
+        starts = []
+        position = HEADER.size
+        for section in sections:
+            position += -position % ALIGN
+            starts.append(position)
+            position += len(section)
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.ids), len(self.names), *starts))
+            for start, section in zip(starts, sections):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(section)
+        os.replace(tmp_path, self.path)
+
+def write_records(path, records):
+    """把 (name, url, ...) 记录写成二进制文件，返回行数"""
+    with RecordWriter(path) as writer:
+        for record in records:
+            writer.add(record[0], record[1])
+    return len(writer)
+
+class RecordFile:
+    """
+    以 mmap 只读打开二进制记录文件。
+    name_ids 和各偏移数组是直接指向映射内存的 memoryview（不复制），
+    url_bytes(i) 返回 URL 的 memoryview 切片；names 为解码后的名称表（通常只有几万项）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path} 不是二进制记录文件")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        magic, rows, name_count, *starts = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是二进制记录文件")
+        self.rows = rows
+        view = memoryview(self._map)
+        name_offsets_at, name_data_at, ids_at, url_offsets_at, url_data_at = starts
+        self._views = [view]
+        self.name_offsets = self._array(view, name_offsets_at, name_count + 1, 'Q')
+        self.name_ids = self._array(view, ids_at, rows, 'I')
+        self.url_offsets = self._array(view, url_offsets_at, rows + 1, 'Q')
+        self.url_data = view[url_data_at:url_data_at + self.url_offsets[rows]]
+        name_data = view[name_data_at:name_data_at + self.name_offsets[name_count]]
+        self.names = [bytes(name_data[self.name_offsets[i]:self.name_offsets[i + 1]]).decode('utf-8')
+                      for i in range(name_count)]
+        name_data.release()
+        self._views += [self.url_data]
+
+    def _array(self, view, start, count, typecode):
+        size = array(typecode).itemsize
+        part = view[start:start + count * size]
+        if sys.byteorder == 'little':
+            part = part.cast(typecode)
+            self._views.append(part)
+            return part
+        values = array(typecode, part)  # 大端机器上需要复制并转换字节序
+        part.release()
+        values.byteswap()
+        return values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.rows
+
+    def url_bytes(self, i):
+        return self.url_data[self.url_offsets[i]:self.url_offsets[i + 1]]
+
+    def url(self, i):
+        return str(self.url_bytes(i), 'utf-8')
+
+    def name(self, i):
+        return self.names[self.name_ids[i]]
+
+    def __iter__(self):
+        """逐行产出 (name, url)"""
+        names, ids, url = self.names, self.name_ids, self.url
+        for i in range(self.rows):
+            yield names[ids[i]], url(i)
+
+    def iter_rows(self, wanted_ids):
+        """只产出名称编号在 wanted_ids 中的行 (name, url)，其余行的 URL 不解码"""
+        names, ids, url = self.names, self.name_ids, self.url
+        for i in range(self.rows):
+            name_id = ids[i]
+            if name_id in wanted_ids:
+                yield names[name_id], url(i)
+
+    def close(self):
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self._views = []
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
@@ -0,0 +1,93 @@
+# modules/circuit_breaker.py
+# 按主机的熔断器：同一主机连续多次连接失败后，本次运行中该主机剩余的 URL 直接跳过
+
+import os
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CIRCUIT_REPORT_FILE = os.path.join("output", "circuit_report.json")
+# 连续连接失败多少次后熔断
+FAILURE_THRESHOLD = 3
+
+def url_host(url):
+    """取 URL 的 主机:端口（小写）"""
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        return ''
+
+class HostCircuitBreaker:
+    """
+    记录每个主机的连续连接失败次数，达到 threshold 后熔断，熔断在本次运行内不再恢复。
+    只有连接失败（拒绝连接、连接超时、DNS 失败等）计入，收到任何 HTTP 响应都会清零。
+    可在多个线程中共用。
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.failures = {}  # 主机 -> 连续失败次数
+        self.opened = {}    # 主机 -> 熔断记录
+
+    def allow(self, host):
+        """主机未熔断时返回 True；已熔断时记一次跳过并返回 False"""
+        with self.lock:
+            record = self.opened.get(host)
+            if record is None:
+                return True
+            record['skipped'] += 1
+            return False
+
+    def record_success(self, host):
+        with self.lock:
+            if host not in self.opened:
+                self.failures.pop(host, None)
+
+    def record_failure(self, host, reason, source):
+        """记录一次连接失败；本次失败导致熔断时返回 True"""
+        with self.lock:
+            if host in self.opened:
+                return False
+            count = self.failures.get(host, 0) + 1
+            self.failures[host] = count
+            if count < self.threshold:
+                return False
+            self.opened[host] = {
+                'failures': count,
+                'skipped': 0,
+                'reason': reason,
+                'source': source,
+                'opened_at': int(time.time()),
+            }
+        logger.warning(f"主机 {host} 连续 {count} 次连接失败，本次运行跳过该主机的其余 URL（{reason}）")
+        return True
+
+    def report(self):
+        """{主机: 熔断记录}，按跳过的 URL 数从多到少排列"""
+        with self.lock:
+            items = sorted(self.opened.items(), key=lambda item: -item[1]['skipped'])
+            return {host: dict(record) for host, record in items}
+
+    def save_report(self, path=CIRCUIT_REPORT_FILE):
+        """写出熔断报告并输出汇总"""
+        report = self.report()
+        skipped = sum(record['skipped'] for record in report.values())
+        logger.info(f"熔断主机 {len(report)} 个，共跳过 {skipped} 个 URL")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'threshold': self.threshold, 'generated_at': int(time.time()), 'hosts': report},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(path + '.tmp', path)
+
+# 同一进程内探测和订阅下载共用的熔断器
+_shared_breaker = HostCircuitBreaker()
+
+def get_breaker():
+    return _shared_breaker
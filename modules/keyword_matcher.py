@@ -0,0 +1,125 @@
+# modules/keyword_matcher.py
+# 黑名单/白名单共用的多关键词匹配器（Aho-Corasick 自动机）
+
+import os
+import logging
+from collections import deque
+
+try:
+    import ahocorasick  # pyahocorasick，C 实现
+except ImportError:  # 没有安装时使用纯 Python 实现
+    ahocorasick = None
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class _PyAutomaton:
+    """纯 Python 的 Aho-Corasick 自动机"""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.out = [None]
+        for keyword in keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.out.append(None)
+                    self.goto[node][ch] = nxt
+                node = nxt
+            if self.out[node] is None:
+                self.out[node] = keyword
+
+        # 广度优先构建失败指针，并把失败链上的输出合并到当前节点
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                if self.out[nxt] is None:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+class _CAutomaton:
+    """基于 pyahocorasick 的自动机"""
+
+    def __init__(self, keywords):
+        self.automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            self.automaton.add_word(keyword, keyword)
+        self.automaton.make_automaton()
+
+    def search(self, text):
+        for _, keyword in self.automaton.iter(text):
+            return keyword
+        return None
+
+class KeywordMatcher:
+    """
+    大小写不敏感的多关键词子串匹配器，与逐个 `keyword in line.lower()` 的结果一致，
+    但每行只扫描一遍。search() 返回命中的关键词，便于查看保留或丢弃的原因。
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        if not self.keywords:
+            self.automaton = None
+        elif ahocorasick is not None:
+            self.automaton = _CAutomaton(self.keywords)
+        else:
+            self.automaton = _PyAutomaton(self.keywords)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def __iter__(self):
+        return iter(self.keywords)
+
+    def search(self, text):
+        """返回 text 中第一个结束的关键词，没有命中返回 None"""
+        if self.automaton is None:
+            return None
+        return self.automaton.search(text.lower())
+
+def load_keywords(path):
+    """读取关键词文件：跳过空行和 # 开头的注释行，统一转为小写"""
+    keywords = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                keywords.add(line.lower())
+    return keywords
+
+_matcher_cache = {}
+
+def load_matcher(path):
+    """
+    按文件构建匹配器，同一文件内容未变时复用已构建的自动机。
+    文件不存在时抛出 FileNotFoundError。
+    """
+    mtime = os.path.getmtime(path)
+    cached = _matcher_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    matcher = KeywordMatcher(load_keywords(path))
+    _matcher_cache[path] = (mtime, matcher)
+    return matcher
@@ -1,667 +1,1019 @@
-# import urllib.parse
-# import time
-# from requests_html import HTMLSession
-# from bs4 import BeautifulSoup
-# import time
-# import requests
-# import logging
-# from selenium import webdriver
-# from selenium.webdriver.chrome.options import Options
-# from playwright.sync_api import sync_playwright, TimeoutError
-
-
-# def extract_onclick_content(onclick_text):
-#     """
-#     从onclick属性中提取括号内的内容
-#     """
-#     # 找到第一个 "(" 和最后一个 ")" 之间的内容
-#     start = onclick_text.find('(')
-#     end = onclick_text.rfind(')')
-    
-#     if start != -1 and end != -1 and start < end:
-#         content = onclick_text[start+1:end]
-#         # 移除首尾的引号（如果有的话）
-#         content = content.strip().strip('"\'')
-#         return content
-#     return ""
-
-# def search_and_extract(search_term,type=1):
-#     """
-#     搜索并提取符合条件的内容
-#     """
-#     results = []
-    
-#     try:
-#         # 构建搜索URL
-#         encoded_term = urllib.parse.quote(search_term)
-#         if type == 1:
-#             url = f"http://tonkiang.us/?iptv={encoded_term}"
-#         elif type == 2:
-#             url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
-#         print(f"正在访问: {url}")
-        
-#         # 发送请求
-#         headers = {
-#             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-#         }
-        
-#         response = requests.get(url, headers=headers, timeout=10)
-#         #response = requests.get(url, timeout=10)
-#         #response.encoding = 'utf-8'
-        
-#         if response.status_code == 200:
-#             soup = BeautifulSoup(response.text, 'html.parser')
-            
-#             # 找到所有的 <div class="imgw"> 元素
-#             imgw_divs = soup.find_all('div', class_='imgw')
-            
-#             print(f"找到 {len(imgw_divs)} 个 imgw 元素")
-            
-#             for div in imgw_divs:
-
-#                 try:
-#                     # 找到当前 'imgw' div 的祖父元素
-#                     grandparent = div.parent.parent
-#                     if grandparent:
-#                         # 找到祖父元素的前一个同级元素，并确保它是一个标签而不是文本节点
-#                         previous_sibling = grandparent.find_previous_sibling()
-#                         while previous_sibling and not getattr(previous_sibling, 'name', None):
-#                             previous_sibling = previous_sibling.find_previous_sibling()
-
-#                         # 如果找到了前一个同级元素，就在其中查找 class="tip" 的 div
-#                         if previous_sibling:
-#                             tip_div = previous_sibling.find('div', class_='tip')
-#                             if tip_div:
-#                                 # 获取并清理文本内容
-#                                 tip_text = tip_div.get_text(strip=True)
-#                                 print(f"提取到 tip 内容: {tip_text}")
-#                 except Exception as e:
-#                     print(f"查找 tip 内容时出错: {e}")
-
-
-                
-#                 # 查找 img 元素，src 属性为 "copy.png"
-#                 img_elements = div.find_all('img', src='copy.png')
-                
-#                 for img in img_elements:
-#                     # 找到包含这个 img 的父元素中的 onclick 属性
-#                     parent = img.parent
-#                     onclick_value = None
-                    
-#                     # 向上查找包含 onclick 属性的元素
-#                     while parent and parent != div:
-#                         if parent.has_attr('onclick'):
-#                             onclick_value = parent.get('onclick')
-#                             break
-#                         parent = parent.parent
-                    
-#                     # 如果在当前元素上没找到，检查同级元素
-#                     if not onclick_value:
-#                         # 检查同级元素的 onclick 属性
-#                         siblings = div.find_all(attrs={'onclick': True})
-#                         for sibling in siblings:
-#                             if sibling.get('src') == 'copy.png' or sibling.find('img', src='copy.png'):
-#                                 onclick_value = sibling.get('onclick')
-#                                 break
-                    
-#                     # 如果还是没找到，检查 div 本身
-#                     if not onclick_value and div.has_attr('onclick'):
-#                         onclick_value = div.get('onclick')
-                    
-#                     # 如果找到了 onclick 属性，提取其中的内容
-#                     if onclick_value:
-#                         extracted_content = extract_onclick_content(onclick_value)
-#                         if extracted_content:
-#                             if tip_text!= None:
-#                                 results.append([tip_text, extracted_content])
-#                             else:
-#                                 results.append([search_term, extracted_content])
-#                             print(f"提取到内容: {extracted_content}")
-                    
-#         else:
-#             print(f"请求失败，状态码: {response.status_code}")
-            
-#     except Exception as e:
-#         print(f"处理搜索词 '{search_term}' 时出错: {str(e)}")
-    
-#     return results
-
-# def new_search_and_extract(search_term,type=1):
-#     """
-#     搜索并提取符合条件的内容
-#     """
-#     results = []
-    
-#     try:
-#         # 构建搜索URL
-#         encoded_term = urllib.parse.quote(search_term)
-#         if type == 1:
-#             url = f"http://tonkiang.us/?iptv={encoded_term}"
-#         elif type == 2:
-#             url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
-#         print(f"正在访问: {url}")
-        
-#         # 发送请求
-#         headers = {
-#             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-#         }
-        
-#         response = requests.get(url, headers=headers, timeout=10)
-#         #response = requests.get(url, timeout=10)
-#         #response.encoding = 'utf-8'
-        
-#         if response.status_code == 200:
-#             soup = BeautifulSoup(response.text, 'html.parser')
-            
-#             # 1. 直接找到所有包含 onclick 功能的 copy.png 图片
-#             # 这是我们每次循环处理的基点
-#             all_copy_images = soup.find_all('img', src='copy.png')
-#             print(f"找到 {len(all_copy_images)} 个 copy.png 图片")
-            
-#             for img in all_copy_images:
-#                 # 初始化本次循环的结果变量
-#                 tip_text = None
-#                 extracted_content = None
-
-#                 # --- 任务A: 提取 onclick 内容 ---
-#                 onclick_value = None
-#                 # 向上查找最近的带有 onclick 属性的父元素，或者图片本身就有
-#                 clickable_element = img.find_parent(attrs={'onclick': True})
-#                 if img.has_attr('onclick'): # 优先检查img标签自身
-#                     onclick_value = img['onclick']
-#                 elif clickable_element: # 否则检查其父元素
-#                     onclick_value = clickable_element['onclick']
-                
-#                 if onclick_value:
-#                     # 使用你已有的函数来提取内容
-#                     extracted_content = extract_onclick_content(onclick_value)
-                
-#                 # --- 任务B: 查找对应的 tip_text ---
-#                 # 从当前 img 标签的位置，向前搜索最近的 <div class="channel">
-#                 # find_previous() 是实现这个逻辑的关键
-#                 channel_div = img.find_previous('div', class_='channel')
-                
-#                 if channel_div:
-#                     # 在找到的 channel_div 内部，查找 class="tip" 的 div
-#                     tip_div = channel_div.find('div', class_='tip')
-#                     if tip_div:
-#                         tip_text = tip_div.get_text(strip=True)
-
-#                 # --- 任务C: 存储结果 ---
-#                 # 确保我们同时找到了有用的 tip 和 onclick 内容再存入
-#                 if tip_text and extracted_content:
-#                     results.append([tip_text, extracted_content])
-#                     print(f"关联成功: [Tip: '{tip_text}', Content: '{extracted_content}']")
-#                 else:
-#                     # 打印日志，方便调试为什么没有成功关联
-#                     print(f"关联失败: Tip={'找到' if tip_text else '未找到'}, Content={'找到' if extracted_content else '未找到'}")
-
-#         else:
-#             print(f"请求失败，状态码: {response.status_code}")
-                
-#     except Exception as e:
-#         print(f"处理搜索词 '{search_term}' 时出错: {str(e)}")
-
-#     return results
-
-
-
-# def get_decrypted_links(search_term):
-#     """
-#     Launches a browser using Playwright to scrape dynamically loaded content.
-#     """
-#     #encoded_term = urllib.parse.quote(search_term)
-#     url = f"https://iptv-search.com/zh-hans/search/?q={search_term}"
-#     results = []
-#     with sync_playwright() as p:
-#         # Launch a browser. 'headless=True' means the browser runs in the background.
-#         # Set 'headless=False' if you want to see the browser window.
-#         browser = p.chromium.launch(headless=True)
-#         page = browser.new_page()
-
-#         try:
-#             print(f"Navigating to: {url}")
-#             # Navigate to the page
-#             page.goto(url, timeout=60000) # Increase timeout to 60 seconds
-
-#             print("Waiting for dynamic content to load...")
-#             # Wait for the first element with the class 'decrypted-link' to appear.
-#             # This is a reliable way to wait for the JavaScript to execute.
-#             page.wait_for_selector('span.decrypted-link', state='visible', timeout=30000)
-#             print("Content loaded. Extracting links...")
-
-#             # Locate all span elements with the specified class
-#             link_spans = page.locator('span.decrypted-link').all()
-
-#             if not link_spans:
-#                 print("No elements with class 'decrypted-link' were found.")
-#                 return []
-
-#             # Loop through all found elements and extract their text content
-#             for span in link_spans:
-#                 link_text = span.text_content()
-#                 if link_text:
-#                     results.append([search_term,link_text.strip()])
-
-#         except TimeoutError:
-#             print("Timed out waiting for the 'decrypted-link' elements to appear.")
-#             print("The page might have changed, or the content did not load as expected.")
-#         except Exception as e:
-#             print(f"An error occurred: {str(e)}")
-#         finally:
-#             # Always close the browser
-#             browser.close()
-
-#     return results
-
-
-# def main(input_file, output_file):
-#     # input_file = r"E:\TV\扒源代码\channel.txt"  # 输入文件名
-#     # output_file = r"E:\TV\扒源代码\results.txt"      # 输出文件名
-
-#     all_results = []
-    
-#     try:
-#         # 读取搜索词文件
-#         with open(input_file, 'r', encoding='utf-8') as f:
-#             search_terms = [line.strip() for line in f if line.strip()]
-        
-#         print(f"共读取到 {len(search_terms)} 个搜索词")
-        
-#         # 逐个处理每个搜索词
-#         for i, term in enumerate(search_terms, 1):
-#             print(f"\n处理第 {i}/{len(search_terms)} 个: {term}")
-            
-#             # 搜索并提取内容
-#             results = new_search_and_extract(term,1)
-#             all_results.extend(results)
-#             # 添加延时避免请求过于频繁
-#             if i < len(search_terms):
-#                 time.sleep(1)
-#         # 逐个处理每个搜索词,这个方法是用requests_html的，不太稳定而且需要翻墙
-#         for i, term in enumerate(search_terms, 1):
-#             print(f"\n处理第 {i}/{len(search_terms)} 个: {term}")
-            
-#             # 搜索并提取内容
-#             results2 = get_decrypted_links(term)
-#             if len(results2) > 0:
-#                 #取第一个结果
-#                 all_results.extend(results2[0])
-#             # 添加延时避免请求过于频繁
-#             if i < len(search_terms):
-#                 time.sleep(1)
-
-
-#         # 将结果写入输出文件
-#         with open(output_file, 'w', encoding='utf-8') as f:
-#             for search_term, extracted_content in all_results:
-#                 f.write(f"{search_term},{extracted_content}\n")
-#         dictionary = {}
-#         with open (output_file, 'r', encoding='utf-8') as f:
-#             for line in f:
-#                 fields = line.strip().split(',')
-#                 if len(fields) == 2:   
-#                     key, value = fields
-#                     if key not in dictionary:
-#                         dictionary[key] = list()
-#                     dictionary[key].append(value)
-#                     dictionary[key] = list(set(dictionary[key]))  # 去重
-#         #将output_file中的内容清除后写入新的文件
-#         with open(output_file, 'w', encoding='utf-8') as f:
-#             for key, values in dictionary.items():
-#                 for value in values:
-#                     f.write(f"{key},{value}\n")
-        
-#         print(f"\n处理完成！共提取到 {len(all_results)} 条结果")
-#         print(f"结果已保存到 {output_file}")
-        
-#     except FileNotFoundError:
-#         print(f"错误：找不到输入文件 {input_file}")
-#     except Exception as e:
-#         print(f"程序执行出错: {str(e)}")
-
-
-
-
-
-# if __name__ == "__main__":
-#     # input_file = r"E:\TV\扒源代码\channel.txt"  # 输入文件名
-#     # output_file = r"E:\TV\扒源代码\results.txt"      # 输出文件名
-#     input_file = r".\config\channels.txt"  # 输入文件名
-#     output_file = r".\config\ownsource.txt"      # 输出文件名
-#     main(input_file,output_file)
-
-# # results = []  
-# # try:
-# #     # 构建搜索URL
-# #     #encoded_term = urllib.parse.quote(search_term)
-# #     url = f"https://iptv-search.com/zh-hans/search/?q=中国大陆&page=1"
-# #     print(f"正在访问: {url}")
-    
-# #     # 发送请求
-# #     headers = {
-# #         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-# #     }
-    
-# #     response = requests.get(url, headers=headers, timeout=10)
-    
-# #     if response.status_code == 200:
-# #         soup = BeautifulSoup(response.text, 'html.parser')
-# #         with open(r"E:\TV\扒源代码\11.txt", 'w', encoding='utf-8') as f:
-# #             f.write(soup.prettify())
-                
-# #     else:
-# #         print(f"请求失败，状态码: {response.status_code}")
-        
-# # except Exception as e:
-# #     print(f"处理出错: {str(e)}")
-
-
-
-# # # 设置 Selenium WebDriver
-# # # 您需要根据您的 Chrome 版本下载对应的 chromedriver
-# # # 并将其路径配置好，或者使用 webdriver-manager 自动管理
-# # options = webdriver.ChromeOptions()
-# # options.add_argument('--headless')  # 无头模式，不打开浏览器界面
-# # driver = webdriver.Chrome(options=options)
-
-# # try:
-# #     # 访问网页
-# #     url = "https://iptv-search.com/zh-hans/search/?q=中国大陆&page=1"
-# #     driver.get(url)
-
-# #     # 等待 JavaScript 执行完成，这里简单地等待几秒
-# #     # 更稳健的方法是使用 WebDriverWait 等待特定元素加载完成
-# #     time.sleep(5)
-
-# #     # 获取渲染后的页面源码
-# #     page_source = driver.page_source
-
-# #     # 使用 BeautifulSoup 解析
-# #     soup = BeautifulSoup(page_source, 'html.parser')
-
-# #     # 现在您可以正常查找元素了
-# #     decrypted_links = soup.find_all('span', class_='decrypted-link')
-# #     for link_span in decrypted_links:
-# #         # 假设链接是作为文本内容或者在某个属性中
-# #         link = link_span.get_text(strip=True)
-# #         if not link:
-# #              # 有时内容可能在子标签中，或者需要更复杂的解析
-# #              # 根据实际情况调整
-# #              if link_span.a:
-# #                  link = link_span.a['href']
-# #         print(link)
-
-
-# # except Exception as e:
-# #     print(f"处理出错: {str(e)}")
-
-# # finally:
-# #     # 关闭浏览器
-# #     driver.quit()
-
-# modules/module1_capture.py
-
-import urllib.parse
-import time
-import os
-from bs4 import BeautifulSoup
-import requests
-import logging
-from datetime import datetime, timezone, timedelta
-from playwright.sync_api import sync_playwright, TimeoutError
-
-# --- 配置日志 ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-def extract_onclick_content(onclick_text):
-    """
-    从onclick属性中提取括号内的内容
-    """
-    if not onclick_text:
-        return ""
-    # 找到第一个 "(" 和最后一个 ")" 之间的内容
-    start = onclick_text.find('(')
-    end = onclick_text.rfind(')')
-    
-    if start != -1 and end != -1 and start < end:
-        content = onclick_text[start+1:end]
-        # 移除首尾的引号（如果有的话）
-        content = content.strip().strip('"\'')
-        return content
-    return ""
-
-def new_search_and_extract(search_term, type=1):
-    """
-    搜索并提取符合条件的内容 (优化版)
-    """
-    results = []
-    
-    try:
-        # 构建搜索URL
-        encoded_term = urllib.parse.quote(search_term)
-        if type == 1:
-            url = f"http://tonkiang.us/?iptv={encoded_term}"
-        elif type == 2:
-            url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
-        logger.info(f"正在访问: {url}")
-        
-        # 发送请求
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15) # 增加超时时间
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 1. 直接找到所有包含 onclick 功能的 copy.png 图片
-            all_copy_images = soup.find_all('img', src='copy.png')
-            logger.info(f"找到 {len(all_copy_images)} 个 copy.png 图片")
-            
-            for img in all_copy_images:
-                tip_text = None
-                extracted_content = None
-
-                # --- 任务A: 提取 onclick 内容 ---
-                onclick_value = None
-                # 向上查找最近的带有 onclick 属性的父元素，或者图片本身就有
-                clickable_element = img.find_parent(attrs={'onclick': True})
-                if img.has_attr('onclick'): # 优先检查img标签自身
-                    onclick_value = img['onclick']
-                elif clickable_element: # 否则检查其父元素
-                    onclick_value = clickable_element['onclick']
-                
-                if onclick_value:
-                    # 使用你已有的函数来提取内容
-                    extracted_content = extract_onclick_content(onclick_value)
-                
-                # --- 任务B: 查找对应的 tip_text ---
-                # 从当前 img 标签的位置，向前搜索最近的 <div class="channel">
-                channel_div = img.find_previous('div', class_='channel')
-                
-                if channel_div:
-                    # 在找到的 channel_div 内部，查找 class="tip" 的 div
-                    tip_div = channel_div.find('div', class_='tip')
-                    if tip_div:
-                        tip_text = tip_div.get_text(strip=True)
-
-                # --- 任务C: 存储结果 ---
-                if tip_text and extracted_content:
-                    results.append([tip_text, extracted_content])
-                    logger.debug(f"关联成功: [Tip: '{tip_text}', Content: '{extracted_content}']")
-                else:
-                    logger.debug(f"关联失败: Tip={'找到' if tip_text else '未找到'}, Content={'找到' if extracted_content else '未找到'}")
-
-        else:
-            logger.warning(f"请求失败，状态码: {response.status_code} for {url}")
-                
-    except requests.exceptions.RequestException as e:
-        logger.error(f"网络请求错误 (搜索词 '{search_term}'): {e}")
-    except Exception as e:
-        logger.error(f"处理搜索词 '{search_term}' 时出错: {e}")
-
-    return results
-
-def get_decrypted_links(search_term):
-    """
-    使用 Playwright 抓取动态加载的内容。
-    """
-    url = f"https://iptv-search.com/zh-hans/search/?q={urllib.parse.quote(search_term)}"
-    results = []
-    logger.info(f"启动 Playwright 访问: {url}")
-    try:
-        with sync_playwright() as p:
-            # Launch browser in headless mode
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-
-            # Navigate to the page
-            page.goto(url, timeout=60000) # 60 seconds timeout
-
-            # Wait for the first element with the class 'decrypted-link' to appear.
-            page.wait_for_selector('span.decrypted-link', state='visible', timeout=30000)
-            logger.info("内容加载完成，开始提取链接...")
-
-            # Locate all span elements with the specified class
-            link_spans = page.locator('span.decrypted-link').all()
-
-            if not link_spans:
-                logger.info("未找到 class 为 'decrypted-link' 的元素。")
-                browser.close()
-                return []
-
-            # Loop through all found elements and extract their text content
-            for span in link_spans:
-                link_text = span.text_content()
-                if link_text:
-                    results.append([search_term, link_text.strip()])
-            
-            browser.close()
-
-    except TimeoutError:
-        logger.error("等待 'decrypted-link' 元素超时。页面可能未按预期加载。")
-    except Exception as e:
-        logger.error(f"Playwright 执行过程中发生错误: {e}")
-        
-    if results:
-        logger.info(f"Playwright 成功提取到 {len(results)} 条结果。")
-    else:
-        logger.info("Playwright 未提取到任何结果。")
-    return results
-
-def deduplicate_and_save(results, output_file):
-    """对结果进行去重并保存到文件"""
-    if not results:
-        logger.warning("没有结果需要保存。")
-        return
-
-    # 使用字典进行去重，键为频道名，值为URL集合
-    dictionary = {}
-    for item in results:
-        if len(item) >= 2:
-            key, value = item[0], item[1]
-            if key not in dictionary:
-                dictionary[key] = set()
-            dictionary[key].add(value)
-        else:
-            logger.debug(f"跳过格式不正确的结果项: {item}")
-
-    # 写入文件
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for key, values in dictionary.items():
-                for value in values:
-                    f.write(f"{key},{value}\n")
-        logger.info(f"结果已去重并保存到 {output_file}, 共 {len(dictionary)} 个唯一频道。")
-    except IOError as e:
-        logger.error(f"写入文件 {output_file} 时出错: {e}")
-
-def generate_range(step):
-    if not isinstance(step, int) or step <= 0:
-        raise ValueError("步长必须为正整数")
-
-    # 用 range 生成从 0 到 6（不含6）的值
-    result = list(range(0, 7, step))
-
-    return result
-
-def main(input_file, output_file, step=7 ,exflag=False):
-    # 获取当前东八区时间
-    beijing_time = datetime.now(timezone(timedelta(hours=8)))
-    
-    # 获取星期几并判断是否为单数
-    weekday = beijing_time.weekday()
-    # is_single_day = weekday in [0, 2, 4, 6]  # 周一、周三、周五、周日
-    is_day = weekday in generate_range(step)
-    # 判断当前时间是否小于12:00
-    is_before_noon = beijing_time.hour < 12
-    #if is_single_day and is_before_noon :
-    if is_day and is_before_noon :
-        """主函数"""
-        all_results = []
-        
-        # 确保 output 目录存在
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        search_terms = []
-        try:
-            # 读取搜索词文件
-            with open(input_file, 'r', encoding='utf-8') as f:
-                #search_terms = [line.strip() for line in f if line.strip()]
-                for line in f:
-                    line = line.strip()
-                    # 跳过空行和注释行
-                    if line and not line.startswith('#'):
-                        search_terms.append(line)
-            logger.info(f"共读取到 {len(search_terms)} 个搜索词")
-            
-            # --- 处理每个搜索词 (Tonkiang/foodieguide) ---
-            for i, term in enumerate(search_terms, 1):
-                logger.info(f"\n处理第 {i}/{len(search_terms)} 个: {term}")
-                
-                # 搜索并提取内容 (Tonkiang)
-                results = new_search_and_extract(term, 1)
-                all_results.extend(results)
-                
-                # 添加延时避免请求过于频繁
-                if i < len(search_terms):
-                    time.sleep(1)
-            
-            # --- 处理每个搜索词 (iptv-search.com) ---
-            # 注意：此网站可能需要翻墙或不稳定，可根据需要启用/禁用
-            if exflag:
-                for i, term in enumerate(search_terms, 1):
-                    logger.info(f"\n[Playwright] 处理第 {i}/{len(search_terms)} 个: {term}")
-                    results2 = get_decrypted_links(term)
-                    if  len(results2) > 0:
-                        all_results.extend(results2[0])
-                    if i < len(search_terms):
-                        time.sleep(2) # Playwright 请求间隔可稍长
-    
-            # 去重并保存结果
-            deduplicate_and_save(all_results, output_file)
-            
-            logger.info(f"\n✅ 模块1处理完成！共尝试提取到 {len(all_results)} 条结果 (去重后保存)。")
-            
-        except FileNotFoundError:
-            logger.error(f"❌ 错误：找不到输入文件 {input_file}")
-        except Exception as e:
-            logger.error(f"❌ 程序执行出错: {e}")
-    else:
-        logger.info(f"为降低爬取频率，改为每{step}天一爬，本次将不爬取信号源")
-
-
-# 如果直接运行此脚本，则执行 main 函数
-# 注意：在 main.py 中调用时，应使用 module1_capture.main(...)
-if __name__ == "__main__":
-    # 使用相对于项目根目录的路径
-    input_file = os.path.join("config", "channels.txt")
-    output_file = os.path.join("output", "ownsource.txt")
-    main(input_file, output_file)
-
-
-
-
-
+# import urllib.parse
+# import time
+# from requests_html import HTMLSession
+# from bs4 import BeautifulSoup
+# import time
+# import requests
+# import logging
+# from selenium import webdriver
+# from selenium.webdriver.chrome.options import Options
+# from playwright.sync_api import sync_playwright, TimeoutError
+
+
+# def extract_onclick_content(onclick_text):
+#     """
+#     从onclick属性中提取括号内的内容
+#     """
+#     # 找到第一个 "(" 和最后一个 ")" 之间的内容
+#     start = onclick_text.find('(')
+#     end = onclick_text.rfind(')')
+    
+#     if start != -1 and end != -1 and start < end:
+#         content = onclick_text[start+1:end]
+#         # 移除首尾的引号（如果有的话）
+#         content = content.strip().strip('"\'')
+#         return content
+#     return ""
+
+# def search_and_extract(search_term,type=1):
+#     """
+#     搜索并提取符合条件的内容
+#     """
+#     results = []
+    
+#     try:
+#         # 构建搜索URL
+#         encoded_term = urllib.parse.quote(search_term)
+#         if type == 1:
+#             url = f"http://tonkiang.us/?iptv={encoded_term}"
+#         elif type == 2:
+#             url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
+#         print(f"正在访问: {url}")
+        
+#         # 发送请求
+#         headers = {
+#             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+#         }
+        
+#         response = requests.get(url, headers=headers, timeout=10)
+#         #response = requests.get(url, timeout=10)
+#         #response.encoding = 'utf-8'
+        
+#         if response.status_code == 200:
+#             soup = BeautifulSoup(response.text, 'html.parser')
+            
+#             # 找到所有的 <div class="imgw"> 元素
+#             imgw_divs = soup.find_all('div', class_='imgw')
+            
+#             print(f"找到 {len(imgw_divs)} 个 imgw 元素")
+            
+#             for div in imgw_divs:
+
+#                 try:
+#                     # 找到当前 'imgw' div 的祖父元素
+#                     grandparent = div.parent.parent
+#                     if grandparent:
+#                         # 找到祖父元素的前一个同级元素，并确保它是一个标签而不是文本节点
+#                         previous_sibling = grandparent.find_previous_sibling()
+#                         while previous_sibling and not getattr(previous_sibling, 'name', None):
+#                             previous_sibling = previous_sibling.find_previous_sibling()
+
+#                         # 如果找到了前一个同级元素，就在其中查找 class="tip" 的 div
+#                         if previous_sibling:
+#                             tip_div = previous_sibling.find('div', class_='tip')
+#                             if tip_div:
+#                                 # 获取并清理文本内容
+#                                 tip_text = tip_div.get_text(strip=True)
+#                                 print(f"提取到 tip 内容: {tip_text}")
+#                 except Exception as e:
+#                     print(f"查找 tip 内容时出错: {e}")
+
+
+                
+#                 # 查找 img 元素，src 属性为 "copy.png"
+#                 img_elements = div.find_all('img', src='copy.png')
+                
+#                 for img in img_elements:
+#                     # 找到包含这个 img 的父元素中的 onclick 属性
+#                     parent = img.parent
+#                     onclick_value = None
+                    
+#                     # 向上查找包含 onclick 属性的元素
+#                     while parent and parent != div:
+#                         if parent.has_attr('onclick'):
+#                             onclick_value = parent.get('onclick')
+#                             break
+#                         parent = parent.parent
+                    
+#                     # 如果在当前元素上没找到，检查同级元素
+#                     if not onclick_value:
+#                         # 检查同级元素的 onclick 属性
+#                         siblings = div.find_all(attrs={'onclick': True})
+#                         for sibling in siblings:
+#                             if sibling.get('src') == 'copy.png' or sibling.find('img', src='copy.png'):
+#                                 onclick_value = sibling.get('onclick')
+#                                 break
+                    
+#                     # 如果还是没找到，检查 div 本身
+#                     if not onclick_value and div.has_attr('onclick'):
+#                         onclick_value = div.get('onclick')
+                    
+#                     # 如果找到了 onclick 属性，提取其中的内容
+#                     if onclick_value:
+#                         extracted_content = extract_onclick_content(onclick_value)
+#                         if extracted_content:
+#                             if tip_text!= None:
+#                                 results.append([tip_text, extracted_content])
+#                             else:
+#                                 results.append([search_term, extracted_content])
+#                             print(f"提取到内容: {extracted_content}")
+                    
+#         else:
+#             print(f"请求失败，状态码: {response.status_code}")
+            
+#     except Exception as e:
+#         print(f"处理搜索词 '{search_term}' 时出错: {str(e)}")
+    
+#     return results
+
+# def new_search_and_extract(search_term,type=1):
+#     """
+#     搜索并提取符合条件的内容
+#     """
+#     results = []
+    
+#     try:
+#         # 构建搜索URL
+#         encoded_term = urllib.parse.quote(search_term)
+#         if type == 1:
+#             url = f"http://tonkiang.us/?iptv={encoded_term}"
+#         elif type == 2:
+#             url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
+#         print(f"正在访问: {url}")
+        
+#         # 发送请求
+#         headers = {
+#             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+#         }
+        
+#         response = requests.get(url, headers=headers, timeout=10)
+#         #response = requests.get(url, timeout=10)
+#         #response.encoding = 'utf-8'
+        
+#         if response.status_code == 200:
+#             soup = BeautifulSoup(response.text, 'html.parser')
+            
+#             # 1. 直接找到所有包含 onclick 功能的 copy.png 图片
+#             # 这是我们每次循环处理的基点
+#             all_copy_images = soup.find_all('img', src='copy.png')
+#             print(f"找到 {len(all_copy_images)} 个 copy.png 图片")
+            
+#             for img in all_copy_images:
+#                 # 初始化本次循环的结果变量
+#                 tip_text = None
+#                 extracted_content = None
+
+#                 # --- 任务A: 提取 onclick 内容 ---
+#                 onclick_value = None
+#                 # 向上查找最近的带有 onclick 属性的父元素，或者图片本身就有
+#                 clickable_element = img.find_parent(attrs={'onclick': True})
+#                 if img.has_attr('onclick'): # 优先检查img标签自身
+#                     onclick_value = img['onclick']
+#                 elif clickable_element: # 否则检查其父元素
+#                     onclick_value = clickable_element['onclick']
+                
+#                 if onclick_value:
+#                     # 使用你已有的函数来提取内容
+#                     extracted_content = extract_onclick_content(onclick_value)
+                
+#                 # --- 任务B: 查找对应的 tip_text ---
+#                 # 从当前 img 标签的位置，向前搜索最近的 <div class="channel">
+#                 # find_previous() 是实现这个逻辑的关键
+#                 channel_div = img.find_previous('div', class_='channel')
+                
+#                 if channel_div:
+#                     # 在找到的 channel_div 内部，查找 class="tip" 的 div
+#                     tip_div = channel_div.find('div', class_='tip')
+#                     if tip_div:
+#                         tip_text = tip_div.get_text(strip=True)
+
+#                 # --- 任务C: 存储结果 ---
+#                 # 确保我们同时找到了有用的 tip 和 onclick 内容再存入
+#                 if tip_text and extracted_content:
+#                     results.append([tip_text, extracted_content])
+#                     print(f"关联成功: [Tip: '{tip_text}', Content: '{extracted_content}']")
+#                 else:
+#                     # 打印日志，方便调试为什么没有成功关联
+#                     print(f"关联失败: Tip={'找到' if tip_text else '未找到'}, Content={'找到' if extracted_content else '未找到'}")
+
+#         else:
+#             print(f"请求失败，状态码: {response.status_code}")
+                
+#     except Exception as e:
+#         print(f"处理搜索词 '{search_term}' 时出错: {str(e)}")
+
+#     return results
+
+
+
+# def get_decrypted_links(search_term):
+#     """
+#     Launches a browser using Playwright to scrape dynamically loaded content.
+#     """
+#     #encoded_term = urllib.parse.quote(search_term)
+#     url = f"https://iptv-search.com/zh-hans/search/?q={search_term}"
+#     results = []
+#     with sync_playwright() as p:
+#         # Launch a browser. 'headless=True' means the browser runs in the background.
+#         # Set 'headless=False' if you want to see the browser window.
+#         browser = p.chromium.launch(headless=True)
+#         page = browser.new_page()
+
+#         try:
+#             print(f"Navigating to: {url}")
+#             # Navigate to the page
+#             page.goto(url, timeout=60000) # Increase timeout to 60 seconds
+
+#             print("Waiting for dynamic content to load...")
+#             # Wait for the first element with the class 'decrypted-link' to appear.
+#             # This is a reliable way to wait for the JavaScript to execute.
+#             page.wait_for_selector('span.decrypted-link', state='visible', timeout=30000)
+#             print("Content loaded. Extracting links...")
+
+#             # Locate all span elements with the specified class
+#             link_spans = page.locator('span.decrypted-link').all()
+
+#             if not link_spans:
+#                 print("No elements with class 'decrypted-link' were found.")
+#                 return []
+
+#             # Loop through all found elements and extract their text content
+#             for span in link_spans:
+#                 link_text = span.text_content()
+#                 if link_text:
+#                     results.append([search_term,link_text.strip()])
+
+#         except TimeoutError:
+#             print("Timed out waiting for the 'decrypted-link' elements to appear.")
+#             print("The page might have changed, or the content did not load as expected.")
+#         except Exception as e:
+#             print(f"An error occurred: {str(e)}")
+#         finally:
+#             # Always close the browser
+#             browser.close()
+
+#     return results
+
+
+# def main(input_file, output_file):
+#     # input_file = r"E:\TV\扒源代码\channel.txt"  # 输入文件名
+#     # output_file = r"E:\TV\扒源代码\results.txt"      # 输出文件名
+
+#     all_results = []
+    
+#     try:
+#         # 读取搜索词文件
+#         with open(input_file, 'r', encoding='utf-8') as f:
+#             search_terms = [line.strip() for line in f if line.strip()]
+        
+#         print(f"共读取到 {len(search_terms)} 个搜索词")
+        
+#         # 逐个处理每个搜索词
+#         for i, term in enumerate(search_terms, 1):
+#             print(f"\n处理第 {i}/{len(search_terms)} 个: {term}")
+            
+#             # 搜索并提取内容
+#             results = new_search_and_extract(term,1)
+#             all_results.extend(results)
+#             # 添加延时避免请求过于频繁
+#             if i < len(search_terms):
+#                 time.sleep(1)
+#         # 逐个处理每个搜索词,这个方法是用requests_html的，不太稳定而且需要翻墙
+#         for i, term in enumerate(search_terms, 1):
+#             print(f"\n处理第 {i}/{len(search_terms)} 个: {term}")
+            
+#             # 搜索并提取内容
+#             results2 = get_decrypted_links(term)
+#             if len(results2) > 0:
+#                 #取第一个结果
+#                 all_results.extend(results2[0])
+#             # 添加延时避免请求过于频繁
+#             if i < len(search_terms):
+#                 time.sleep(1)
+
+
+#         # 将结果写入输出文件
+#         with open(output_file, 'w', encoding='utf-8') as f:
+#             for search_term, extracted_content in all_results:
+#                 f.write(f"{search_term},{extracted_content}\n")
+#         dictionary = {}
+#         with open (output_file, 'r', encoding='utf-8') as f:
+#             for line in f:
+#                 fields = line.strip().split(',')
+#                 if len(fields) == 2:   
+#                     key, value = fields
+#                     if key not in dictionary:
+#                         dictionary[key] = list()
+#                     dictionary[key].append(value)
+#                     dictionary[key] = list(set(dictionary[key]))  # 去重
+#         #将output_file中的内容清除后写入新的文件
+#         with open(output_file, 'w', encoding='utf-8') as f:
+#             for key, values in dictionary.items():
+#                 for value in values:
+#                     f.write(f"{key},{value}\n")
+        
+#         print(f"\n处理完成！共提取到 {len(all_results)} 条结果")
+#         print(f"结果已保存到 {output_file}")
+        
+#     except FileNotFoundError:
+#         print(f"错误：找不到输入文件 {input_file}")
+#     except Exception as e:
+#         print(f"程序执行出错: {str(e)}")
+
+
+
+
+
+# if __name__ == "__main__":
+#     # input_file = r"E:\TV\扒源代码\channel.txt"  # 输入文件名
+#     # output_file = r"E:\TV\扒源代码\results.txt"      # 输出文件名
+#     input_file = r".\config\channels.txt"  # 输入文件名
+#     output_file = r".\config\ownsource.txt"      # 输出文件名
+#     main(input_file,output_file)
+
+# # results = []  
+# # try:
+# #     # 构建搜索URL
+# #     #encoded_term = urllib.parse.quote(search_term)
+# #     url = f"https://iptv-search.com/zh-hans/search/?q=中国大陆&page=1"
+# #     print(f"正在访问: {url}")
+    
+# #     # 发送请求
+# #     headers = {
+# #         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+# #     }
+    
+# #     response = requests.get(url, headers=headers, timeout=10)
+    
+# #     if response.status_code == 200:
+# #         soup = BeautifulSoup(response.text, 'html.parser')
+# #         with open(r"E:\TV\扒源代码\11.txt", 'w', encoding='utf-8') as f:
+# #             f.write(soup.prettify())
+                
+# #     else:
+# #         print(f"请求失败，状态码: {response.status_code}")
+        
+# # except Exception as e:
+# #     print(f"处理出错: {str(e)}")
+
+
+
+# # # 设置 Selenium WebDriver
+# # # 您需要根据您的 Chrome 版本下载对应的 chromedriver
+# # # 并将其路径配置好，或者使用 webdriver-manager 自动管理
+# # options = webdriver.ChromeOptions()
+# # options.add_argument('--headless')  # 无头模式，不打开浏览器界面
+# # driver = webdriver.Chrome(options=options)
+
+# # try:
+# #     # 访问网页
+# #     url = "https://iptv-search.com/zh-hans/search/?q=中国大陆&page=1"
+# #     driver.get(url)
+
+# #     # 等待 JavaScript 执行完成，这里简单地等待几秒
+# #     # 更稳健的方法是使用 WebDriverWait 等待特定元素加载完成
+# #     time.sleep(5)
+
+# #     # 获取渲染后的页面源码
+# #     page_source = driver.page_source
+
+# #     # 使用 BeautifulSoup 解析
+# #     soup = BeautifulSoup(page_source, 'html.parser')
+
+# #     # 现在您可以正常查找元素了
+# #     decrypted_links = soup.find_all('span', class_='decrypted-link')
+# #     for link_span in decrypted_links:
+# #         # 假设链接是作为文本内容或者在某个属性中
+# #         link = link_span.get_text(strip=True)
+# #         if not link:
+# #              # 有时内容可能在子标签中，或者需要更复杂的解析
+# #              # 根据实际情况调整
+# #              if link_span.a:
+# #                  link = link_span.a['href']
+# #         print(link)
+
+
+# # except Exception as e:
+# #     print(f"处理出错: {str(e)}")
+
+# # finally:
+# #     # 关闭浏览器
+# #     driver.quit()
+
+# modules/module1_capture.py
+
+import urllib.parse
+import time
+import os
+import asyncio
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+import requests
+import logging
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+try:
+    from lxml import etree
+except ImportError:  # 没有 lxml 时退回标准库解析器
+    etree = None
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 各搜索站点的限速配置：(每秒补充令牌数, 桶容量)
+# 原先串行 sleep(1)，这里保持每个域名每秒最多发起1次请求的礼貌程度
+DOMAIN_RATE_LIMITS = {
+    'tonkiang.us': (1.0, 1),
+    'www.foodieguide.com': (1.0, 1),
+}
+# 并发抓取的默认线程数
+DEFAULT_CAPTURE_WORKERS = 8
+# 每天运行次数（见 .github/workflows/auto_update.yml），用于计算每次刷新的搜索词预算
+RUNS_PER_DAY = 2
+# Playwright 并行标签页数
+DEFAULT_BROWSER_TABS = 4
+# Playwright 拦截的资源类型和统计脚本域名，只放行文档、脚本和接口请求
+BLOCKED_RESOURCE_TYPES = {'image', 'stylesheet', 'font', 'media'}
+BLOCKED_URL_KEYWORDS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+    'googlesyndication.com', 'hm.baidu.com', 'cnzz.com', 'umeng.com',
+)
+
+class TokenBucket:
+    """线程安全的令牌桶，acquire() 在没有令牌时阻塞等待"""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("令牌桶的速率和容量必须为正数")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取走一个令牌，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(domain):
+    """按域名获取共享的令牌桶，未配置限速的域名返回 None"""
+    if domain not in DOMAIN_RATE_LIMITS:
+        return None
+    with _rate_limiters_lock:
+        if domain not in _rate_limiters:
+            rate, capacity = DOMAIN_RATE_LIMITS[domain]
+            _rate_limiters[domain] = TokenBucket(rate, capacity)
+        return _rate_limiters[domain]
+
+def wait_for_domain(url):
+    """请求前按 URL 的域名限速"""
+    limiter = get_rate_limiter(urllib.parse.urlparse(url).hostname or '')
+    if limiter:
+        waited = limiter.acquire()
+        if waited > 0:
+            logger.debug(f"限速等待 {waited:.2f}s: {url}")
+
+def extract_onclick_content(onclick_text):
+    """
+    从onclick属性中提取括号内的内容
+    """
+    if not onclick_text:
+        return ""
+    # 找到第一个 "(" 和最后一个 ")" 之间的内容
+    start = onclick_text.find('(')
+    end = onclick_text.rfind(')')
+    
+    if start != -1 and end != -1 and start < end:
+        content = onclick_text[start+1:end]
+        # 移除首尾的引号（如果有的话）
+        content = content.strip().strip('"\'')
+        return content
+    return ""
+
+# 没有结束标签的 HTML 元素
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+class _Channel:
+    """一个 <div class="channel">，tip 为其内部第一个 <div class="tip"> 的文本"""
+    __slots__ = ('tip', 'open')
+
+    def __init__(self):
+        self.tip = None
+        self.open = True
+
+class TipLinkCollector:
+    """
+    单次遍历的提取器，按文档顺序把每个 copy.png 的 onclick 内容与
+    它前面最近的 div.channel 中的 tip 文本配对。
+    接口与 lxml 解析器的 target 一致：start/end/data/close。
+    """
+
+    def __init__(self):
+        self.stack = []          # [(tag, onclick, channel)]
+        self.channel = None      # 最近开始的 div.channel
+        self.tip_depth = None    # 正在收集 tip 文本时，tip 元素所在的栈深度
+        self.tip_pieces = []
+        self.text_buf = []
+        self.pairs = []          # [(channel, 内容)]
+
+    def _flush_text(self):
+        if self.text_buf:
+            piece = ''.join(self.text_buf).strip()
+            if piece:
+                self.tip_pieces.append(piece)
+            self.text_buf = []
+
+    def start(self, tag, attrib):
+        if self.tip_depth is not None:
+            self._flush_text()
+        onclick = attrib.get('onclick')
+        channel = None
+        if tag == 'div':
+            classes = (attrib.get('class') or '').split()
+            if 'channel' in classes:
+                channel = self.channel = _Channel()
+            elif 'tip' in classes and self.tip_depth is None and self.channel \
+                    and self.channel.open and self.channel.tip is None:
+                self.tip_depth = len(self.stack)
+                self.tip_pieces = []
+        if tag == 'img' and attrib.get('src') == 'copy.png':
+            # 优先检查 img 自身，否则取最近的带 onclick 的祖先元素
+            if onclick is None:
+                onclick = next((value for _, value, _ in reversed(self.stack) if value is not None), None)
+            content = extract_onclick_content(onclick)
+            self.pairs.append((self.channel, content))
+        self.stack.append((tag, attrib.get('onclick'), channel))
+
+    def end(self, tag):
+        if not self.stack:
+            return
+        if self.tip_depth is not None:
+            self._flush_text()
+        _, _, channel = self.stack.pop()
+        if channel:
+            channel.open = False
+        if self.tip_depth is not None and len(self.stack) == self.tip_depth:
+            self.channel.tip = ''.join(self.tip_pieces)
+            self.tip_depth = None
+
+    def data(self, data):
+        if self.tip_depth is not None:
+            self.text_buf.append(data)
+
+    def close(self):
+        results = []
+        for channel, content in self.pairs:
+            tip_text = channel.tip if channel else None
+            if tip_text and content:
+                results.append([tip_text, content])
+            else:
+                logger.debug(f"关联失败: Tip={'找到' if tip_text else '未找到'}, Content={'找到' if content else '未找到'}")
+        return results
+
+class _StdlibTreeFeeder(HTMLParser):
+    """把标准库 HTMLParser 的事件转换为配对的 start/end 事件"""
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self.open_tags = []
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {k: (v if v is not None else '') for k, v in attrs})
+        if tag in VOID_ELEMENTS:
+            self.target.end(tag)
+        else:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {k: (v if v is not None else '') for k, v in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.open_tags:
+            return
+        # 连同未闭合的子元素一起结束
+        while True:
+            open_tag = self.open_tags.pop()
+            self.target.end(open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+def extract_tip_links(html_text):
+    """
+    从搜索结果页中一次性提取 [tip, onclick内容] 列表，保持文档顺序。
+    有 lxml 时使用其 C 解析器，否则使用标准库 html.parser。
+    """
+    collector = TipLinkCollector()
+    if etree is not None:
+        parser = etree.HTMLParser(target=collector)
+        parser.feed(html_text)
+        return parser.close()
+    feeder = _StdlibTreeFeeder(collector)
+    feeder.feed(html_text)
+    feeder.close()
+    while feeder.open_tags:
+        collector.end(feeder.open_tags.pop())
+    return collector.close()
+
+def new_search_and_extract(search_term, type=1):
+    """
+    搜索并提取符合条件的内容 (优化版)
+    请求失败（网络错误、非 200 状态码）时返回 None，以便与"请求成功但没有结果"区分
+    """
+    results = None
+    
+    try:
+        # 构建搜索URL
+        encoded_term = urllib.parse.quote(search_term)
+        if type == 1:
+            url = f"http://tonkiang.us/?iptv={encoded_term}"
+        elif type == 2:
+            url = f"http://www.foodieguide.com/iptvsearch/?iptv={encoded_term}"
+        logger.info(f"正在访问: {url}")
+        
+        # 发送请求
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        
+        wait_for_domain(url)
+        response = requests.get(url, headers=headers, timeout=15) # 增加超时时间
+        
+        if response.status_code == 200:
+            # 单次遍历页面，按文档顺序配对 tip 与 copy.png 的 onclick 内容
+            results = extract_tip_links(response.text)
+            logger.info(f"提取到 {len(results)} 条 tip/链接")
+
+        else:
+            logger.warning(f"请求失败，状态码: {response.status_code} for {url}")
+            return None
+                
+    except requests.exceptions.RequestException as e:
+        logger.error(f"网络请求错误 (搜索词 '{search_term}'): {e}")
+    except Exception as e:
+        logger.error(f"处理搜索词 '{search_term}' 时出错: {e}")
+        return None
+
+    return results
+
+async def _block_resources(route):
+    """拦截图片、样式、字体和统计请求"""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(k in request.url for k in BLOCKED_URL_KEYWORDS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+class BrowserPool:
+    """
+    长驻的 Chromium 浏览器，带可复用的 context/page 池。
+    整个运行只启动一次浏览器，多个搜索词在不同标签页中并行抓取。
+    """
+
+    def __init__(self, size=DEFAULT_BROWSER_TABS, headless=True):
+        self.size = max(1, size)
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.pages = None
+
+    async def __aenter__(self):
+        self.playwright = await async_playwright().start()
+        try:
+            self.browser = await self.playwright.chromium.launch(headless=self.headless)
+            self.pages = asyncio.Queue()
+            for _ in range(self.size):
+                context = await self.browser.new_context()
+                await context.route("**/*", _block_resources)
+                self.pages.put_nowait(await context.new_page())
+        except Exception:
+            await self.close()
+            raise
+        logger.info(f"Playwright 浏览器已启动，页面池大小 {self.size}")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def fetch(self, search_term):
+        """借用一个页面抓取单个搜索词，用完归还"""
+        url = f"https://iptv-search.com/zh-hans/search/?q={urllib.parse.quote(search_term)}"
+        results = []
+        page = await self.pages.get()
+        try:
+            logger.info(f"Playwright 访问: {url}")
+            await page.goto(url, timeout=60000, wait_until='domcontentloaded') # 60 seconds timeout
+            # Wait for the first element with the class 'decrypted-link' to appear.
+            await page.wait_for_selector('span.decrypted-link', state='visible', timeout=30000)
+
+            for link_text in await page.locator('span.decrypted-link').all_text_contents():
+                if link_text and link_text.strip():
+                    results.append([search_term, link_text.strip()])
+        except PlaywrightTimeoutError:
+            logger.error(f"等待 'decrypted-link' 元素超时 (搜索词 '{search_term}')。页面可能未按预期加载。")
+        except Exception as e:
+            logger.error(f"Playwright 处理搜索词 '{search_term}' 时发生错误: {e}")
+        finally:
+            self.pages.put_nowait(page)
+
+        logger.info(f"Playwright 搜索词 '{search_term}' 提取到 {len(results)} 条结果。")
+        return results
+
+async def _fetch_decrypted_links(search_terms, tabs):
+    async with BrowserPool(tabs) as pool:
+        outcomes = await asyncio.gather(*(pool.fetch(term) for term in search_terms))
+    return dict(zip(search_terms, outcomes))
+
+def get_decrypted_links_batch(search_terms, tabs=DEFAULT_BROWSER_TABS):
+    """
+    使用共享的 Playwright 浏览器池并行抓取多个搜索词。
+    返回 {搜索词: [[搜索词, 链接], ...]}
+    """
+    if not search_terms:
+        return {}
+    try:
+        return asyncio.run(_fetch_decrypted_links(search_terms, tabs))
+    except Exception as e:
+        logger.error(f"Playwright 执行过程中发生错误: {e}")
+        return {}
+
+def get_decrypted_links(search_term):
+    """
+    使用 Playwright 抓取动态加载的内容。
+    """
+    return get_decrypted_links_batch([search_term], tabs=1).get(search_term, [])
+
+def capture_terms(search_terms, type=1, max_workers=DEFAULT_CAPTURE_WORKERS):
+    """
+    并发抓取多个搜索词，请求按域名令牌桶限速。
+    返回 ({搜索词: 结果列表}（按输入顺序，请求失败的搜索词不在其中）, 每个搜索词的耗时列表)
+    """
+    if not search_terms:
+        return {}, []
+
+    def run(term):
+        start = time.perf_counter()
+        results = new_search_and_extract(term, type)
+        return results, time.perf_counter() - start
+
+    results_by_term = {}
+    latencies = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # executor.map 保持输入顺序，合并结果与串行执行一致
+        outcomes = executor.map(run, search_terms)
+        for i, (term, (results, elapsed)) in enumerate(zip(search_terms, outcomes), 1):
+            if results is None:
+                logger.info(f"处理第 {i}/{len(search_terms)} 个: {term}，请求失败，耗时 {elapsed:.2f}s")
+            else:
+                logger.info(f"处理第 {i}/{len(search_terms)} 个: {term}，提取 {len(results)} 条，耗时 {elapsed:.2f}s")
+                results_by_term.setdefault(term, []).extend(results)
+            latencies.append({'term': term, 'seconds': round(elapsed, 3), 'results': len(results or ())})
+
+    report_latencies(latencies, max_workers)
+    return results_by_term, latencies
+
+def report_latencies(latencies, max_workers):
+    """输出搜索词耗时分布，便于调整并发数"""
+    if not latencies:
+        return
+    seconds = sorted(item['seconds'] for item in latencies)
+
+    def percentile(p):
+        return seconds[min(len(seconds) - 1, int(round(p * (len(seconds) - 1))))]
+
+    logger.info(
+        f"并发数 {max_workers}，{len(seconds)} 个搜索词耗时: "
+        f"p50={percentile(0.5):.2f}s p90={percentile(0.9):.2f}s max={seconds[-1]:.2f}s 合计={sum(seconds):.2f}s"
+    )
+    for item in sorted(latencies, key=lambda item: item['seconds'], reverse=True)[:5]:
+        logger.info(f"慢搜索词: {item['term']} {item['seconds']:.2f}s ({item['results']} 条)")
+
+def deduplicate_and_save(results, output_file):
+    """对结果进行去重并保存到文件"""
+    if not results:
+        logger.warning("没有结果需要保存。")
+        return
+
+    # 使用字典进行去重，键为频道名，值为按首次出现顺序排列的URL（dict 去重），
+    # 保证相同的结果每次写出的文件内容相同
+    dictionary = {}
+    for item in results:
+        if len(item) >= 2:
+            key, value = item[0], item[1]
+            if key not in dictionary:
+                dictionary[key] = {}
+            dictionary[key][value] = None
+        else:
+            logger.debug(f"跳过格式不正确的结果项: {item}")
+
+    # 写入文件
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for key, values in dictionary.items():
+                for value in values:
+                    f.write(f"{key},{value}\n")
+        logger.info(f"结果已去重并保存到 {output_file}, 共 {len(dictionary)} 个唯一频道。")
+    except IOError as e:
+        logger.error(f"写入文件 {output_file} 时出错: {e}")
+
+def load_capture_cache(cache_file):
+    """读取搜索词抓取缓存 {搜索词: {'last_captured': 时间戳, 'yield': 条数, 'results': [[名称, URL], ...]}}"""
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('terms', {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"抓取缓存 {cache_file} 读取失败，将重新抓取: {e}")
+        return {}
+
+def save_capture_cache(cache, cache_file):
+    """写出抓取缓存（先写临时文件再替换，避免中断时留下半个文件）"""
+    tmp_file = cache_file + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'terms': cache}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logger.error(f"写入抓取缓存 {cache_file} 时出错: {e}")
+
+def read_previous_results(output_file):
+    """读取上次写出的 ownsource.txt，返回 [[名称, URL], ...]；文件不存在时返回空列表"""
+    results = []
+    if not os.path.exists(output_file):
+        return results
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if ',' in line:
+                    results.append(line.split(',', 1))
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"读取上次的结果 {output_file} 失败: {e}")
+    return results
+
+def select_stale_terms(search_terms, cache, budget, now=None):
+    """
+    选出本次需要刷新的搜索词：从未抓取过的优先，
+    其余按 距上次抓取的时长 × (1 + log(1 + 上次产出条数)) 从大到小排序。
+    """
+    now = time.time() if now is None else now
+    fresh = [term for term in search_terms if term not in cache]
+
+    def priority(term):
+        entry = cache[term]
+        age = max(0.0, now - entry.get('last_captured', 0))
+        return age * (1 + math.log1p(entry.get('yield', 0)))
+
+    cached = sorted((term for term in search_terms if term in cache), key=priority, reverse=True)
+    return (fresh + cached)[:max(0, budget)]
+
+def default_budget(term_count, step):
+    """按每 step 天把全部搜索词轮换刷新一遍计算每次运行的预算"""
+    return math.ceil(term_count / (step * RUNS_PER_DAY))
+
+def main(input_file, output_file, step=7 ,exflag=False, max_workers=DEFAULT_CAPTURE_WORKERS, tabs=DEFAULT_BROWSER_TABS,
+         budget=None, cache_file=None):
+    """
+    主函数：每次运行只刷新预算内最陈旧/产出最高的搜索词，
+    其余搜索词沿用缓存中的结果，合并后写出 ownsource.txt。
+    还有搜索词从未抓取成功（如刚启用缓存）时，上次的 ownsource.txt 一并保留，避免结果变少；
+    缓存和 ownsource.txt 都不存在时抓取全部搜索词。
+    """
+    # 确保 output 目录存在
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if cache_file is None:
+        cache_file = os.path.join(os.path.dirname(output_file), "capture_cache.json")
+    search_terms = []
+    try:
+        # 读取搜索词文件
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                # 跳过空行和注释行
+                if line and not line.startswith('#'):
+                    search_terms.append(line)
+        search_terms = list(dict.fromkeys(search_terms))
+        logger.info(f"共读取到 {len(search_terms)} 个搜索词")
+
+        # 只保留仍在搜索词列表中的缓存
+        cache = load_capture_cache(cache_file)
+        cache = {term: cache[term] for term in search_terms if term in cache}
+
+        previous_results = []
+        if len(cache) < len(search_terms):
+            previous_results = read_previous_results(output_file)
+        if budget is None:
+            budget = default_budget(len(search_terms), step)
+            if not cache and not previous_results:
+                budget = len(search_terms)
+        selected = select_stale_terms(search_terms, cache, budget)
+        logger.info(f"本次刷新 {len(selected)}/{len(search_terms)} 个搜索词（预算 {budget}），其余沿用缓存结果")
+
+        # --- 并发处理选中的搜索词 (Tonkiang/foodieguide)，按域名令牌桶限速 ---
+        results_by_term, _ = capture_terms(selected, 1, max_workers)
+
+        # --- 处理每个搜索词 (iptv-search.com) ---
+        # 注意：此网站可能需要翻墙或不稳定，可根据需要启用/禁用
+        extra_rows = {}
+        if exflag:
+            decrypted = get_decrypted_links_batch(selected, tabs)
+            for term in selected:
+                results2 = decrypted.get(term, [])
+                if  len(results2) > 0:
+                    extra_rows[term] = list(results2[0][:2]) # 取第一个结果
+
+        now = time.time()
+        # 是否算作已刷新只看 tonkiang 的请求是否成功，iptv-search 的结果只是补充
+        failed = [term for term in selected if term not in results_by_term]
+        if failed:
+            logger.warning(f"{len(failed)} 个搜索词抓取失败，保留其原有缓存，下次优先重试: {', '.join(failed[:10])}")
+        uncached_extra = []
+        for term in selected:
+            extra = extra_rows.get(term)
+            if term in failed:
+                # 不更新抓取时间，只把 iptv-search 的结果并入原有缓存
+                if extra is None:
+                    continue
+                if term in cache:
+                    cached_results = cache[term].setdefault('results', [])
+                    if extra not in cached_results:
+                        cached_results.append(extra)
+                else:
+                    uncached_extra.append(extra)
+                continue
+            results = [list(item[:2]) for item in results_by_term[term]]
+            entry = cache.get(term, {})
+            entry['last_captured'] = now
+            entry['yield'] = len(results) + (extra is not None)
+            # 本次没抓到结果（网站异常等）时保留上次的结果
+            if results or 'results' not in entry:
+                entry['results'] = results
+            if extra is not None and extra not in entry['results']:
+                entry['results'].append(extra)
+            cache[term] = entry
+        save_capture_cache(cache, cache_file)
+
+        # 合并全部搜索词的缓存结果，去重并保存
+        all_results = []
+        for term in search_terms:
+            all_results.extend(cache.get(term, {}).get('results', []))
+        all_results.extend(uncached_extra)
+        uncached = sum(1 for term in search_terms if term not in cache)
+        if uncached and previous_results:
+            logger.info(f"还有 {uncached} 个搜索词没有缓存，保留上次结果中的 {len(previous_results)} 条")
+            all_results.extend(previous_results)
+        deduplicate_and_save(all_results, output_file)
+
+        logger.info(f"\n✅ 模块1处理完成！本次抓取 {sum(len(r) for r in results_by_term.values()) + len(extra_rows)} 条，合并缓存共 {len(all_results)} 条结果 (去重后保存)。")
+
+    except FileNotFoundError:
+        logger.error(f"❌ 错误：找不到输入文件 {input_file}")
+    except Exception as e:
+        logger.error(f"❌ 程序执行出错: {e}")
+
+
+# 如果直接运行此脚本，则执行 main 函数
+# 注意：在 main.py 中调用时，应使用 module1_capture.main(...)
+if __name__ == "__main__":
+    # 使用相对于项目根目录的路径
+    input_file = os.path.join("config", "channels.txt")
+    output_file = os.path.join("output", "ownsource.txt")
+    main(input_file, output_file)
+
+
+
+
+
@@ -1,461 +1,863 @@
-# modules/module2_combine.py
-import pandas as pd
-import requests
-import os
-import logging
-from urllib.parse import urlparse
-import urllib.request
-import html
-import opencc
-import re
-
-# --- 配置日志 ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-def read_txt_to_array(file_name):
-    try:
-        with open(file_name, 'r', encoding='utf-8') as file:
-            lines=[]
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                lines.append(line)
-            return lines
-    except FileNotFoundError:
-        print(f"File '{file_name}' not found.")
-        return []
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return []
-
-#简繁转换
-def traditional_to_simplified(text: str) -> str:
-    # 初始化转换器，"t2s" 表示从繁体转为简体
-    converter = opencc.OpenCC('t2s')
-    simplified_text = converter.convert(text)
-    return simplified_text
-#M3U格式判断
-def is_m3u_content(text):
-    lines = text.splitlines()
-    first_line = lines[0].strip()
-    return first_line.startswith("#EXTM3U")
-    
-def convert_m3u_to_txt(m3u_content):
-    # 分行处理
-    lines = m3u_content.split('\n')
-    
-    # 用于存储结果的列表
-    txt_lines = []
-    
-    # 临时变量用于存储频道名称
-    channel_name = ""
-    
-    for line in lines:
-        # 过滤掉 #EXTM3U 开头的行
-        if line.startswith("#EXTM3U"):
-            continue
-        # 处理 #EXTINF 开头的行
-        if line.startswith("#EXTINF"):
-            # 获取频道名称（假设频道名称在引号后）
-            channel_name = line.split(',')[-1].strip()
-        # 处理 URL 行
-        elif line.startswith("http") or line.startswith("rtmp") or line.startswith("p3p") :
-            txt_lines.append(f"{channel_name},{line.strip()}")
-        
-        # 处理后缀名为m3u，但是内容为txt的文件
-        if "#genre#" not in line and "," in line and "://" in line:
-            # 定义正则表达式，匹配频道名称,URL 的格式，并确保 URL 包含 "://"
-            # xxxx,http://xxxxx.xx.xx
-            pattern = r'^[^,]+,[^\s]+://[^\s]+$'
-            if bool(re.match(pattern, line)):
-                txt_lines.append(line)
-    
-    # 将结果合并成一个字符串，以换行符分隔
-    return '\n'.join(txt_lines)
-# 添加channel_name前剔除部分特定字符
-removal_list = ["「IPV4」","「IPV6」","[ipv6]","[ipv4]","_电信", "电信","（HD）","[超清]","高清","超清", "-HD","(HK)","AKtv","@","IPV6","🎞️","🎦"," ","[BD]","[VGA]","[HD]","[SD]","(1080p)","(720p)","(480p)"]
-def clean_channel_name(channel_name, removal_list):
-    for item in removal_list:
-        channel_name = channel_name.replace(item, "")
-        channel_name = channel_name.replace("CCTV-", "CCTV")
-        channel_name = channel_name.replace("CCTV0","CCTV")
-        channel_name = channel_name.replace("PLUS", "+")
-        channel_name = channel_name.replace("NewTV-", "NewTV")
-        channel_name = channel_name.replace("iHOT-", "iHOT")
-        channel_name = channel_name.replace("NEW", "New")
-        channel_name = channel_name.replace("New_", "New")
-    return channel_name
-# 处理带$的URL，把$之后的内容都去掉（包括$也去掉） 【2024-08-08 22:29:11】
-def clean_url(url):
-    last_dollar_index = url.rfind('$')  # 安全起见找最后一个$处理
-    if last_dollar_index != -1:
-        return url[:last_dollar_index]
-    return url
-    
-def process_channel_line(line):
-    if  "#genre#" not in line and "#EXTINF:" not in line and "," in line and "://" in line:
-        channel_name = line.split(',')[0]
-        channel_name = traditional_to_simplified(channel_name)  #繁转简
-        channel_name = clean_channel_name(channel_name, removal_list)  #分发前清理channel_name中特定字符
-        channel_address = clean_url(line.split(',')[1]).strip()  #把URL中$之后的内容都去掉
-        line=channel_name+","+channel_address #重新组织line
-    return line
-
-def process_url(url):
-    logger.info(f"处理URL: {url}")
-    result = []
-    try:
-        #other_lines.append(url+",#genre#")  # 存入other_lines便于check 2024-08-02 10:41
-        
-        # 创建一个请求对象并添加自定义header
-        headers = {
-            'User-Agent': 'PostmanRuntime-ApipostRuntime/1.1.0',
-        }
-        req = urllib.request.Request(url, headers=headers)
-        # 打开URL并读取内容
-        with urllib.request.urlopen(req,timeout=10) as response:
-            # 以二进制方式读取数据
-            data = response.read()
-            # 将二进制数据解码为字符串
-            try:
-                # 先尝试 UTF-8 解码
-                text = data.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    # 若 UTF-8 解码失败，尝试 GBK 解码
-                    text = data.decode('gbk')
-                except UnicodeDecodeError:
-                    try:
-                        # 若 GBK 解码失败，尝试 ISO-8859-1 解码
-                        text = data.decode('iso-8859-1')
-                    except UnicodeDecodeError:
-                        print("无法确定合适的编码格式进行解码。")
-                        
-            #处理m3u提取channel_name和channel_address
-            if is_m3u_content(text):
-                text=convert_m3u_to_txt(text)
-
-            # 逐行处理内容
-            lines = text.split('\n')
-            print(f"行数: {len(lines)}")
-            for index, line in enumerate(lines):
-                if index % 5000 == 0 and index > 0:  # 每5000行提示一次（跳过第0行）
-                    print(f"已处理 {index} 行...")
-
-                line = line.strip()
-                if not line:
-                    continue
-                if  "#genre#" not in line and "," in line and "://" in line and not line.startswith('#'):
-                    # 拆分成频道名和URL部分
-                    channel_name, channel_address = line.split(',', 1)
-                    #需要加处理带#号源=予加速源
-                    if "#" not in channel_address:
-                        processedline=process_channel_line(line) # 如果没有井号，则照常按照每行规则进行分发
-                        name, url = processedline.split(',', 1)
-                        result.append([name, url.strip(), ''])
-                    else: 
-                        # 如果有“#”号，则根据“#”号分隔
-                        url_list = channel_address.split('#')
-                        for channel_url in url_list:
-                            newline=f'{channel_name},{channel_url}'
-                            processedline=process_channel_line(newline)
-                            name, url = processedline.split(',', 1)
-                            result.append([name, url.strip(), ''])
-            return result
-    except Exception as e:
-        print(f"处理URL时发生错误：{e}")
-def process_local(url):
-    logger.info(f"处理URL: {url}")
-    result = []
-    try:
-        if os.path.exists(url):
-            with open(url, 'r', encoding='utf-8') as file:
-                text = file.read()
-            # 逐行处理内容
-            lines = text.split('\n')
-            print(f"行数: {len(lines)}")
-            for index, line in enumerate(lines):
-                if index % 1000 == 0 and index > 0:  # 每1000行提示一次（跳过第0行）
-                    print(f"已处理 {index} 行...")
-
-                line = line.strip()
-                if not line:
-                    continue
-                if  "#genre#" not in line and "," in line and "://" in line and not line.startswith('#'):
-                    # 拆分成频道名和URL部分
-                    channel_name, channel_address = line.split(',', 1)
-                    #需要加处理带#号源=予加速源
-                    if "#" not in channel_address:
-                        processedline=process_channel_line(line) # 如果没有井号，则照常按照每行规则进行分发
-                        name, url = processedline.split(',', 1)
-                        result.append([name, url.strip(), ''])
-                    else: 
-                        # 如果有“#”号，则根据“#”号分隔
-                        url_list = channel_address.split('#')
-                        for channel_url in url_list:
-                            newline=f'{channel_name},{channel_url}'
-                            processedline=process_channel_line(newline)
-                            name, url = processedline.split(',', 1)
-                            result.append([name, url.strip(), ''])
-            return result
-    except Exception as e:
-        print(f"处理URL时发生错误：{e}")
-
-
-def deduplicate(data):
-    df = pd.DataFrame(data, columns=['name', 'url', 'extra'])
-    df['url'] = df['url'].str.replace(r'[\r\n,;"\'\t]', '', regex=True)
-    df['url'] = df['url'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
-    df['name'] = df['name'].str.replace(r'[\r\n,;"\'\t]', '', regex=True)
-    df['extra'] = df['extra'].str.replace(r'[\r\n,;"\'\t]', '', regex=True)
-    df['extra'] = df['extra'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
-    df.drop_duplicates(subset=['name', 'url'], keep='first', inplace=True)
-    return df
-
-# def save_df(df, path):
-#     logger.info(f"有{len(df)}条数据待写出")
-#     df.to_csv(path, index=False, header=False, encoding='utf-8')
-#     logger.info(f"数据已写出到 {path}")
-
-def save_df(df, path):
-    chunk_size = 50000
-    total_rows = len(df)
-    logger.info(f"有 {total_rows} 条数据待写出")
-
-    # 如果文件已存在，先删除（确保从头开始写）
-    if os.path.exists(path):
-        os.remove(path)
-        logger.info(f"已删除旧文件 {path}")
-
-    # 分块写入
-    num_chunks = (total_rows + chunk_size - 1) // chunk_size  # 向上取整
-    for i in range(num_chunks):
-        start_row = i * chunk_size
-        end_row = min(start_row + chunk_size, total_rows)
-        chunk = df.iloc[start_row:end_row]
-
-        # 第一块写入时，不写 header（因为 header=False）；后续块追加写入
-        write_header = False  # 你原需求是 header=False，所以始终不写 header
-        write_mode = 'w' if i == 0 else 'a'  # 第一块覆盖写，后续块追加写
-
-        chunk.to_csv(
-            path,
-            index=False,
-            header=write_header,
-            encoding='utf-8',
-            mode=write_mode
-        )
-
-        logger.info(f"数据分段 {i+1}/{num_chunks} 已追加写入到 {path}")
-
-    logger.info(f"全部数据已写出到 {path}")
-
-def combine_sources():
-    logger.info("开始执行模块2：读取订阅源")
-    urls=read_txt_to_array(os.path.join("config", "subscribe.txt"))
-    net_data=[]
-    for url in urls:
-        if url.startswith("http"):        
-            net_data+=process_url(url)
-    net_df = deduplicate(net_data)
-
-    # 读取本地源
-    result_data = process_local(os.path.join("config", "user_result.txt"))
-    local_data = process_local(os.path.join("config", "localsource.txt"))
-    own_data = process_local(os.path.join("output", "ownsource.txt"))
-    errorflag=False
-
-    
-    try:
-        save_df(net_df, os.path.join("output", "netsource.txt"))
-    except Exception as e: 
-        logger.error(f"网络源写出失败:{e}")
-        errorflag=True
-        with open(os.path.join("output", "netsource_log.csv"), 'w', encoding='gbk', errors='replace') as f:
-            for _, row in net_df.iterrows():
-                f.write(f"{row['name']},{row['url']},{row['extra']}\n")
-        
-    
-    # 合并所有源
-    if errorflag:
-        all_data = result_data + local_data + own_data
-    else:
-        all_data = result_data + local_data + own_data + net_data
-        
-    all_df = deduplicate(all_data)
-    all_df.drop(columns=['extra'], inplace=True)
-    try:
-        save_df(all_df, os.path.join("output", "allsource.txt"))
-    except Exception as e: 
-        logger.error(f"网络源写出失败:{e}")
-        with open(os.path.join("output", "allsource_log.txt"), 'w', encoding='gbk', errors='replace') as f:
-            for _, row in all_df.iterrows():
-                f.write(f"{row['name']},{row['url']}\n")
-    logger.info("模块2执行完毕")
-    return errorflag
-if __name__ == '__main__':
-
-    combine_sources()
-
-
-# import pandas as pd
-# import requests
-# import os
-# import logging
-# from urllib.parse import urlparse
-
-# # --- 配置日志 ---
-# logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-# logger = logging.getLogger(__name__)
-
-# def read_sources(file_path):
-#     data = []
-#     if not os.path.exists(file_path):
-#         return data
-#     with open(file_path, 'r', encoding='utf-8') as f:
-#         for line in f:
-#             line = line.strip()
-#             if not line or line.startswith('#') or ',#genre#' in line:
-#                 continue
-#             parts = line.split(',', 1)
-#             name = parts[0].strip()
-#             url = parts[1].strip() if len(parts) > 1 else ''
-#             extra = ''
-#             if '$' in url:
-#                 url, extra = url.split('$', 1)
-#             data.append([name, url.strip(), extra.strip()])
-#     return data
-
-# def read_subscribe_sources(subscribe_path):
-#     data = []
-#     with open(subscribe_path, 'r', encoding='utf-8') as f:
-        
-#         for line in f:
-#             line = line.strip()
-#             if not line or line.startswith('#'):
-#                 continue
-#             try:
-#                 response = requests.get(line, timeout=10)
-#                 if 'm3u' in urlparse(line).path.lower():
-#                     logger.info(f"检测到M3U源{line}，即将处理")
-#                     # M3U 格式解析
-#                     lines = response.text.splitlines()
-#                     i = 0
-#                     while i < len(lines):
-#                         if lines[i].startswith('#EXTINF'):
-#                             info = lines[i]
-#                             url = lines[i+1]
-#                             name = info.split(',')[-1].strip()
-#                             data.append([name, url.strip(), ''])
-#                             i += 2
-#                         else:
-#                             i += 1
-#                 else:
-#                     # TXT 格式解析
-#                     for line in response.text.splitlines():
-#                         line = line.strip()
-#                         if not line or line.startswith('#') or ',#genre#' in line:
-#                             continue
-#                         if '\t' in line:
-#                             parts = line.split('\t')
-#                             for part in parts:
-#                                 p = part.strip()
-#                                 if ',' in p:
-#                                     name, url = p.split(',', 1)
-#                                     extra = ''
-#                                     if '$' in url:
-#                                         url, extra = url.split('$', 1)
-#                                     data.append([name.strip(), url.strip(), extra.strip()])
-#                         else:
-#                             if ',' in line:
-#                                 name, url = line.split(',', 1)
-#                                 extra = ''
-#                                 if '$' in url:
-#                                     url, extra = url.split('$', 1)
-#                                 data.append([name.strip(), url.strip(), extra.strip()])
-#             except Exception as e:
-#                 logger.error(f"订阅源读取失败: {line} - {e}")
-#         logger.info(f"订阅源已处理完毕")
-#     return data
-
-# def deduplicate(data):
-#     df = pd.DataFrame(data, columns=['name', 'url', 'extra'])
-#     #df['url'] = df['url'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
-#     #df['name'] = df['name'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
-#     #df['extra'] = df['extra'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
-#     df.drop_duplicates(subset=['name', 'url'], keep='first', inplace=True)
-#     return df
-
-# def save_df(df, path):
-#     df.to_csv(path, index=False, header=False, encoding='utf-8')
-    
-# def combine_sources():
-#     logger.info("开始执行模块2：读取订阅源")
-#     # 读取本地源
-#     #result_data = read_sources(r'.\config\user_result.txt')
-#     result_data = read_sources(os.path.join("config", "user_result.txt"))
-#     #local_data = read_sources(r'.\config\localsource.txt')
-#     local_data = read_sources(os.path.join("config", "localsource.txt"))
-#     #own_data = read_sources(r'.\output\ownsource.txt')
-#     own_data = read_sources(os.path.join("output", "ownsource.txt"))
-    
-#     # 读取在线源
-#     #net_data = read_subscribe_sources(r'.\config\subscribe.txt')
-#     net_data = read_subscribe_sources(os.path.join("config", "subscribe.txt"))
-#     net_df = deduplicate(net_data)
-#     #save_df(net_df, r'.\output\netsource.txt')
-#     text = '\n'.join(net_df.apply(lambda row: f"{row['name']}|{row['url']}|{row['extra']}", axis=1))
-#     with open(os.path.join("output", "netsource_log.txt"), 'w', encoding='utf-8') as f:
-#         f.write(text)
-#     save_df(net_df, os.path.join("output", "netsource.txt"))
-
-    
-#     # 合并所有源
-#     all_data = result_data + local_data + own_data + net_data
-#     all_df = deduplicate(all_data)
-#     # all_df['combined'] = all_df.apply(
-#     # lambda row: f"{row['name']},{row['url']}${row['extra']}",
-#     # axis=1
-#     # )
-#     all_df.drop(columns=['extra'], inplace=True)
-#     #save_df(all_df, r'.\output\allsource.txt')
-#     save_df(all_df, os.path.join("output", "allsource.txt"))
-#     logger.info("模块2执行完毕")
-# if __name__ == '__main__':
-
-#     combine_sources()
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+# modules/module2_combine.py
+import pandas as pd
+import requests
+import os
+import logging
+from urllib.parse import urlparse, urlsplit, urlunsplit
+import ipaddress
+import urllib.request
+import urllib.error
+import html
+import opencc
+import re
+import json
+import gzip
+import zlib
+import hashlib
+import time
+import csv
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+try:
+    from modules.circuit_breaker import get_breaker, url_host
+    from modules.binfmt import RecordWriter, binary_path, write_records
+except ImportError:  # 直接运行本脚本时
+    from circuit_breaker import get_breaker, url_host
+    from binfmt import RecordWriter, binary_path, write_records
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 订阅源 HTTP 缓存目录：保存 ETag/Last-Modified 和已解析的记录
+SUBSCRIBE_CACHE_DIR = os.path.join("output", "cache", "subscribe")
+# 解析/清理规则的版本，修改 iter_parse_lines、normalize_channel_name 等的结果时加一，
+# 缓存中版本不同的记录不再复用（不发条件请求，重新下载解析）
+PARSER_VERSION = 2
+# 订阅源并发下载数和整个订阅阶段的截止时间（秒）
+DEFAULT_FETCH_WORKERS = 8
+SUBSCRIBE_DEADLINE = 180
+# 去重时视为省略的默认端口
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'rtsp': 554, 'rtmp': 1935}
+
+def read_txt_to_array(file_name):
+    try:
+        with open(file_name, 'r', encoding='utf-8') as file:
+            lines=[]
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                lines.append(line)
+            return lines
+    except FileNotFoundError:
+        print(f"File '{file_name}' not found.")
+        return []
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return []
+
+#简繁转换
+_t2s_converter = None
+
+def get_t2s_converter():
+    """全局共享的简繁转换器，首次使用时创建"""
+    global _t2s_converter
+    if _t2s_converter is None:
+        # 初始化转换器，"t2s" 表示从繁体转为简体
+        _t2s_converter = opencc.OpenCC('t2s')
+    return _t2s_converter
+
+def traditional_to_simplified(text: str) -> str:
+    return get_t2s_converter().convert(text)
+#M3U格式判断
+def is_m3u_content(text):
+    lines = text.splitlines()
+    first_line = lines[0].strip()
+    return first_line.startswith("#EXTM3U")
+    
+def convert_m3u_to_txt(m3u_content):
+    # 分行处理
+    lines = m3u_content.split('\n')
+    
+    # 用于存储结果的列表
+    txt_lines = []
+    
+    # 临时变量用于存储频道名称
+    channel_name = ""
+    
+    for line in lines:
+        # 过滤掉 #EXTM3U 开头的行
+        if line.startswith("#EXTM3U"):
+            continue
+        # 处理 #EXTINF 开头的行
+        if line.startswith("#EXTINF"):
+            # 获取频道名称（假设频道名称在引号后）
+            channel_name = line.split(',')[-1].strip()
+        # 处理 URL 行
+        elif line.startswith("http") or line.startswith("rtmp") or line.startswith("p3p") :
+            txt_lines.append(f"{channel_name},{line.strip()}")
+        
+        # 处理后缀名为m3u，但是内容为txt的文件
+        if "#genre#" not in line and "," in line and "://" in line:
+            # 定义正则表达式，匹配频道名称,URL 的格式，并确保 URL 包含 "://"
+            # xxxx,http://xxxxx.xx.xx
+            pattern = r'^[^,]+,[^\s]+://[^\s]+$'
+            if bool(re.match(pattern, line)):
+                txt_lines.append(line)
+    
+    # 将结果合并成一个字符串，以换行符分隔
+    return '\n'.join(txt_lines)
+# 添加channel_name前剔除部分特定字符
+removal_list = ["「IPV4」","「IPV6」","[ipv6]","[ipv4]","_电信", "电信","（HD）","[超清]","高清","超清", "-HD","(HK)","AKtv","@","IPV6","🎞️","🎦"," ","[BD]","[VGA]","[HD]","[SD]","(1080p)","(720p)","(480p)"]
+# 频道名改写规则，按顺序反复应用直到不再变化
+rewrite_rules = [
+    ("CCTV-", "CCTV"),
+    ("CCTV0", "CCTV"),
+    ("PLUS", "+"),
+    ("NewTV-", "NewTV"),
+    ("iHOT-", "iHOT"),
+    ("NEW", "New"),
+    ("New_", "New"),
+]
+_rewrite_pattern = re.compile('|'.join(re.escape(old) for old, _ in rewrite_rules))
+
+@functools.lru_cache(maxsize=None)
+def compile_removal_pattern(items):
+    """把剔除列表编译成一个正则，一次扫描删除全部特定字符"""
+    return re.compile('|'.join(re.escape(item) for item in items if item))
+
+def apply_rewrite_rules(channel_name):
+    # 先用一个正则快速判断是否需要改写，绝大多数名称在这里直接返回
+    while _rewrite_pattern.search(channel_name):
+        rewritten = channel_name
+        for old, new in rewrite_rules:
+            rewritten = rewritten.replace(old, new)
+        if rewritten == channel_name:
+            break
+        channel_name = rewritten
+    return channel_name
+
+def clean_channel_name(channel_name, removal_list):
+    removal_pattern = compile_removal_pattern(tuple(removal_list))
+    channel_name = apply_rewrite_rules(channel_name)
+    # 删除后可能拼出新的待删除片段（如 "-_电信HD" 删掉 "_电信" 后成为 "-HD"），反复删除直到不再变化
+    while True:
+        cleaned = apply_rewrite_rules(removal_pattern.sub("", channel_name))
+        if cleaned == channel_name:
+            return cleaned
+        channel_name = cleaned
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_channel_name(channel_name):
+    """繁转简并清理频道名；同一个原始名称在一次运行中只转换一次"""
+    channel_name = traditional_to_simplified(channel_name)  #繁转简
+    return clean_channel_name(channel_name, removal_list)  #分发前清理channel_name中特定字符
+# 处理带$的URL，把$之后的内容都去掉（包括$也去掉） 【2024-08-08 22:29:11】
+def clean_url(url):
+    last_dollar_index = url.rfind('$')  # 安全起见找最后一个$处理
+    if last_dollar_index != -1:
+        return url[:last_dollar_index]
+    return url
+    
+def process_channel_line(line):
+    if  "#genre#" not in line and "#EXTINF:" not in line and "," in line and "://" in line:
+        channel_name = normalize_channel_name(line.split(',')[0])  #繁转简并清理特定字符（按名称缓存）
+        channel_address = clean_url(line.split(',')[1]).strip()  #把URL中$之后的内容都去掉
+        line=channel_name+","+channel_address #重新组织line
+    return line
+
+def parse_lines(lines, progress_step=5000):
+    """把源文本的各行解析为 [频道名, URL, extra] 记录"""
+    print(f"行数: {len(lines)}")
+    return list(iter_parse_lines(lines, progress_step))
+
+def iter_parse_lines(lines, progress_step=5000):
+    """逐行解析源文本，产出 [频道名, URL, extra] 记录；lines 可以是列表或文件对象"""
+    for index, line in enumerate(lines):
+        if index % progress_step == 0 and index > 0:  # 每 progress_step 行提示一次（跳过第0行）
+            print(f"已处理 {index} 行...")
+
+        line = line.strip()
+        if not line:
+            continue
+        if  "#genre#" not in line and "," in line and "://" in line and not line.startswith('#'):
+            # 拆分成频道名和URL部分
+            channel_name, channel_address = line.split(',', 1)
+            #需要加处理带#号源=予加速源
+            if "#" not in channel_address:
+                processedline=process_channel_line(line) # 如果没有井号，则照常按照每行规则进行分发
+                name, url = processedline.split(',', 1)
+                yield [name, url.strip(), '']
+            else: 
+                # 如果有“#”号，则根据“#”号分隔
+                url_list = channel_address.split('#')
+                for channel_url in url_list:
+                    newline=f'{channel_name},{channel_url}'
+                    processedline=process_channel_line(newline)
+                    name, url = processedline.split(',', 1)
+                    yield [name, url.strip(), '']
+
+def decode_content(data):
+    """按 UTF-8、GBK、ISO-8859-1 的顺序尝试解码"""
+    try:
+        # 先尝试 UTF-8 解码
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        try:
+            # 若 UTF-8 解码失败，尝试 GBK 解码
+            return data.decode('gbk')
+        except UnicodeDecodeError:
+            # ISO-8859-1 可以解码任意字节
+            return data.decode('iso-8859-1')
+
+def http_cache_path(url, cache_dir=SUBSCRIBE_CACHE_DIR):
+    """订阅地址对应的缓存文件路径"""
+    return os.path.join(cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+def load_http_cache(url, cache_dir=SUBSCRIBE_CACHE_DIR):
+    """读取订阅地址的缓存 {'etag', 'last_modified', 'sha1', 'parser_version', 'records'}，没有则返回 None"""
+    path = http_cache_path(url, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('url') == url and isinstance(entry.get('records'), list):
+            return entry
+    except (OSError, ValueError) as e:
+        logger.warning(f"订阅缓存 {path} 读取失败: {e}")
+    return None
+
+def save_http_cache(url, entry, cache_dir=SUBSCRIBE_CACHE_DIR):
+    """写出订阅地址的缓存（先写临时文件再替换）"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = http_cache_path(url, cache_dir)
+    entry = dict(entry, url=url)
+    try:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        logger.error(f"写入订阅缓存 {path} 时出错: {e}")
+
+def read_response_body(response):
+    """读取响应体并按 Content-Encoding 解压"""
+    data = response.read()
+    encoding = (response.headers.get('Content-Encoding') or '').lower()
+    if encoding == 'gzip':
+        data = gzip.decompress(data)
+    elif encoding == 'deflate':
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+    return data
+
+def feed_fingerprint(entry):
+    """订阅源记录的指纹：内容 sha1 和解析版本都相同时，解析出的记录也相同"""
+    return f"{entry.get('sha1')}:{entry.get('parser_version')}"
+
+def cached_records(cached, url, reason, fingerprints=None):
+    """下载不了时退回缓存中上次的记录（可能是旧版本解析的），没有缓存时返回 None"""
+    if not cached:
+        logger.warning(f"{reason}，跳过订阅源: {url}")
+        return None
+    logger.warning(f"{reason}，使用缓存中上次的 {len(cached['records'])} 条记录: {url}")
+    if fingerprints is not None:
+        fingerprints[url] = feed_fingerprint(cached)
+    return cached['records']
+
+def process_url(url, cache_dir=SUBSCRIBE_CACHE_DIR, fingerprints=None):
+    """
+    下载并解析订阅源，返回 [name, url, extra] 记录，失败且没有缓存时返回 None。
+    传入 fingerprints 字典时记下返回记录的指纹 {url: 'sha1:解析版本'}（失败时不记），
+    不需要序列化全部记录就能判断订阅内容是否变化。
+    """
+    logger.info(f"处理URL: {url}")
+    cached = load_http_cache(url, cache_dir) if cache_dir else None
+    # 只有当前版本解析的记录才能在 304 / 内容未变化时直接复用
+    reusable = cached if cached and cached.get('parser_version') == PARSER_VERSION else None
+    breaker = get_breaker()
+    host = url_host(url)
+    if not breaker.allow(host):
+        return cached_records(cached, url, f"主机 {host} 已熔断", fingerprints)
+    try:
+        #other_lines.append(url+",#genre#")  # 存入other_lines便于check 2024-08-02 10:41
+        
+        # 创建一个请求对象并添加自定义header，带上条件请求头和压缩
+        headers = {
+            'User-Agent': 'PostmanRuntime-ApipostRuntime/1.1.0',
+            'Accept-Encoding': 'gzip, deflate',
+        }
+        if reusable:
+            if reusable.get('etag'):
+                headers['If-None-Match'] = reusable['etag']
+            if reusable.get('last_modified'):
+                headers['If-Modified-Since'] = reusable['last_modified']
+        req = urllib.request.Request(url, headers=headers)
+        # 打开URL并读取内容
+        try:
+            response = urllib.request.urlopen(req, timeout=10)
+        except urllib.error.HTTPError as e:
+            breaker.record_success(host)  # 有 HTTP 响应说明主机可达
+            if e.code == 304 and reusable:
+                logger.info(f"订阅源未变化(304)，复用缓存的 {len(reusable['records'])} 条记录: {url}")
+                if fingerprints is not None:
+                    fingerprints[url] = feed_fingerprint(reusable)
+                return reusable['records']
+            raise
+        except urllib.error.URLError as e:
+            # 连接阶段的失败（拒绝连接、超时、DNS 失败）计入熔断
+            breaker.record_failure(host, f"connect: {e.reason}", 'fetch')
+            raise
+        breaker.record_success(host)
+        with response:
+            data = read_response_body(response)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        # 内容与缓存一致时（服务器不支持条件请求的情况）跳过解析
+        digest = hashlib.sha1(data).hexdigest()
+        if reusable and reusable.get('sha1') == digest:
+            logger.info(f"订阅源内容未变化，复用缓存的 {len(reusable['records'])} 条记录: {url}")
+            result = reusable['records']
+        else:
+            # 将二进制数据解码为字符串
+            text = decode_content(data)
+
+            #处理m3u提取channel_name和channel_address
+            if is_m3u_content(text):
+                text=convert_m3u_to_txt(text)
+
+            # 逐行处理内容
+            result = parse_lines(text.split('\n'), 5000)
+
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'sha1': digest,
+            'parser_version': PARSER_VERSION,
+            'fetched_at': time.time(),
+            'records': result,
+        }
+        if cache_dir:
+            save_http_cache(url, entry, cache_dir)
+        if fingerprints is not None:
+            fingerprints[url] = feed_fingerprint(entry)
+        return result
+    except Exception as e:
+        print(f"处理URL时发生错误：{e}")
+        return cached_records(cached, url, "下载失败", fingerprints)
+def process_local(url):
+    logger.info(f"处理URL: {url}")
+    try:
+        if os.path.exists(url):
+            with open(url, 'r', encoding='utf-8') as file:
+                text = file.read()
+            # 逐行处理内容
+            return parse_lines(text.split('\n'), 1000)
+        logger.warning(f"本地源文件 {url} 不存在，跳过。")
+    except Exception as e:
+        print(f"处理URL时发生错误：{e}")
+    return []
+
+def iter_local(path, progress_step=1000):
+    """流式读取本地源文件，逐条产出记录"""
+    logger.info(f"处理URL: {path}")
+    if not os.path.exists(path):
+        logger.warning(f"本地源文件 {path} 不存在，跳过。")
+        return
+    with open(path, 'r', encoding='utf-8') as file:
+        yield from iter_parse_lines(file, progress_step)
+
+
+def fetch_subscriptions(urls, max_workers=DEFAULT_FETCH_WORKERS, deadline=SUBSCRIBE_DEADLINE, fingerprints=None):
+    """
+    并发下载并解析订阅源：每个线程下载完即解析，其它线程同时继续下载，
+    总耗时接近最慢的订阅源而不是全部之和。
+    超过 deadline 秒仍未完成的订阅源放弃，返回值按 urls 顺序排列，放弃或失败的为空列表。
+    fingerprints 见 process_url。
+    截止时还没开始的订阅源直接取消；已经在下载的线程无法中断，会在后台继续运行到结束
+    （urlopen 超时 10 秒，之后还有读取和解析），并照常写出该订阅源的缓存文件（先写临时文件再替换，
+    只影响下次运行）；它们的记录和指纹不会进入本次结果，解释器退出前会等待这些线程结束。
+    """
+    results = [[] for _ in urls]
+    if not urls:
+        return results
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    # 每个订阅源单独记指纹，只采用按时完成的订阅源的指纹（放弃的线程之后仍可能写入）
+    feed_fingerprints = [{} for _ in urls]
+    futures = {executor.submit(process_url, url, SUBSCRIBE_CACHE_DIR, feed_fingerprints[i]): i
+               for i, url in enumerate(urls)}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            i = futures[future]
+            results[i] = future.result() or []
+            if fingerprints is not None:
+                fingerprints.update(feed_fingerprints[i])
+            logger.info(f"订阅源完成 ({time.perf_counter() - start:.1f}s): {urls[i]}，{len(results[i])} 条记录")
+    except FuturesTimeoutError:
+        unfinished = [urls[i] for future, i in futures.items() if not future.done()]
+        logger.warning(f"订阅阶段超过 {deadline}s 截止时间，放弃 {len(unfinished)} 个未完成的订阅源: {unfinished}")
+    finally:
+        # 取消还没开始的订阅源，不等待正在下载的线程（见上）
+        executor.shutdown(wait=False, cancel_futures=True)
+    logger.info(f"{len(urls)} 个订阅源处理完毕，耗时 {time.perf_counter() - start:.1f}s")
+    return results
+
+# 去掉会破坏 CSV 的字符
+FIELD_STRIP_PATTERN = re.compile(r'[\r\n,;"\'\t]')
+
+def strip_field(value):
+    return FIELD_STRIP_PATTERN.sub('', value)
+
+def clean_field(value):
+    """URL 和 extra 字段：去掉会破坏 CSV 的字符后做 HTML 反转义"""
+    return html.unescape(FIELD_STRIP_PATTERN.sub('', value))
+
+@functools.lru_cache(maxsize=1 << 18)
+def canonical_url(url):
+    """
+    URL 的规范形式，只用作去重键（写出的仍是第一次出现的原始 URL）：
+    去掉 $ 之后的内容，协议和主机转小写，省略默认端口，IPv6 地址用压缩写法，
+    查询参数按参数名排序（同名参数保持原顺序）。无法解析时原样返回。
+    """
+    url = url.split('$', 1)[0].strip()
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if not scheme or not host:
+        return url
+    if ':' in host:
+        try:
+            host = ipaddress.ip_address(host).compressed
+        except ValueError:
+            pass
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if '@' in parts.netloc:
+        host = parts.netloc.rsplit('@', 1)[0] + '@' + host
+    query = '&'.join(sorted((p for p in parts.query.split('&') if p), key=lambda p: p.split('=', 1)[0]))
+    return urlunsplit((scheme, host, parts.path or '/', query, parts.fragment))
+
+def map_unique(series, func):
+    """对列中每个不同的值只调用一次 func（空值保持不变）"""
+    values = series.dropna().unique()
+    return series.map(dict(zip(values, map(func, values))))
+
+def deduplicate(data, keep_key=False):
+    """清理字段并按 (频道名, 规范 URL) 去重；keep_key=True 时保留 key 列供后续合并使用"""
+    df = pd.DataFrame(data, columns=['name', 'url', 'extra'])
+    # 字段清理按不同的值计算一次，而不是逐行 apply
+    df['url'] = map_unique(df['url'], clean_field)
+    df['name'] = map_unique(df['name'], strip_field)
+    df['extra'] = map_unique(df['extra'], clean_field)
+    # 按 (频道名, 规范 URL) 去重，同一个流的不同写法只保留第一条
+    df['key'] = map_unique(df['url'], canonical_url)
+    df.drop_duplicates(subset=['name', 'key'], keep='first', inplace=True)
+    if not keep_key:
+        df.drop(columns=['key'], inplace=True)
+    return df
+
+def merge_unique(frames):
+    """
+    按优先级顺序合并已各自去重的 DataFrame（需带 key 列）：
+    后面的表只保留前面没有出现过的 (频道名, 规范 URL)，每条记录只清理、去重一次。
+    """
+    merged = []
+    seen = None
+    for df in frames:
+        keys = pd.MultiIndex.from_frame(df[['name', 'key']])
+        if seen is None:
+            seen = keys
+        else:
+            mask = ~keys.isin(seen)
+            df, seen = df[mask], seen.append(keys[mask])
+        merged.append(df)
+    return pd.concat(merged, ignore_index=True)
+
+def normalize_record(record):
+    """清理一条记录的字段，规则与 deduplicate 相同，供流式模式逐条使用"""
+    name, url, extra = record
+    return strip_field(name), clean_field(url), clean_field(extra)
+
+def dedup_key(name, url):
+    """去重键 (频道名, 规范 URL)；保存完整的值而不是哈希，不同的记录不会因为哈希碰撞被当成重复丢掉"""
+    return name, canonical_url(url)
+
+def iter_unique(records, seen=None):
+    """流式去重，保留首次出现的记录；可传入共享的 seen 集合跨多个来源去重"""
+    seen = set() if seen is None else seen
+    for record in records:
+        key = dedup_key(record[0], record[1])
+        if key not in seen:
+            seen.add(key)
+            yield record
+
+# def save_df(df, path):
+#     logger.info(f"有{len(df)}条数据待写出")
+#     df.to_csv(path, index=False, header=False, encoding='utf-8')
+#     logger.info(f"数据已写出到 {path}")
+
+@contextlib.contextmanager
+def atomic_writer(path):
+    """
+    先写到同目录下的临时文件，成功后用 os.replace 原子替换目标文件；
+    写出过程中出错时删除临时文件，原来的文件保持不变。
+    """
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def save_df(df, path):
+    chunk_size = 50000
+    total_rows = len(df)
+    logger.info(f"有 {total_rows} 条数据待写出")
+
+    # 同一个文件句柄分块写入，全部写完后才替换目标文件，中途失败不会留下不完整的文件
+    num_chunks = (total_rows + chunk_size - 1) // chunk_size  # 向上取整
+    with atomic_writer(path) as f:
+        for i in range(num_chunks):
+            start_row = i * chunk_size
+            end_row = min(start_row + chunk_size, total_rows)
+            df.iloc[start_row:end_row].to_csv(f, index=False, header=False, lineterminator='\n')
+            logger.info(f"数据分段 {i+1}/{num_chunks} 已写入 {path}")
+
+    logger.info(f"全部数据已写出到 {path}")
+
+# 本地源，按优先级排列
+LOCAL_SOURCE_PATHS = (
+    os.path.join("config", "user_result.txt"),
+    os.path.join("config", "localsource.txt"),
+    os.path.join("output", "ownsource.txt"),
+)
+
+def subscription_urls(subscribe_path=os.path.join("config", "subscribe.txt")):
+    """subscribe.txt 中的订阅地址"""
+    return [url for url in read_txt_to_array(subscribe_path) if url.startswith("http")]
+
+def fetch_subscription_feeds(subscribe_path=os.path.join("config", "subscribe.txt"), fingerprints=None):
+    """读取 subscribe.txt 中的订阅地址并并发下载，返回按地址顺序排列的记录列表；fingerprints 见 process_url"""
+    return fetch_subscriptions(subscription_urls(subscribe_path), fingerprints=fingerprints)
+
+def iter_local_records(local_paths=LOCAL_SOURCE_PATHS):
+    """按优先级产出本地源中清理过、去重后的记录"""
+    for path in local_paths:
+        yield from map(normalize_record, iter_local(path))
+
+def iter_origin_records(feeds, feed_urls, local_paths=LOCAL_SOURCE_PATHS):
+    """
+    按优先级（本地源在前、订阅源按地址顺序）产出清理过的记录 (name, url, extra, 来源)，不去重。
+    来源为本地源的文件名（如 user_result、ownsource）或订阅地址。
+    """
+    for path in local_paths:
+        origin = os.path.splitext(os.path.basename(path))[0]
+        for record in map(normalize_record, iter_local(path)):
+            yield (*record, origin)
+    for feed_url, records in zip(feed_urls, feeds):
+        for record in map(normalize_record, records or ()):
+            yield (*record, feed_url)
+
+def iter_net_records(feeds, all_seen):
+    """
+    逐个订阅源产出订阅源内首次出现的记录 (name, url, extra, 是否首次出现在总集中)，
+    all_seen 为总集已有记录的去重键集合，会被更新。订阅源用完即释放。
+    """
+    net_seen = set()
+    for i in range(len(feeds)):
+        records, feeds[i] = feeds[i], None
+        for name, url, extra in iter_unique(map(normalize_record, records), net_seen):
+            key = dedup_key(name, url)
+            new_in_all = key not in all_seen
+            if new_in_all:
+                all_seen.add(key)
+            yield name, url, extra, new_in_all
+
+def combine_sources_stream(feeds=None, binary=False):
+    """
+    流式模式：记录逐条经过解析、清理、去重后直接写出 netsource.txt 和 allsource.txt，
+    不构建 DataFrame。优先级与 combine_sources 相同：user_result、localsource、ownsource、订阅源。
+    本地源逐行读取；订阅源是下载解析好的记录列表（feeds 全部在内存中），逐个源写出后释放。
+    binary=True 时另外写出二进制格式的 allsource.bin。
+    netsource.txt 写出失败时与默认模式相同，allsource.txt 只保留本地源。
+    """
+    logger.info("开始执行模块2（流式模式）：读取订阅源")
+    if feeds is None:
+        feeds = fetch_subscription_feeds()
+    errorflag = False
+    all_seen = set()
+    all_count = 0
+    net_count = 0
+
+    all_path = os.path.join("output", "allsource.txt")
+    net_path = os.path.join("output", "netsource.txt")
+    bin_writer = RecordWriter(binary_path(all_path)) if binary else None
+    with atomic_writer(all_path) as all_file:
+        all_writer = csv.writer(all_file, lineterminator='\n')
+        for name, url, _ in iter_unique(iter_local_records(), all_seen):
+            all_writer.writerow([name, url])
+            all_count += 1
+            if bin_writer is not None:
+                bin_writer.add(name, url)
+        # 网络源写出失败时退回到只有本地源的位置
+        local_end, local_count = all_file.tell(), all_count
+        bin_mark = bin_writer.mark() if bin_writer is not None else None
+
+        try:
+            with atomic_writer(net_path) as net_file:
+                net_writer = csv.writer(net_file, lineterminator='\n')
+                for name, url, extra, new_in_all in iter_net_records(feeds, all_seen):
+                    net_writer.writerow([name, url, extra])
+                    net_count += 1
+                    if new_in_all:
+                        all_writer.writerow([name, url])
+                        all_count += 1
+                        if bin_writer is not None:
+                            bin_writer.add(name, url)
+        except Exception as e:
+            logger.error(f"网络源写出失败:{e}")
+            errorflag = True
+            all_file.seek(local_end)
+            all_file.truncate()
+            all_count = local_count
+            net_count = 0
+            if bin_writer is not None:
+                bin_writer.truncate(bin_mark)
+    if bin_writer is not None:
+        bin_writer.close()
+
+    logger.info(f"网络源 {net_count} 条已写出到 {net_path}，全部源 {all_count} 条已写出到 {all_path}")
+    logger.info("模块2执行完毕")
+    return errorflag
+
+def combine_sources(stream=False, feeds=None, binary=False):
+    """
+    feeds 为已下载的订阅源记录（fetch_subscription_feeds 的返回值），为 None 时在这里下载；
+    binary=True 时另外写出二进制格式的 allsource.bin，供模块3/4读取。
+    """
+    if stream:
+        return combine_sources_stream(feeds, binary)
+    logger.info("开始执行模块2：读取订阅源")
+    if feeds is None:
+        feeds = fetch_subscription_feeds()
+    net_data=[]
+    # 并发下载解析，结果按 subscribe.txt 中的顺序合并
+    for records in feeds:
+        net_data+=records
+    net_df = deduplicate(net_data, keep_key=True)
+    del net_data
+
+    # 读取本地源（优先级：user_result、localsource、ownsource）
+    local_data = []
+    for path in LOCAL_SOURCE_PATHS:
+        local_data += process_local(path)
+    local_df = deduplicate(local_data, keep_key=True)
+    errorflag=False
+
+    
+    try:
+        save_df(net_df.drop(columns=['key']), os.path.join("output", "netsource.txt"))
+    except Exception as e: 
+        logger.error(f"网络源写出失败:{e}")
+        errorflag=True
+        with open(os.path.join("output", "netsource_log.csv"), 'w', encoding='gbk', errors='replace') as f:
+            for _, row in net_df.iterrows():
+                f.write(f"{row['name']},{row['url']},{row['extra']}\n")
+        
+    
+    # 合并所有源：本地源在前，网络源只补充本地源中没有的条目
+    if errorflag:
+        all_df = local_df
+    else:
+        all_df = merge_unique([local_df, net_df])
+    all_df = all_df.drop(columns=['key', 'extra'])
+    try:
+        save_df(all_df, os.path.join("output", "allsource.txt"))
+        if binary:
+            write_records(binary_path(os.path.join("output", "allsource.txt")), zip(all_df['name'], all_df['url']))
+    except Exception as e: 
+        logger.error(f"网络源写出失败:{e}")
+        with open(os.path.join("output", "allsource_log.txt"), 'w', encoding='gbk', errors='replace') as f:
+            for _, row in all_df.iterrows():
+                f.write(f"{row['name']},{row['url']}\n")
+    logger.info("模块2执行完毕")
+    return errorflag
+if __name__ == '__main__':
+
+    combine_sources()
+
+
+# import pandas as pd
+# import requests
+# import os
+# import logging
+# from urllib.parse import urlparse
+
+# # --- 配置日志 ---
+# logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# logger = logging.getLogger(__name__)
+
+# def read_sources(file_path):
+#     data = []
+#     if not os.path.exists(file_path):
+#         return data
+#     with open(file_path, 'r', encoding='utf-8') as f:
+#         for line in f:
+#             line = line.strip()
+#             if not line or line.startswith('#') or ',#genre#' in line:
+#                 continue
+#             parts = line.split(',', 1)
+#             name = parts[0].strip()
+#             url = parts[1].strip() if len(parts) > 1 else ''
+#             extra = ''
+#             if '$' in url:
+#                 url, extra = url.split('$', 1)
+#             data.append([name, url.strip(), extra.strip()])
+#     return data
+
+# def read_subscribe_sources(subscribe_path):
+#     data = []
+#     with open(subscribe_path, 'r', encoding='utf-8') as f:
+        
+#         for line in f:
+#             line = line.strip()
+#             if not line or line.startswith('#'):
+#                 continue
+#             try:
+#                 response = requests.get(line, timeout=10)
+#                 if 'm3u' in urlparse(line).path.lower():
+#                     logger.info(f"检测到M3U源{line}，即将处理")
+#                     # M3U 格式解析
+#                     lines = response.text.splitlines()
+#                     i = 0
+#                     while i < len(lines):
+#                         if lines[i].startswith('#EXTINF'):
+#                             info = lines[i]
+#                             url = lines[i+1]
+#                             name = info.split(',')[-1].strip()
+#                             data.append([name, url.strip(), ''])
+#                             i += 2
+#                         else:
+#                             i += 1
+#                 else:
+#                     # TXT 格式解析
+#                     for line in response.text.splitlines():
+#                         line = line.strip()
+#                         if not line or line.startswith('#') or ',#genre#' in line:
+#                             continue
+#                         if '\t' in line:
+#                             parts = line.split('\t')
+#                             for part in parts:
+#                                 p = part.strip()
+#                                 if ',' in p:
+#                                     name, url = p.split(',', 1)
+#                                     extra = ''
+#                                     if '$' in url:
+#                                         url, extra = url.split('$', 1)
+#                                     data.append([name.strip(), url.strip(), extra.strip()])
+#                         else:
+#                             if ',' in line:
+#                                 name, url = line.split(',', 1)
+#                                 extra = ''
+#                                 if '$' in url:
+#                                     url, extra = url.split('$', 1)
+#                                 data.append([name.strip(), url.strip(), extra.strip()])
+#             except Exception as e:
+#                 logger.error(f"订阅源读取失败: {line} - {e}")
+#         logger.info(f"订阅源已处理完毕")
+#     return data
+
+# def deduplicate(data):
+#     df = pd.DataFrame(data, columns=['name', 'url', 'extra'])
+#     #df['url'] = df['url'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+#     #df['name'] = df['name'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+#     #df['extra'] = df['extra'].str.replace('\r', '', regex=False).str.replace('\n', '', regex=False).str.replace(',', '', regex=False).str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+#     df.drop_duplicates(subset=['name', 'url'], keep='first', inplace=True)
+#     return df
+
+# def save_df(df, path):
+#     df.to_csv(path, index=False, header=False, encoding='utf-8')
+    
+# def combine_sources():
+#     logger.info("开始执行模块2：读取订阅源")
+#     # 读取本地源
+#     #result_data = read_sources(r'.\config\user_result.txt')
+#     result_data = read_sources(os.path.join("config", "user_result.txt"))
+#     #local_data = read_sources(r'.\config\localsource.txt')
+#     local_data = read_sources(os.path.join("config", "localsource.txt"))
+#     #own_data = read_sources(r'.\output\ownsource.txt')
+#     own_data = read_sources(os.path.join("output", "ownsource.txt"))
+    
+#     # 读取在线源
+#     #net_data = read_subscribe_sources(r'.\config\subscribe.txt')
+#     net_data = read_subscribe_sources(os.path.join("config", "subscribe.txt"))
+#     net_df = deduplicate(net_data)
+#     #save_df(net_df, r'.\output\netsource.txt')
+#     text = '\n'.join(net_df.apply(lambda row: f"{row['name']}|{row['url']}|{row['extra']}", axis=1))
+#     with open(os.path.join("output", "netsource_log.txt"), 'w', encoding='utf-8') as f:
+#         f.write(text)
+#     save_df(net_df, os.path.join("output", "netsource.txt"))
+
+    
+#     # 合并所有源
+#     all_data = result_data + local_data + own_data + net_data
+#     all_df = deduplicate(all_data)
+#     # all_df['combined'] = all_df.apply(
+#     # lambda row: f"{row['name']},{row['url']}${row['extra']}",
+#     # axis=1
+#     # )
+#     all_df.drop(columns=['extra'], inplace=True)
+#     #save_df(all_df, r'.\output\allsource.txt')
+#     save_df(all_df, os.path.join("output", "allsource.txt"))
+#     logger.info("模块2执行完毕")
+# if __name__ == '__main__':
+
+#     combine_sources()
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
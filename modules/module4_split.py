@@ -1,128 +1,292 @@
-# modules/module3_split.py
-
-# import os
-# import pandas as pd
-
-# def split_channels():
-#     # 读取频道字典
-#     channel_dict = {}
-#     with open(r'.\config\othernames.txt', 'r', encoding='utf-8') as f:
-#         for line in f:
-#             if line.startswith('[') and ':' in line:
-#                 channel, names = line.strip().split(':', 1)
-#                 channel = channel.strip('[]')
-#                 names = [n.strip() for n in names.split(',')]
-#                 channel_dict[channel] = names
-
-#     # 创建输出目录
-#     os.makedirs(r'.\output\channels', exist_ok=True)
-
-#     # 读取 allsource.txt
-#     df = pd.read_csv(r'.\output\allsource.txt', header=None, names=['name', 'url', 'extra'])
-
-#     # 拆分频道
-#     for channel, names in channel_dict.items():
-#         mask = df['name'].isin(names)
-#         sub_df = df[mask]
-#         sub_df['name'] = channel
-#         sub_df.to_csv(f'.\\output\\channels\\{channel}.txt', index=False, header=False, encoding='utf-8')
-
-# if __name__ == '__main__':
-#     split_channels()
-
-# modules/module3_split.py
-
-import os
-import pandas as pd
-
-def split_channels():
-    # 读取频道字典
-    channel_dict = {}
-    # --- 假设 othernames.txt 在 config 目录下 ---
-    # othernames_path = 'config/othernames.txt' 
-    othernames_path = os.path.join("config", "othernames.txt")
-    if os.path.exists(othernames_path):
-        with open(othernames_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('[') and ':' in line:
-                    # 安全地分割，处理可能没有 ':' 的情况
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        channel_part, names_part = parts
-                        # 去除 '[' 和 ']' 并 strip
-                        channel = channel_part.strip('[]').strip()
-                        # 分割名称并去除每个名称的空格
-                        names = [n.strip() for n in names_part.split(',') if n.strip()]
-                        if channel: # 确保 channel 名称非空
-                            channel_dict[channel] = names
-    else:
-        print(f"警告: 文件 {othernames_path} 未找到。跳过频道拆分。")
-        return # 如果文件不存在，直接返回
-
-    # 检查 allsource.txt 是否存在
-    #allsource_path = 'output/allsourcecleaned.txt'
-    allsource_path = os.path.join("output", "allsourcecleaned.txt")
-    if not os.path.exists(allsource_path):
-        print(f"警告: 文件 {allsource_path} 未找到。无法进行频道拆分。")
-        return
-
-    # 读取 allsource.txt
-    try:
-        df = pd.read_csv(allsource_path, header=None, names=['name', 'url', 'extra'])
-    except pd.errors.EmptyDataError:
-        print(f"警告: 文件 {allsource_path} 为空。")
-        return
-    except Exception as e:
-        print(f"错误: 读取文件 {allsource_path} 失败: {e}")
-        return
-
-    # 创建输出目录
-    #os.makedirs('output/channels', exist_ok=True)
-    os.makedirs(os.path.join("output", "channels"), exist_ok=True)
-    # --- 核心修改部分：使用 .loc 避免 SettingWithCopyWarning ---
-    # 创建一个空的列表来存储所有需要保存的子 DataFrame
-    results_to_save = []
-
-    # 遍历频道字典
-    for channel, names in channel_dict.items():
-        if not names: # 如果 names 列表为空，跳过
-            continue
-            
-        # 创建布尔掩码
-        mask = df['name'].isin(names)
-        
-        # 使用 .loc 和 .copy() 明确创建一个副本
-        # 这样可以确保后续操作不会影响原始 df，并且消除警告
-        sub_df = df.loc[mask].copy() 
-        
-        if not sub_df.empty:
-            # 在副本上安全地修改 'name' 列
-            sub_df.loc[:, 'name'] = channel
-            
-            # 将处理好的 DataFrame 添加到列表中
-            results_to_save.append((channel, sub_df))
-        else:
-            print(f"信息: 频道 '{channel}' 在 allsource.txt 中未找到对应条目。")
-
-    # 循环结束后，统一保存所有结果
-    for channel, sub_df_to_save in results_to_save:
-        #output_file_path = f'output/channels/{channel}.txt'
-        output_file_path = os.path.join(os.path.join("output","channels"), f"{channel}.txt")
-        try:
-            # 保存到文件，不包含索引和列头
-            sub_df_to_save.drop(columns=['extra'], inplace=True)  # 如果不需要 extra 列，可以删除
-            sub_df_to_save['url'] = sub_df_to_save['url'].str.split('$').str[0]  #去频道名
-            sub_df_to_save.drop_duplicates(subset=['url'], inplace=True)  # 可选：去重
-            sub_df_to_save.to_csv(output_file_path, index=False, header=False, encoding='utf-8')
-            print(f"信息: 已保存频道 '{channel}' 的条目到 {output_file_path}")
-        except Exception as e:
-            print(f"错误: 保存文件 {output_file_path} 失败: {e}")
-
-    print("频道拆分完成。")
-
-if __name__ == '__main__':
-
-    split_channels()
-
-
+# modules/module3_split.py
+
+# import os
+# import pandas as pd
+
+# def split_channels():
+#     # 读取频道字典
+#     channel_dict = {}
+#     with open(r'.\config\othernames.txt', 'r', encoding='utf-8') as f:
+#         for line in f:
+#             if line.startswith('[') and ':' in line:
+#                 channel, names = line.strip().split(':', 1)
+#                 channel = channel.strip('[]')
+#                 names = [n.strip() for n in names.split(',')]
+#                 channel_dict[channel] = names
+
+#     # 创建输出目录
+#     os.makedirs(r'.\output\channels', exist_ok=True)
+
+#     # 读取 allsource.txt
+#     df = pd.read_csv(r'.\output\allsource.txt', header=None, names=['name', 'url', 'extra'])
+
+#     # 拆分频道
+#     for channel, names in channel_dict.items():
+#         mask = df['name'].isin(names)
+#         sub_df = df[mask]
+#         sub_df['name'] = channel
+#         sub_df.to_csv(f'.\\output\\channels\\{channel}.txt', index=False, header=False, encoding='utf-8')
+
+# if __name__ == '__main__':
+#     split_channels()
+
+# modules/module3_split.py
+
+import os
+import csv
+from collections import OrderedDict
+
+try:
+    from modules.binfmt import RecordFile, binary_path
+except ImportError:  # 直接运行本脚本时
+    from binfmt import RecordFile, binary_path
+
+# 流式拆分时同时打开的频道文件数上限
+MAX_OPEN_FILES = 64
+
+class FileHandlePool:
+    """
+    按 LRU 复用的频道输出文件句柄池，最多同时打开 max_open 个文件。
+    文件第一次打开时截断写入，被换出后再次打开时追加写入。
+    """
+
+    def __init__(self, output_dir, max_open=MAX_OPEN_FILES):
+        self.output_dir = output_dir
+        self.max_open = max(1, max_open)
+        self.handles = OrderedDict()  # 频道 -> (文件, csv writer)
+        self.created = set()
+        self.reopened = 0
+
+    def writer(self, channel):
+        entry = self.handles.get(channel)
+        if entry is not None:
+            self.handles.move_to_end(channel)
+            return entry[1]
+        if len(self.handles) >= self.max_open:
+            _, (old, _) = self.handles.popitem(last=False)
+            old.close()
+        mode = 'a' if channel in self.created else 'w'
+        if mode == 'a':
+            self.reopened += 1
+        out = open(os.path.join(self.output_dir, f"{channel}.txt"), mode, encoding='utf-8', newline='')
+        self.created.add(channel)
+        writer = csv.writer(out, lineterminator='\n')
+        self.handles[channel] = (out, writer)
+        return writer
+
+    def close(self):
+        while self.handles:
+            _, (out, _) = self.handles.popitem()
+            out.close()
+
+def load_channel_dict(othernames_path):
+    """读取频道别名文件，返回 {频道: [别名, ...]}；文件不存在时返回 None"""
+    channel_dict = {}
+    if os.path.exists(othernames_path):
+        with open(othernames_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('[') and ':' in line:
+                    # 安全地分割，处理可能没有 ':' 的情况
+                    parts = line.split(':', 1)
+                    if len(parts) == 2:
+                        channel_part, names_part = parts
+                        # 去除 '[' 和 ']' 并 strip
+                        channel = channel_part.strip('[]').strip()
+                        # 分割名称并去除每个名称的空格
+                        names = [n.strip() for n in names_part.split(',') if n.strip()]
+                        if channel: # 确保 channel 名称非空
+                            channel_dict[channel] = names
+    else:
+        print(f"警告: 文件 {othernames_path} 未找到。跳过频道拆分。")
+        return None
+    return channel_dict
+
+def build_alias_index(channel_dict):
+    """由频道字典构建 别名 -> 频道列表 的索引（同一别名可能属于多个频道）"""
+    alias_channels = {}
+    for channel, names in channel_dict.items():
+        for name in names:
+            channels = alias_channels.setdefault(name, [])
+            if channel not in channels:
+                channels.append(channel)
+    return alias_channels
+
+def iter_split(rows, channel_dict, seen_urls):
+    """
+    按别名把 (name, url) 行分到频道，逐条产出 (频道, URL)。
+    每个频道用 seen_urls[频道] 集合去重（URL 中 $ 之后的内容去掉），seen_urls 会被更新。
+    """
+    alias_channels = build_alias_index(channel_dict)
+    for row in rows:
+        if len(row) < 2:
+            continue
+        channels = alias_channels.get(row[0])
+        if not channels:
+            continue
+        url = row[1].split('$')[0] #去频道名
+        for channel in channels:
+            seen = seen_urls.setdefault(channel, set())
+            if url not in seen:
+                seen.add(url)
+                yield channel, url
+
+def report_split(channel_dict, counts):
+    for channel in channel_dict:
+        if channel in counts:
+            print(f"信息: 已保存频道 '{channel}' 的 {counts[channel]} 条条目")
+        elif channel_dict[channel]:
+            print(f"信息: 频道 '{channel}' 在 allsource.txt 中未找到对应条目。")
+
+def split_channels_stream(allsource_path, channel_dict, output_dir, max_open=MAX_OPEN_FILES):
+    """
+    流式拆分：逐行读取 allsourcecleaned.txt，按别名查到频道后直接追加写入频道文件，
+    每个频道用一个 URL 集合去重（URL 中 $ 之后的内容去掉）。
+    打开的文件句柄由 FileHandlePool 限制，内存只与各频道不同 URL 的数量有关。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pool = FileHandlePool(output_dir, max_open)
+    seen_urls = {}  # 频道 -> 已写出的 URL 集合
+    try:
+        with open(allsource_path, 'r', encoding='utf-8', newline='') as f:
+            for channel, url in iter_split(csv.reader(f), channel_dict, seen_urls):
+                pool.writer(channel).writerow([channel, url])
+    finally:
+        pool.close()
+
+    if pool.reopened:
+        print(f"信息: 文件句柄池上限 {pool.max_open}，共重新打开 {pool.reopened} 次频道文件")
+    report_split(channel_dict, {channel: len(urls) for channel, urls in seen_urls.items()})
+
+def split_channels_binary(records_path, channel_dict, output_dir, max_open=MAX_OPEN_FILES):
+    """
+    二进制模式：按 allsourcecleaned.bin 的名称表先算出哪些名称编号属于某个频道，
+    只解码这些行的 URL，其余行直接跳过；输出与流式拆分相同。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pool = FileHandlePool(output_dir, max_open)
+    seen_urls = {}  # 频道 -> 已写出的 URL 集合
+    try:
+        with RecordFile(records_path) as records:
+            alias_index = build_alias_index(channel_dict)
+            wanted = {i for i, name in enumerate(records.names) if name in alias_index}
+            for channel, url in iter_split(records.iter_rows(wanted), channel_dict, seen_urls):
+                pool.writer(channel).writerow([channel, url])
+    finally:
+        pool.close()
+
+    if pool.reopened:
+        print(f"信息: 文件句柄池上限 {pool.max_open}，共重新打开 {pool.reopened} 次频道文件")
+    report_split(channel_dict, {channel: len(urls) for channel, urls in seen_urls.items()})
+
+def split_dataframe(df, channel_dict):
+    """
+    DataFrame 模式的拆分（不写文件）：返回 {频道: DataFrame(name, url)}，
+    name 列改为频道名，URL 去掉 $ 之后的内容并在频道内去重；只包含有记录的频道。
+    """
+    # 一次遍历：用 别名 -> 频道 索引给每行标上所属频道，再按频道分组
+    # （不再对每个频道都扫描一遍整个 DataFrame）
+    alias_index = build_alias_index(channel_dict)
+    matched = df.assign(channel=df['name'].map(alias_index)).dropna(subset=['channel'])
+    # 同一别名属于多个频道时，explode 把该行复制给每个频道
+    matched = matched.explode('channel')
+    groups = matched.groupby('channel', sort=False).indices  # 频道 -> 行位置
+
+    channel_frames = {}
+    for channel, names in channel_dict.items():
+        positions = groups.get(channel)
+        if not names or positions is None:
+            continue
+        sub_df = matched.iloc[positions].drop(columns=['channel', 'extra'])
+        sub_df['name'] = channel
+        sub_df['url'] = sub_df['url'].str.split('$').str[0]  #去频道名
+        sub_df.drop_duplicates(subset=['url'], inplace=True)
+        channel_frames[channel] = sub_df
+    return channel_frames
+
+def split_channels(stream=False, binary=False):
+    """模块4的入口函数：成功时返回 True，缺少输入文件或读写出错时返回 False"""
+    # 读取频道字典
+    # --- 假设 othernames.txt 在 config 目录下 ---
+    # othernames_path = 'config/othernames.txt' 
+    othernames_path = os.path.join("config", "othernames.txt")
+    channel_dict = load_channel_dict(othernames_path)
+    if channel_dict is None:
+        return False # 如果文件不存在，直接返回
+
+    # 检查 allsource.txt 是否存在
+    #allsource_path = 'output/allsourcecleaned.txt'
+    allsource_path = os.path.join("output", "allsourcecleaned.txt")
+    if not os.path.exists(allsource_path):
+        print(f"警告: 文件 {allsource_path} 未找到。无法进行频道拆分。")
+        return False
+
+    if binary:
+        records_path = binary_path(allsource_path)
+        if not os.path.exists(records_path):
+            print(f"警告: 文件 {records_path} 未找到。无法进行频道拆分。")
+            return False
+        try:
+            split_channels_binary(records_path, channel_dict, os.path.join("output", "channels"))
+        except Exception as e:
+            print(f"错误: 拆分文件 {records_path} 失败: {e}")
+            return False
+        print("频道拆分完成。")
+        return True
+
+    if stream:
+        try:
+            split_channels_stream(allsource_path, channel_dict, os.path.join("output", "channels"))
+        except Exception as e:
+            print(f"错误: 拆分文件 {allsource_path} 失败: {e}")
+            return False
+        print("频道拆分完成。")
+        return True
+
+    # 只有 DataFrame 模式才需要 pandas
+    import pandas as pd
+
+    # 读取 allsource.txt
+    try:
+        df = pd.read_csv(allsource_path, header=None, names=['name', 'url', 'extra'])
+    except pd.errors.EmptyDataError:
+        print(f"警告: 文件 {allsource_path} 为空。")
+        return False
+    except Exception as e:
+        print(f"错误: 读取文件 {allsource_path} 失败: {e}")
+        return False
+
+    # 创建输出目录
+    #os.makedirs('output/channels', exist_ok=True)
+    os.makedirs(os.path.join("output", "channels"), exist_ok=True)
+
+    channel_frames = split_dataframe(df, channel_dict)
+
+    # 按频道字典的顺序逐个频道写出
+    ok = True
+    for channel, names in channel_dict.items():
+        if not names: # 如果 names 列表为空，跳过
+            continue
+        sub_df_to_save = channel_frames.get(channel)
+        if sub_df_to_save is None:
+            print(f"信息: 频道 '{channel}' 在 allsource.txt 中未找到对应条目。")
+            continue
+
+        #output_file_path = f'output/channels/{channel}.txt'
+        output_file_path = os.path.join(os.path.join("output","channels"), f"{channel}.txt")
+        try:
+            # 保存到文件，不包含索引和列头
+            sub_df_to_save.to_csv(output_file_path, index=False, header=False, encoding='utf-8')
+            print(f"信息: 已保存频道 '{channel}' 的条目到 {output_file_path}")
+        except Exception as e:
+            print(f"错误: 保存文件 {output_file_path} 失败: {e}")
+            ok = False
+
+    print("频道拆分完成。")
+    return ok
+
+if __name__ == '__main__':
+
+    split_channels()
+
+
@@ -1,129 +1,229 @@
-# modules/module5_pick.py
-
-import os
-import logging
-
-# --- 配置日志 ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-def load_whitelist(whitelist_path):
-    """从文件加载白名单"""
-    whitelist = set()
-    if not os.path.exists(whitelist_path):
-        logger.warning(f"白名单文件 {whitelist_path} 未找到，将不执行任何优选。")
-        return whitelist
-
-    try:
-        with open(whitelist_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                # 跳过空行和注释行
-                if line and not line.startswith('#'):
-                    # 存入小写形式，方便不区分大小写的匹配
-                    whitelist.add(line.lower())
-        logger.info(f"已从 {whitelist_path} 加载 {len(whitelist)} 个白名单关键词。")
-    except Exception as e:
-        logger.error(f"读取白名单文件 {whitelist_path} 时出错: {e}")
-    return whitelist
-
-def is_line_wanted(line, whitelist):
-    """检查一行是否包含白名单词汇"""
-    if not whitelist:
-        logger.debug("白名单为空，所有行都将被丢弃。")
-        return False # 如果白名单为空，则没有行是“想要的”
-
-    line_lower = line.lower()
-    for keyword in whitelist:
-        if keyword in line_lower:
-            return True # 找到一个白名单词，此行是我们想要的
-    return False # 遍历完所有白名单词都没找到，此行不想要
-
-def pick_sources_for_channel(channel_name, whitelist, channels_dir):
-    """对单个频道进行优选"""
-    input_file = os.path.join(channels_dir, f"{channel_name}.txt")
-    output_file = os.path.join(channels_dir, f"{channel_name}_picked.txt")
-
-    if not os.path.exists(input_file):
-        logger.info(f"频道文件 {input_file} 不存在，跳过。")
-        return
-
-    picked_lines = []
-    total_lines = 0
-    picked_lines_count = 0
-
-    try:
-        with open(input_file, 'r', encoding='utf-8') as infile:
-            for line in infile:
-                total_lines += 1
-                # 去除行尾换行符进行处理
-                line_content = line.rstrip('\n\r')
-                # 检查行是否为空
-                if not line_content:
-                     continue
-
-                # 应用白名单筛选
-                if is_line_wanted(line_content, whitelist):
-                    picked_lines.append(line) # 保留原始换行符
-                    picked_lines_count += 1
-
-        # 写入选优后的文件
-        with open(output_file, 'w', encoding='utf-8') as outfile:
-            outfile.writelines(picked_lines)
-
-        logger.info(f"频道 '{channel_name}' 优选完成: 处理 {total_lines} 行，保留 {picked_lines_count} 行。")
-
-    except Exception as e:
-        logger.error(f"处理频道 '{channel_name}' 时出错: {e}")
-
-def load_channels_list(channels_path):
-    """从 channels.txt 加载频道列表"""
-    channels = []
-    if not os.path.exists(channels_path):
-        logger.error(f"频道列表文件 {channels_path} 未找到。")
-        return channels
-
-    try:
-        with open(channels_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                # 跳过空行和注释行
-                if line and (not line.startswith('#')) and (not (',#genre#' in line)) :
-                    channels.append(line)
-        logger.info(f"已从 {channels_path} 加载 {len(channels)} 个频道。")
-    except Exception as e:
-        logger.error(f"读取频道列表文件 {channels_path} 时出错: {e}")
-    return channels
-
-def main():
-    """模块5的入口函数"""
-    whitelist_file = os.path.join("config", "whitelist.txt")
-    #channels_list_file = os.path.join("config", "channels.txt")
-    channels_list_file = os.path.join("config", "user_demo.txt")
-    channels_output_dir = os.path.join("output", "channels")
-
-    logger.info("开始执行模块5：优选频道信号源")
-
-    # 1. 加载白名单
-    whitelist = load_whitelist(whitelist_file)
-    if not whitelist:
-        logger.warning("白名单为空，所有频道的信号源将被丢弃。")
-    # 2. 加载频道列表
-    channel_names = load_channels_list(channels_list_file)
-
-    if not channel_names:
-        logger.warning("没有有效的频道需要处理。")
-        return
-
-    # 3. 对每个频道执行优选
-    for channel in channel_names:
-        pick_sources_for_channel(channel, whitelist, channels_output_dir)
-
-    logger.info("模块5执行完毕。")
-
-# 如果直接运行此脚本，则执行 main 函数
-if __name__ == "__main__":
-
-    main()
-
-
+# modules/module5_pick.py
+
+import os
+import heapq
+import logging
+from collections import Counter
+
+try:
+    from modules.url_rules import UrlRuleIndex, load_rules
+    from modules.circuit_breaker import url_host
+    from modules.probe_cache import PROBE_RESULTS_FILE, load_probe_results
+except ImportError:  # 直接运行本脚本时
+    from url_rules import UrlRuleIndex, load_rules
+    from circuit_breaker import url_host
+    from probe_cache import PROBE_RESULTS_FILE, load_probe_results
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 打分模式：每个频道保留的 URL 数、同一主机最多保留的 URL 数
+PICK_TOP_K = 10
+PICK_PER_HOST = 2
+# 打分权重：命中白名单、探测可用、探测失败（扣分）、首字节时间、下载速率
+WHITELIST_WEIGHT = 100
+ALIVE_WEIGHT = 50
+DEAD_PENALTY = 50
+TTFB_WEIGHT = 30
+TTFB_WORST_MS = 3000
+THROUGHPUT_WEIGHT = 20
+THROUGHPUT_GOOD_KBPS = 4000
+
+def load_whitelist(whitelist_path):
+    """从文件加载白名单，返回按主机索引的规则匹配器（不区分大小写）"""
+    if not os.path.exists(whitelist_path):
+        logger.warning(f"白名单文件 {whitelist_path} 未找到，将不执行任何优选。")
+        return UrlRuleIndex([])
+
+    try:
+        whitelist = load_rules(whitelist_path)
+        logger.info(f"已从 {whitelist_path} 加载 {len(whitelist)} 条白名单规则（{whitelist.host_rule_count} 条按主机索引）。")
+        return whitelist
+    except Exception as e:
+        logger.error(f"读取白名单文件 {whitelist_path} 时出错: {e}")
+        return UrlRuleIndex([])
+
+def find_wanted(line, whitelist):
+    """返回行中命中的白名单关键词，没有命中返回 None"""
+    if not whitelist:
+        logger.debug("白名单为空，所有行都将被丢弃。")
+        return None # 如果白名单为空，则没有行是“想要的”
+    return whitelist.search(line)
+
+def is_line_wanted(line, whitelist):
+    """检查一行是否包含白名单词汇"""
+    return find_wanted(line, whitelist) is not None
+
+def pick_sources_for_channel(channel_name, whitelist, channels_dir, hits=None,
+                             probe_results=None, top_k=None, per_host=PICK_PER_HOST):
+    """
+    对单个频道进行优选。
+    top_k 为 None 时保留所有命中白名单的行；否则进入打分模式，
+    结合白名单和探测结果（probe_results）按得分保留前 top_k 行，快的排在前面。
+    处理出错时返回 False。
+    """
+    input_file = os.path.join(channels_dir, f"{channel_name}.txt")
+    output_file = os.path.join(channels_dir, f"{channel_name}_picked.txt")
+
+    if not os.path.exists(input_file):
+        logger.info(f"频道文件 {input_file} 不存在，跳过。")
+        return True
+
+    try:
+        with open(input_file, 'r', encoding='utf-8') as infile:
+            picked_lines = pick_lines(channel_name, infile, whitelist, hits, probe_results, top_k, per_host)
+
+        # 写入选优后的文件
+        with open(output_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(picked_lines)
+        return True
+
+    except Exception as e:
+        logger.error(f"处理频道 '{channel_name}' 时出错: {e}")
+        return False
+
+def pick_lines(channel_name, lines, whitelist, hits=None, probe_results=None, top_k=None, per_host=PICK_PER_HOST):
+    """对一个频道的行（带换行符）做优选，返回保留的行；参数含义同 pick_sources_for_channel"""
+    picked_lines = []
+    candidates = []  # 打分模式的 (得分, 主机, 行)
+    total_lines = 0
+
+    for line in lines:
+        total_lines += 1
+        # 去除行尾换行符进行处理
+        line_content = line.rstrip('\n\r')
+        # 检查行是否为空
+        if not line_content:
+             continue
+
+        # 应用白名单筛选，记录命中的关键词
+        keyword = find_wanted(line_content, whitelist)
+        if keyword is not None and hits is not None:
+            hits[keyword] += 1
+        if top_k is None:
+            if keyword is not None:
+                logger.debug(f"频道 '{channel_name}' 白名单 '{keyword}' 保留: {line_content}")
+                picked_lines.append(line) # 保留原始换行符
+            continue
+
+        url = line_content.split(',', 1)[1].strip() if ',' in line_content else line_content
+        score = score_source(keyword is not None, (probe_results or {}).get(url))
+        if score is not None:
+            candidates.append((score, url_host(url), line))
+
+    if top_k is not None:
+        picked_lines = select_top_k(candidates, top_k, per_host)
+
+    logger.info(f"频道 '{channel_name}' 优选完成: 处理 {total_lines} 行，保留 {len(picked_lines)} 行。")
+    return picked_lines
+
+def score_source(whitelisted, probe_result):
+    """
+    计算一条源的得分，不应保留时返回 None：
+    白名单命中得 WHITELIST_WEIGHT；有探测结果时，可用的加分并按首字节时间、下载速率（或与声明码率之比）加分，
+    失败的扣 DEAD_PENALTY（白名单源仍保留，只排到后面）。未命中白名单的源只有探测可用时才保留。
+    """
+    if probe_result is None:
+        return WHITELIST_WEIGHT if whitelisted else None
+    if not probe_result.get('ok'):
+        return WHITELIST_WEIGHT - DEAD_PENALTY if whitelisted else None
+
+    score = (WHITELIST_WEIGHT if whitelisted else 0) + ALIVE_WEIGHT
+    ttfb = probe_result.get('ttfb_ms')
+    if ttfb is not None:
+        score += TTFB_WEIGHT * max(0.0, 1 - ttfb / TTFB_WORST_MS)
+    ratio = probe_result.get('bandwidth_ratio')
+    kbps = probe_result.get('throughput_kbps')
+    if ratio is not None:
+        score += THROUGHPUT_WEIGHT * min(ratio, 2) / 2
+    elif kbps is not None:
+        score += THROUGHPUT_WEIGHT * min(kbps / THROUGHPUT_GOOD_KBPS, 1)
+    return score
+
+def select_top_k(candidates, top_k=PICK_TOP_K, per_host=PICK_PER_HOST):
+    """
+    candidates 为 [(得分, 主机, 行)]，按得分从高到低（同分保持原顺序）取前 top_k 条，
+    同一主机最多 per_host 条。用堆只弹出需要的部分，不对全部候选排序。
+    """
+    heap = [(-score, i) for i, (score, _, _) in enumerate(candidates)]
+    heapq.heapify(heap)
+    picked = []
+    host_counts = Counter()
+    while heap and len(picked) < top_k:
+        _, i = heapq.heappop(heap)
+        _, host, line = candidates[i]
+        if per_host and host_counts[host] >= per_host:
+            continue
+        host_counts[host] += 1
+        picked.append(line)
+    return picked
+
+def load_channels_list(channels_path):
+    """从 channels.txt 加载频道列表"""
+    channels = []
+    if not os.path.exists(channels_path):
+        logger.error(f"频道列表文件 {channels_path} 未找到。")
+        return channels
+
+    try:
+        with open(channels_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                # 跳过空行和注释行
+                if line and (not line.startswith('#')) and (not (',#genre#' in line)) :
+                    channels.append(line)
+        logger.info(f"已从 {channels_path} 加载 {len(channels)} 个频道。")
+    except Exception as e:
+        logger.error(f"读取频道列表文件 {channels_path} 时出错: {e}")
+    return channels
+
+def main(score=False, top_k=PICK_TOP_K, per_host=PICK_PER_HOST, probe_file=PROBE_RESULTS_FILE):
+    """
+    模块5的入口函数。
+    score=True 时按得分为每个频道保留前 top_k 个源（同一主机最多 per_host 个），
+    有 probe_file 探测结果时结合首字节时间和下载速率打分。
+    没有要处理的频道或有频道处理出错时返回 False。
+    """
+    whitelist_file = os.path.join("config", "whitelist.txt")
+    #channels_list_file = os.path.join("config", "channels.txt")
+    channels_list_file = os.path.join("config", "user_demo.txt")
+    channels_output_dir = os.path.join("output", "channels")
+
+    logger.info("开始执行模块5：优选频道信号源")
+
+    # 1. 加载白名单
+    whitelist = load_whitelist(whitelist_file)
+    if not whitelist:
+        logger.warning("白名单为空，所有频道的信号源将被丢弃。")
+    # 2. 加载频道列表
+    channel_names = load_channels_list(channels_list_file)
+
+    if not channel_names:
+        logger.warning("没有有效的频道需要处理。")
+        return False
+
+    probe_results = None
+    if score:
+        probe_results = load_probe_results(probe_file)
+        logger.info(f"打分模式：每个频道保留 {top_k} 个源，同一主机最多 {per_host} 个，"
+                    f"探测结果 {len(probe_results)} 条")
+
+    # 3. 对每个频道执行优选
+    hits = Counter()
+    ok = True
+    for channel in channel_names:
+        ok &= pick_sources_for_channel(channel, whitelist, channels_output_dir, hits,
+                                       probe_results, top_k if score else None, per_host)
+    for keyword, count in hits.most_common(10):
+        logger.info(f"白名单 '{keyword}' 命中 {count} 行")
+
+    logger.info("模块5执行完毕。")
+    return ok
+
+# 如果直接运行此脚本，则执行 main 函数
+if __name__ == "__main__":
+
+    main()
+
+
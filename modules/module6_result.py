@@ -1,120 +1,178 @@
-# modules/module6_result.py
-
-import os
-import shutil
-import logging
-from datetime import datetime, timezone, timedelta
-
-# --- 配置日志 ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-def replace_user_channels(user_demo_path, channels_dir, output_path):
-    """
-    根据 user_demo.txt 中的频道名，替换为 channels 目录下对应文件的内容。
-    """
-    # 确保输出目录存在
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    if not os.path.exists(user_demo_path):
-        logger.error(f"用户模板文件 {user_demo_path} 未找到。")
-        return
-
-    # 1. 读取 user_demo.txt 的所有行
-    try:
-        with open(user_demo_path, 'r', encoding='utf-8') as f:
-            user_lines = f.readlines()
-    except Exception as e:
-        logger.error(f"读取用户模板文件 {user_demo_path} 时出错: {e}")
-        return
-
-    logger.info(f"读取到 {len(user_lines)} 行用户模板内容。")
-
-    # 2. 处理每一行
-    final_lines = []
-    final_lines.append("更新时间,#genre#\n")
-    # 获取当前东八区时间
-    utc_time = datetime.now(timezone.utc)
-    beijing_time = utc_time.astimezone(timezone(timedelta(hours=8)))
-
-    # 格式化输出
-    formatted_time = beijing_time.strftime("%Y/%m/%d-%H:%M")
-    result = f"{formatted_time},http://8.138.7.223/tv/shtv.php?id=xwzh\n"
-    final_lines.append(result)
-    replacements_made = 0
-    for i, line in enumerate(user_lines):
-        original_line = line
-        line = line.rstrip('\n\r') # 去掉行尾换行符，方便处理
-
-        # 跳过注释行和分类行
-        if line.startswith('#') or ',#genre#' in line:
-            final_lines.append(original_line) # 保留原始行（包括换行符）
-            continue
-
-        # 假设有效行是频道名，或者频道名在第一个逗号前
-        # 例如 "CCTV1" 或 "CCTV1,其他信息"
-        parts = line.split(',', 1)
-        channel_name = parts[0].strip()
-
-        if not channel_name:
-             # 如果频道名为空，也保留原行
-             final_lines.append(original_line)
-             continue
-
-        # 3. 查找对应的频道文件
-        channel_file_path = os.path.join(channels_dir, f"{channel_name}_picked.txt")
-        
-        if os.path.exists(channel_file_path):
-            try:
-                # 读取频道文件的全部内容
-                with open(channel_file_path, 'r', encoding='utf-8') as cf:
-                    channel_content = cf.read()
-                # 将频道文件的内容（通常包含换行符）添加到最终列表
-                # channel_content 末尾通常已有换行符，如果没有，可能需要添加
-                final_lines.append(channel_content)
-                replacements_made += 1
-                logger.debug(f"第 {i+1} 行 '{line}' 已替换为 '{channel_name}.txt' 的内容。")
-            except Exception as e:
-                logger.error(f"读取频道文件 {channel_file_path} 时出错: {e}")
-                # 如果读取出错，保留原行
-                final_lines.append(original_line)
-        else:
-            # 如果找不到对应的频道文件，保留原行
-            logger.debug(f"未找到频道文件 '{channel_name}.txt'，保留原行: {line}")
-            final_lines.append(original_line)
-
-    # 4. 写入最终结果
-    try:
-        # 写入到新的输出文件，保留原文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.writelines(final_lines)
-        logger.info(f"用户频道列表替换完成。共进行了 {replacements_made} 次替换。")
-        logger.info(f"最终结果已保存至 {output_path}")
-        
-        # --- 可选：如果你想直接覆写原文件 ---
-        # backup_path = user_demo_path + ".bak"
-        # shutil.copy2(user_demo_path, backup_path) # 创建备份
-        # logger.info(f"原文件已备份至 {backup_path}")
-        # with open(user_demo_path, 'w', encoding='utf-8') as f:
-        #     f.writelines(final_lines)
-        # logger.info(f"最终结果已直接覆写至 {user_demo_path}")
-
-    except Exception as e:
-        logger.error(f"写入最终文件 {output_path} 时出错: {e}")
-
-def main():
-    """模块6的入口函数"""
-    user_demo_file = os.path.join("config", "user_demo.txt")
-    channels_directory = os.path.join("output", "channels")
-    # 输出到新文件，避免覆盖原模板
-    output_file = os.path.join("output", "new_result.txt") 
-
-    logger.info("开始执行模块6：替换用户频道列表")
-    replace_user_channels(user_demo_file, channels_directory, output_file)
-    logger.info("模块6执行完毕。")
-
-# 如果直接运行此脚本，则执行 main 函数
-if __name__ == "__main__":
-
-    main()
-
+# modules/module6_result.py
+
+import os
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timezone, timedelta
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+UPDATE_TIME_HEADER = "更新时间,#genre#\n"
+
+def update_time_line():
+    """更新时间行：当前东八区时间"""
+    # 获取当前东八区时间
+    utc_time = datetime.now(timezone.utc)
+    beijing_time = utc_time.astimezone(timezone(timedelta(hours=8)))
+
+    # 格式化输出
+    formatted_time = beijing_time.strftime("%Y/%m/%d-%H:%M")
+    return f"{formatted_time},http://8.138.7.223/tv/shtv.php?id=xwzh\n"
+
+def read_result_lines(output_path):
+    """读取结果文件的各行（带换行符），文件不存在时返回 None"""
+    if not os.path.exists(output_path):
+        return None
+    with open(output_path, 'r', encoding='utf-8', newline='') as f:
+        return f.readlines()
+
+def result_digest(output_path):
+    """结果文件除更新时间行以外内容的 sha256，文件不存在时返回 None（供运行清单判断输出是否被改动）"""
+    lines = read_result_lines(output_path)
+    if lines is None:
+        return None
+    if lines[:1] == [UPDATE_TIME_HEADER]:
+        del lines[1:2]
+    return hashlib.sha256(''.join(lines).encode('utf-8')).hexdigest()
+
+def refresh_update_time(output_path):
+    """模块6因输入没有变化被跳过时，只把结果文件中的更新时间改为当前时间；成功时返回 True"""
+    try:
+        lines = read_result_lines(output_path)
+        if not lines or lines[0] != UPDATE_TIME_HEADER:
+            return False
+        lines[1:2] = [update_time_line()]
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        logger.error(f"更新 {output_path} 的更新时间时出错: {e}")
+        return False
+    logger.info(f"已更新 {output_path} 的更新时间")
+    return True
+
+def replace_user_channels(user_demo_path, channels_dir, output_path):
+    """
+    根据 user_demo.txt 中的频道名，替换为 channels 目录下对应文件的内容。
+    成功时返回 True，读取模板或写出结果出错时返回 False。
+    """
+    # 确保输出目录存在
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    if not os.path.exists(user_demo_path):
+        logger.error(f"用户模板文件 {user_demo_path} 未找到。")
+        return False
+
+    # 1. 读取 user_demo.txt 的所有行
+    try:
+        with open(user_demo_path, 'r', encoding='utf-8') as f:
+            user_lines = f.readlines()
+    except Exception as e:
+        logger.error(f"读取用户模板文件 {user_demo_path} 时出错: {e}")
+        return False
+
+    logger.info(f"读取到 {len(user_lines)} 行用户模板内容。")
+
+    def read_picked(channel_name):
+        # 3. 查找对应的频道文件
+        channel_file_path = os.path.join(channels_dir, f"{channel_name}_picked.txt")
+        if not os.path.exists(channel_file_path):
+            return None
+        # 读取频道文件的全部内容（读取出错时向上抛出，保留原行）
+        with open(channel_file_path, 'r', encoding='utf-8') as cf:
+            return cf.read()
+
+    final_lines = build_final_lines(user_lines, read_picked)
+
+    # 4. 写入最终结果
+    try:
+        # 写入到新的输出文件，保留原文件
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.writelines(final_lines)
+        logger.info(f"最终结果已保存至 {output_path}")
+        return True
+        
+        # --- 可选：如果你想直接覆写原文件 ---
+        # backup_path = user_demo_path + ".bak"
+        # shutil.copy2(user_demo_path, backup_path) # 创建备份
+        # logger.info(f"原文件已备份至 {backup_path}")
+        # with open(user_demo_path, 'w', encoding='utf-8') as f:
+        #     f.writelines(final_lines)
+        # logger.info(f"最终结果已直接覆写至 {user_demo_path}")
+
+    except Exception as e:
+        logger.error(f"写入最终文件 {output_path} 时出错: {e}")
+        return False
+
+def build_final_lines(user_lines, get_channel_content):
+    """
+    根据模板行生成最终结果：频道行替换为 get_channel_content(频道名) 返回的内容，
+    返回 None 时（没有该频道）或读取出错时保留原行。
+    """
+    # 2. 处理每一行
+    final_lines = []
+    final_lines.append(UPDATE_TIME_HEADER)
+    final_lines.append(update_time_line())
+    replacements_made = 0
+    for i, line in enumerate(user_lines):
+        original_line = line
+        line = line.rstrip('\n\r') # 去掉行尾换行符，方便处理
+
+        # 跳过注释行和分类行
+        if line.startswith('#') or ',#genre#' in line:
+            final_lines.append(original_line) # 保留原始行（包括换行符）
+            continue
+
+        # 假设有效行是频道名，或者频道名在第一个逗号前
+        # 例如 "CCTV1" 或 "CCTV1,其他信息"
+        parts = line.split(',', 1)
+        channel_name = parts[0].strip()
+
+        if not channel_name:
+             # 如果频道名为空，也保留原行
+             final_lines.append(original_line)
+             continue
+
+        try:
+            channel_content = get_channel_content(channel_name)
+        except Exception as e:
+            logger.error(f"读取频道 '{channel_name}' 的内容时出错: {e}")
+            # 如果读取出错，保留原行
+            final_lines.append(original_line)
+            continue
+
+        if channel_content is not None:
+            # 将频道文件的内容（通常包含换行符）添加到最终列表
+            # channel_content 末尾通常已有换行符，如果没有，可能需要添加
+            final_lines.append(channel_content)
+            replacements_made += 1
+            logger.debug(f"第 {i+1} 行 '{line}' 已替换为 '{channel_name}' 的内容。")
+        else:
+            # 如果找不到对应的频道文件，保留原行
+            logger.debug(f"未找到频道 '{channel_name}'，保留原行: {line}")
+            final_lines.append(original_line)
+
+    logger.info(f"用户频道列表替换完成。共进行了 {replacements_made} 次替换。")
+    return final_lines
+
+def main():
+    """模块6的入口函数，失败时返回 False"""
+    user_demo_file = os.path.join("config", "user_demo.txt")
+    channels_directory = os.path.join("output", "channels")
+    # 输出到新文件，避免覆盖原模板
+    output_file = os.path.join("output", "new_result.txt") 
+
+    logger.info("开始执行模块6：替换用户频道列表")
+    ok = replace_user_channels(user_demo_file, channels_directory, output_file)
+    logger.info("模块6执行完毕。")
+    return ok
+
+# 如果直接运行此脚本，则执行 main 函数
+if __name__ == "__main__":
+
+    main()
+
@@ -0,0 +1,153 @@
+# modules/pipeline.py
+# 进程内流水线：模块2~6 在内存中传递记录，不经过中间文件；
+# debug_output=True 时仍把各阶段结果写出到原来的位置，便于排查
+
+import os
+import csv
+import logging
+from collections import Counter
+
+try:
+    from modules import module2_combine, module3_clean, module4_split, module5_pick, module6_result
+    from modules.probe_cache import save_probe_results
+except ImportError:  # 直接运行本脚本时
+    import module2_combine, module3_clean, module4_split, module5_pick, module6_result
+    from probe_cache import save_probe_results
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIR = "output"
+CHANNELS_DIR = os.path.join(OUTPUT_DIR, "channels")
+RESULT_FILE = os.path.join(OUTPUT_DIR, "new_result.txt")
+
+def write_rows(path, rows):
+    """调试输出：把记录按 CSV 行写出（与各模块写出的格式相同）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with module2_combine.atomic_writer(path) as f:
+        csv.writer(f, lineterminator='\n').writerows(rows)
+
+def combine_stage(debug_output=False):
+    """模块2：返回 (全部源 [(name, url)], 网络源 [(name, url, extra)])，优先级与 combine_sources 相同"""
+    feeds = module2_combine.fetch_subscription_feeds()
+    all_seen = set()
+    all_records = [(name, url) for name, url, _ in
+                   module2_combine.iter_unique(module2_combine.iter_local_records(), all_seen)]
+    net_records = []
+    for name, url, extra, new_in_all in module2_combine.iter_net_records(feeds, all_seen):
+        net_records.append((name, url, extra))
+        if new_in_all:
+            all_records.append((name, url))
+    logger.info(f"网络源 {len(net_records)} 条，全部源 {len(all_records)} 条")
+    if debug_output:
+        write_rows(os.path.join(OUTPUT_DIR, "netsource.txt"), net_records)
+        write_rows(os.path.join(OUTPUT_DIR, "allsource.txt"), all_records)
+    return all_records, net_records
+
+def clean_stage(records, debug_output=False):
+    """模块3：去掉命中黑名单的记录"""
+    blacklist = module3_clean.load_blacklist(os.path.join("config", "blacklist.txt"))
+    hits = Counter()
+    cleaned = [record for record in records
+               if module3_clean.keep_line(f"{record[0]},{record[1]}", blacklist, hits)]
+    logger.info(f"清理完成: 总共 {len(records)} 条，保留 {len(cleaned)} 条，过滤掉 {len(records) - len(cleaned)} 条。")
+    module3_clean.log_keyword_hits(hits, "黑名单")
+    if debug_output:
+        write_rows(os.path.join(OUTPUT_DIR, "allsourcecleaned.txt"), cleaned)
+    return cleaned
+
+def split_stage(records, debug_output=False):
+    """模块4：返回 {频道: [URL, ...]}，只包含有记录的频道"""
+    channel_dict = module4_split.load_channel_dict(os.path.join("config", "othernames.txt"))
+    if channel_dict is None:
+        return {}
+    channels = {}
+    for channel, url in module4_split.iter_split(records, channel_dict, {}):
+        channels.setdefault(channel, []).append(url)
+    module4_split.report_split(channel_dict, {channel: len(urls) for channel, urls in channels.items()})
+    if debug_output:
+        for channel, urls in channels.items():
+            write_rows(os.path.join(CHANNELS_DIR, f"{channel}.txt"), ((channel, url) for url in urls))
+    return channels
+
+def probe_stage(channels, channel_names, deep=False, debug_output=False):
+    """探测阶段：探测 channel_names 中各频道的源，返回 {URL: 结果}"""
+    # 需要 aiohttp，只在探测时导入
+    try:
+        from modules import probe
+    except ImportError:  # 直接运行本脚本时
+        import probe
+    urls = {}
+    for channel in sorted(channel_names):
+        for url in channels.get(channel, ()):
+            urls.setdefault(url, []).append(channel)
+    if not urls:
+        logger.warning("没有需要探测的 URL。")
+        return {}
+    results = probe.run_probe(urls, deep=deep)
+    if debug_output:
+        save_probe_results(results)
+    return results
+
+def pick_stage(channels, channel_names, probe_results=None, top_k=None, per_host=module5_pick.PICK_PER_HOST,
+               debug_output=False):
+    """模块5：返回 {频道: [行, ...]}，只包含有记录的频道；top_k 为 None 时保留所有命中白名单的行"""
+    whitelist = module5_pick.load_whitelist(os.path.join("config", "whitelist.txt"))
+    if not whitelist:
+        logger.warning("白名单为空，所有频道的信号源将被丢弃。")
+    hits = Counter()
+    picked = {}
+    for channel in channel_names:
+        if channel not in channels:
+            continue
+        lines = [f"{channel},{url}\n" for url in channels[channel]]
+        picked[channel] = module5_pick.pick_lines(channel, lines, whitelist, hits, probe_results, top_k, per_host)
+        if debug_output:
+            with open(os.path.join(CHANNELS_DIR, f"{channel}_picked.txt"), 'w', encoding='utf-8') as f:
+                f.writelines(picked[channel])
+    module3_clean.log_keyword_hits(hits, "白名单")
+    return picked
+
+def result_stage(user_lines, picked, output_path=RESULT_FILE):
+    """模块6：用优选结果替换模板中的频道行并写出最终结果"""
+    final_lines = module6_result.build_final_lines(
+        user_lines, lambda channel: ''.join(picked[channel]) if channel in picked else None)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(final_lines)
+    logger.info(f"最终结果已保存至 {output_path}")
+
+def run_pipeline(debug_output=False, probe=False, deep=False, score=False, top_k=module5_pick.PICK_TOP_K,
+                 per_host=module5_pick.PICK_PER_HOST):
+    """
+    依次执行模块2~6（以及可选的探测阶段），只写出 output/new_result.txt；
+    debug_output=True 时另外写出 allsource.txt、channels/ 等中间文件。
+    模块1的输出 ownsource.txt 作为本地源读入。
+    """
+    user_demo_path = os.path.join("config", "user_demo.txt")
+    channel_names = module5_pick.load_channels_list(user_demo_path)
+    with open(user_demo_path, 'r', encoding='utf-8') as f:
+        user_lines = f.readlines()
+
+    logger.info("流水线：组合信号源")
+    all_records, _ = combine_stage(debug_output)
+    logger.info("流水线：清理信号源")
+    cleaned = clean_stage(all_records, debug_output)
+    del all_records
+    logger.info("流水线：拆分信号源")
+    channels = split_stage(cleaned, debug_output)
+    del cleaned
+
+    probe_results = None
+    if probe or deep:
+        logger.info("流水线：检测频道源可用性")
+        probe_results = probe_stage(channels, channel_names, deep, debug_output)
+
+    logger.info("流水线：优选频道信号源")
+    picked = pick_stage(channels, channel_names, probe_results, top_k if score else None, per_host, debug_output)
+    logger.info("流水线：替换用户频道列表")
+    result_stage(user_lines, picked)
+
+if __name__ == '__main__':
+    run_pipeline()
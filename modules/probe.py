@@ -0,0 +1,332 @@
+# modules/probe.py
+# 探测阶段：并发请求各频道源，记录是否可用、首字节时间、状态码和内容类型；
+# 深度探测时解析 HLS 播放列表并下载前几个分片，记录实际下载速率
+
+import os
+import re
+import time
+import glob
+import asyncio
+import logging
+from urllib.parse import urljoin
+
+import aiohttp
+
+try:
+    from modules.module5_pick import load_channels_list
+    from modules.probe_cache import ProbeCache, PROBE_CACHE_DB, PROBE_RESULTS_FILE, save_probe_results
+    from modules.circuit_breaker import get_breaker, url_host
+except ImportError:  # 直接运行本脚本时
+    from module5_pick import load_channels_list
+    from probe_cache import ProbeCache, PROBE_CACHE_DB, PROBE_RESULTS_FILE, save_probe_results
+    from circuit_breaker import get_breaker, url_host
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 同时进行的请求总数、单个主机的并发上限
+DEFAULT_CONCURRENCY = 200
+PER_HOST_LIMIT = 4
+# 单个请求的连接超时和总超时（秒），以及整个探测阶段的截止时间
+CONNECT_TIMEOUT = 3
+REQUEST_TIMEOUT = 6
+PROBE_DEADLINE = 600
+# 每个 URL 最多读取的字节数，用来确认确实有数据返回
+READ_BYTES = 2048
+PROBE_SCHEMES = ('http', 'https')
+# 深度探测：单个 URL 的总超时、下载的分片数、每个分片最多读取的字节数、播放列表最大字节数
+DEEP_TIMEOUT = 20
+DEEP_SEGMENTS = 2
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+PLAYLIST_MAX_BYTES = 256 * 1024
+BANDWIDTH_PATTERN = re.compile(r'[:,]BANDWIDTH=(\d+)')
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36'
+
+def collect_channel_urls(channels_dir, channel_names=None):
+    """
+    读取 channels 目录下各频道文件（不含 _picked），返回 {URL: [频道, ...]}。
+    传入 channel_names 时只收集这些频道。
+    """
+    urls = {}
+    if channel_names is None:
+        paths = [p for p in glob.glob(os.path.join(channels_dir, '*.txt')) if not p.endswith('_picked.txt')]
+    else:
+        paths = [os.path.join(channels_dir, f"{name}.txt") for name in channel_names]
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        channel = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if ',' not in line:
+                    continue
+                url = line.rstrip('\r\n').split(',', 1)[1].strip()
+                if url:
+                    urls.setdefault(url, []).append(channel)
+    return urls
+
+async def _fetch_head(session, url, result, limit=READ_BYTES):
+    """请求 URL 并读取最多 limit 字节，填写 result 中的基本字段；返回 (数据, 重定向后的 URL)"""
+    start = time.perf_counter()
+    async with session.get(url, allow_redirects=True, max_redirects=5) as response:
+        result['ttfb_ms'] = round((time.perf_counter() - start) * 1000)
+        result['status'] = response.status
+        result['content_type'] = response.headers.get('Content-Type')
+        if response.status >= 400:
+            result['ok'], result['error'] = False, f"HTTP {response.status}"
+            return b'', url
+        data = await response.content.read(limit)
+        result['bytes'] = len(data)
+        result['ok'] = len(data) > 0
+        if not data:
+            result['error'] = 'empty body'
+        return data, str(response.url)
+
+def parse_playlist(text, base_url):
+    """
+    解析 m3u8 文本，返回 (variants, segments)：
+    主播放列表得到 [(BANDWIDTH, 子播放列表 URL)]，媒体播放列表得到 [分片 URL]，相对地址按 base_url 补全。
+    """
+    variants, segments = [], []
+    bandwidth = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-STREAM-INF'):
+            match = BANDWIDTH_PATTERN.search(line)
+            bandwidth = int(match.group(1)) if match else 0
+        elif line.startswith('#'):
+            continue
+        elif bandwidth is not None:
+            variants.append((bandwidth, urljoin(base_url, line)))
+            bandwidth = None
+        else:
+            segments.append(urljoin(base_url, line))
+    return variants, segments
+
+async def _download(session, url, max_bytes=SEGMENT_MAX_BYTES):
+    """下载分片（最多 max_bytes 字节），返回 (字节数, 用时秒数)"""
+    start = time.perf_counter()
+    size = 0
+    async with session.get(url, allow_redirects=True, max_redirects=5) as response:
+        if response.status >= 400:
+            raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                              message=f"segment HTTP {response.status}")
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+    return size, time.perf_counter() - start
+
+async def _deep_probe(session, url, result, segments=DEEP_SEGMENTS):
+    """
+    HLS 深度探测：主播放列表取 BANDWIDTH 最高的子播放列表，媒体播放列表下载前 segments 个分片，
+    记录实际下载速率 throughput_kbps 以及与声明码率的比值 bandwidth_ratio。
+    不是 m3u8 的源只保留普通探测的结果。
+    """
+    data, final_url = await _fetch_head(session, url, result, PLAYLIST_MAX_BYTES)
+    if not data.lstrip().startswith(b'#EXTM3U'):
+        return
+    result['playlist'] = 'media'
+    declared = None
+    variants, segment_urls = parse_playlist(data.decode('utf-8', errors='replace'), final_url)
+    # 主播放列表最多向下解析两层
+    for _ in range(2):
+        if not variants:
+            break
+        result['playlist'] = 'master'
+        declared, variant_url = max(variants)
+        variant = {}
+        data, final_url = await _fetch_head(session, variant_url, variant, PLAYLIST_MAX_BYTES)
+        if not variant.get('ok'):
+            result['ok'], result['error'] = False, f"variant: {variant['error']}"
+            return
+        variants, segment_urls = parse_playlist(data.decode('utf-8', errors='replace'), final_url)
+    result['variant_bandwidth'] = declared or None
+    if not segment_urls:
+        result['ok'], result['error'] = False, 'no segments'
+        return
+
+    total_bytes, total_time = 0, 0.0
+    for segment_url in segment_urls[:segments]:
+        size, elapsed = await _download(session, segment_url)
+        total_bytes += size
+        total_time += elapsed
+    result['segments'] = min(segments, len(segment_urls))
+    result['segment_bytes'] = total_bytes
+    if total_bytes == 0:
+        result['ok'], result['error'] = False, 'empty segment'
+        return
+    kbps = total_bytes * 8 / max(total_time, 1e-6) / 1000
+    result['throughput_kbps'] = round(kbps)
+    if declared:
+        result['bandwidth_ratio'] = round(kbps * 1000 / declared, 2)
+
+def error_result(error=None):
+    return {'ok': False, 'status': None, 'ttfb_ms': None, 'content_type': None, 'bytes': 0,
+            'error': error, 'checked_at': int(time.time())}
+
+async def probe_url(session, url, timeout=REQUEST_TIMEOUT, deep=False):
+    """
+    请求单个 URL：记录状态码、首字节时间（毫秒）、内容类型和读到的字节数；
+    deep=True 时对 m3u8 做深度探测（超时为 DEEP_TIMEOUT）。
+    """
+    result = error_result()
+    if url.split('://', 1)[0].lower() not in PROBE_SCHEMES:
+        result['error'] = 'unsupported scheme'
+        return result
+    if deep:
+        result['deep'] = True
+    try:
+        if deep:
+            await asyncio.wait_for(_deep_probe(session, url, result), max(timeout, DEEP_TIMEOUT))
+        else:
+            await asyncio.wait_for(_fetch_head(session, url, result), timeout)
+    except aiohttp.ClientConnectorError as e:
+        result['ok'], result['error'] = False, f"connect: {e.os_error or e}"
+    except aiohttp.ConnectionTimeoutError:
+        result['ok'], result['error'] = False, 'connect: timeout'
+    except aiohttp.ClientOSError as e:
+        # 还没收到响应就被重置的连接同样算作连接失败
+        if result['status'] is None:
+            result['ok'], result['error'] = False, f"connect: {e}"
+        else:
+            result['ok'], result['error'] = False, f"{type(e).__name__}: {e}"
+    except asyncio.TimeoutError:
+        result['ok'], result['error'] = False, 'timeout'
+    except (aiohttp.ClientError, ValueError, OSError) as e:
+        result['ok'], result['error'] = False, f"{type(e).__name__}: {e}"
+    return result
+
+def skipped_result():
+    return dict(error_result('circuit open'), skipped=True)
+
+async def probe_urls_async(urls, concurrency=DEFAULT_CONCURRENCY, per_host=PER_HOST_LIMIT,
+                           timeout=REQUEST_TIMEOUT, deadline=PROBE_DEADLINE, deep=False, breaker=None):
+    """
+    并发探测 URL，返回 {URL: 结果}。先取得主机的并发名额再取得全局名额，
+    单个请求的超时从真正发出请求时开始计算，不包含排队时间。
+    主机熔断后（见 circuit_breaker）其余 URL 直接记为跳过。
+    超过 deadline 仍未完成的 URL 不出现在结果中。
+    """
+    breaker = get_breaker() if breaker is None else breaker
+    results = {}
+    global_slots = asyncio.Semaphore(concurrency)
+    host_slots = {}
+
+    # 很多源是自签名证书，探测时不校验证书
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300, ssl=False)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=timeout)
+    headers = {'User-Agent': USER_AGENT}
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=headers) as session:
+        async def worker(url):
+            host = url_host(url)
+            slots = host_slots.get(host)
+            if slots is None:
+                slots = host_slots[host] = asyncio.Semaphore(per_host)
+            async with slots:
+                if not breaker.allow(host):
+                    results[url] = skipped_result()
+                    return
+                async with global_slots:
+                    try:
+                        result = await probe_url(session, url, timeout, deep)
+                    except Exception as e:
+                        # probe_url 没有处理到的异常也记为失败，不让该 URL 从结果中消失
+                        logger.exception(f"探测 {url} 时发生未预期的错误")
+                        result = error_result(f"unexpected: {type(e).__name__}: {e}")
+            results[url] = result
+            if result['status'] is not None:
+                breaker.record_success(host)
+            elif result['error'] and result['error'].startswith('connect'):
+                breaker.record_failure(host, result['error'], 'probe')
+
+        tasks = [asyncio.create_task(worker(url)) for url in urls]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+            if pending:
+                logger.warning(f"探测超过 {deadline} 秒，剩余 {len(pending)} 个 URL 未探测")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+    return results
+
+def probe_urls(urls, concurrency=DEFAULT_CONCURRENCY, per_host=PER_HOST_LIMIT,
+               timeout=REQUEST_TIMEOUT, deadline=PROBE_DEADLINE, deep=False, breaker=None):
+    """probe_urls_async 的同步入口"""
+    return asyncio.run(probe_urls_async(urls, concurrency, per_host, timeout, deadline, deep, breaker))
+
+def report_probe_results(results, elapsed):
+    """输出可用率、首字节时间分位数和主要失败原因"""
+    ok = [r for r in results.values() if r['ok']]
+    skipped = sum(1 for r in results.values() if r.get('skipped'))
+    logger.info(f"探测 {len(results)} 个 URL 用时 {elapsed:.1f} 秒，可用 {len(ok)} 个，因主机熔断跳过 {skipped} 个")
+    ttfbs = sorted(r['ttfb_ms'] for r in ok)
+    if ttfbs:
+        p50 = ttfbs[len(ttfbs) // 2]
+        p90 = ttfbs[min(len(ttfbs) - 1, int(len(ttfbs) * 0.9))]
+        logger.info(f"首字节时间 p50 {p50} ms, p90 {p90} ms, 最大 {ttfbs[-1]} ms")
+    rates = sorted(r['throughput_kbps'] for r in ok if 'throughput_kbps' in r)
+    if rates:
+        slow = sum(1 for r in ok if r.get('bandwidth_ratio') is not None and r['bandwidth_ratio'] < 1)
+        logger.info(f"HLS 分片下载 {len(rates)} 个，速率中位数 {rates[len(rates) // 2]} kbps，"
+                    f"{slow} 个低于声明码率")
+    errors = {}
+    for r in results.values():
+        if not r['ok'] and not r.get('skipped'):
+            reason = r['error'].split(':', 1)[0] if r['error'] else 'unknown'
+            errors[reason] = errors.get(reason, 0) + 1
+    for reason, count in sorted(errors.items(), key=lambda item: -item[1])[:5]:
+        logger.info(f"失败原因 '{reason}': {count} 个")
+
+def main(channels_dir=os.path.join("output", "channels"), output_file=PROBE_RESULTS_FILE,
+         channels_list_file=os.path.join("config", "user_demo.txt"),
+         concurrency=DEFAULT_CONCURRENCY, per_host=PER_HOST_LIMIT, timeout=REQUEST_TIMEOUT, deadline=PROBE_DEADLINE,
+         deep=False, cache_file=PROBE_CACHE_DB):
+    """
+    探测阶段入口：只探测 user_demo.txt 中用到的频道；deep=True 时对 HLS 源下载分片测速。
+    缓存中未过期的结果直接复用，只探测新增或已过期的 URL；cache_file=None 时不使用缓存。
+    """
+    logger.info("开始执行探测阶段：检测频道源可用性")
+    channel_names = load_channels_list(channels_list_file) or None
+    urls = collect_channel_urls(channels_dir, channel_names)
+    if not urls:
+        logger.warning("没有需要探测的 URL。")
+        return {}
+    results = run_probe(urls, concurrency, per_host, timeout, deadline, deep, cache_file)
+    save_probe_results(results, output_file)
+    logger.info(f"探测结果已保存至 {output_file}")
+    return results
+
+def run_probe(urls, concurrency=DEFAULT_CONCURRENCY, per_host=PER_HOST_LIMIT, timeout=REQUEST_TIMEOUT,
+              deadline=PROBE_DEADLINE, deep=False, cache_file=PROBE_CACHE_DB):
+    """探测 urls（先查缓存），返回 {URL: 结果}；不写结果文件"""
+    logger.info(f"共 {len(urls)} 个 URL 待{'深度' if deep else ''}探测，并发 {concurrency}，单主机 {per_host}")
+
+    cache = ProbeCache(cache_file) if cache_file else None
+    try:
+        cached = cache.get_fresh(urls, deep=deep) if cache else {}
+        pending = [url for url in urls if url not in cached]
+        logger.info(f"缓存命中 {len(cached)} 个，需要探测 {len(pending)} 个")
+
+        probed = {}
+        if pending:
+            start = time.perf_counter()
+            probed = probe_urls(pending, concurrency, per_host, timeout, deadline, deep)
+            report_probe_results(probed, time.perf_counter() - start)
+        if cache:
+            cache.put_many(probed)
+            pruned = cache.prune()
+            if pruned:
+                logger.info(f"已从探测缓存中删除 {pruned} 个长期未出现的 URL")
+    finally:
+        if cache:
+            cache.close()
+
+    return {url: probed.get(url) or cached.get(url) for url in urls if url in probed or url in cached}
+
+if __name__ == '__main__':
+    main()
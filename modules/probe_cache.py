@@ -0,0 +1,152 @@
+# modules/probe_cache.py
+# 探测结果的持久化：本次结果文件 probe_results.json，以及按结果设置过期时间的 SQLite 缓存
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+
+try:
+    from modules.circuit_breaker import url_host
+except ImportError:  # 直接运行脚本时
+    from circuit_breaker import url_host
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROBE_RESULTS_FILE = os.path.join("output", "probe_results.json")
+PROBE_CACHE_DB = os.path.join("output", "cache", "probe.sqlite3")
+HOUR = 3600
+# 刚失败的 URL 下次运行就重新探测；连续失败时按 2 的幂延长，最长 FAIL_TTL_MAX
+FAIL_TTL = 6 * HOUR
+FAIL_TTL_MAX = 72 * HOUR
+# 可用的 URL 缓存一天；连续 STABLE_STREAK 次可用且首字节时间低于 FAST_TTFB_MS 的缓存三天
+OK_TTL = 24 * HOUR
+STABLE_TTL = 72 * HOUR
+STABLE_STREAK = 2
+FAST_TTFB_MS = 1000
+# 超过这么久没有再出现的 URL 从缓存中删除
+PRUNE_AFTER = 30 * 24 * HOUR
+# IN 查询每批的 URL 数（低于 SQLite 的变量个数上限）
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    deep INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    streak INTEGER NOT NULL,      -- >0 连续可用次数，<0 连续失败次数
+    result TEXT NOT NULL,         -- 探测结果 JSON
+    checked_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_probe_host ON probe(host);
+CREATE INDEX IF NOT EXISTS idx_probe_expires ON probe(expires_at);
+"""
+
+def load_probe_results(path=PROBE_RESULTS_FILE):
+    """读取探测结果 {URL: 结果}；文件不存在或损坏时返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('results', {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取探测结果 {path} 失败: {e}")
+        return {}
+
+def save_probe_results(results, path=PROBE_RESULTS_FILE):
+    """写出探测结果（先写临时文件再替换）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {'version': 1, 'generated_at': int(time.time()), 'results': results}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def next_streak(previous, ok):
+    """根据上一次的 streak 和本次结果计算新的 streak"""
+    if ok:
+        return previous + 1 if previous > 0 else 1
+    return previous - 1 if previous < 0 else -1
+
+def result_ttl(result, streak):
+    """按探测结果决定缓存时长（秒）"""
+    if not result.get('ok'):
+        return min(FAIL_TTL * 2 ** (-streak - 1), FAIL_TTL_MAX)
+    ttfb = result.get('ttfb_ms')
+    if streak >= STABLE_STREAK and ttfb is not None and ttfb < FAST_TTFB_MS:
+        return STABLE_TTL
+    return OK_TTL
+
+def jittered(url, ttl):
+    """按 URL 固定地把过期时间打散在 ±10% 内，避免大量条目在同一次运行中同时过期"""
+    return int(ttl * (0.9 + 0.2 * (zlib.crc32(url.encode('utf-8')) % 1000) / 1000))
+
+class ProbeCache:
+    """
+    以 URL 为主键的探测结果缓存，另按主机和过期时间建索引。
+    深度探测的结果可以替代普通探测；普通探测的结果不能满足深度探测的需要。
+    """
+
+    def __init__(self, path=PROBE_CACHE_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _select(self, columns, urls):
+        urls = list(urls)
+        for i in range(0, len(urls), QUERY_BATCH):
+            batch = urls[i:i + QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            yield from self.conn.execute(f"SELECT {columns} FROM probe WHERE url IN ({placeholders})", batch)
+
+    def get_fresh(self, urls, now=None, deep=False):
+        """返回 urls 中缓存未过期的结果 {URL: 结果}"""
+        now = int(time.time()) if now is None else now
+        fresh = {}
+        for url, entry_deep, result, expires_at in self._select('url, deep, result, expires_at', urls):
+            if expires_at > now and (entry_deep or not deep):
+                fresh[url] = json.loads(result)
+        return fresh
+
+    def put_many(self, results, now=None):
+        """写入本次探测结果，并按结果和历史 streak 计算过期时间；因熔断跳过的 URL 不写入"""
+        now = int(time.time()) if now is None else now
+        results = {url: result for url, result in results.items() if not result.get('skipped')}
+        streaks = dict(self._select('url, streak', results))
+        rows = []
+        for url, result in results.items():
+            ok = bool(result.get('ok'))
+            streak = next_streak(streaks.get(url, 0), ok)
+            expires_at = now + jittered(url, result_ttl(result, streak))
+            rows.append((url, url_host(url), int(bool(result.get('deep'))), int(ok), streak,
+                         json.dumps(result, ensure_ascii=False), result.get('checked_at', now), expires_at))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO probe (url, host, deep, ok, streak, result, checked_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def prune(self, now=None, older_than=PRUNE_AFTER):
+        """删除很久没有再探测过的条目，返回删除的条数"""
+        now = int(time.time()) if now is None else now
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM probe WHERE checked_at < ?", (now - older_than,)).rowcount
+        if deleted:
+            self.conn.execute("VACUUM")
+        return deleted
@@ -0,0 +1,99 @@
+# modules/run_manifest.py
+# 运行清单：记录每个阶段输入和输出的内容摘要，输入没有变化且输出文件未被改动时跳过该阶段
+
+import os
+import json
+import time
+import hashlib
+import logging
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = os.path.join("output", "cache", "run_manifest.json")
+CHUNK_SIZE = 1 << 20
+
+def file_digest(path):
+    """文件内容的 sha256，文件不存在时返回 None"""
+    if not os.path.isfile(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def files_digest(paths):
+    """{路径: 摘要}"""
+    return {path: file_digest(path) for path in paths}
+
+def dir_digest(directory, include=None):
+    """目录下（不含子目录）文件名和内容的整体摘要；include(文件名) 为 False 的文件不计入"""
+    if not os.path.isdir(directory):
+        return None
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or (include is not None and not include(name)):
+            continue
+        h.update(name.encode('utf-8') + b'\0' + file_digest(path).encode('ascii') + b'\n')
+    return h.hexdigest()
+
+def value_digest(value):
+    """可 JSON 序列化的值（如参数、下载到的订阅记录）的摘要"""
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+class RunManifest:
+    """
+    {阶段: {'inputs': {名称: 摘要}, 'outputs': {名称: 摘要}, 'finished_at': 时间戳}}。
+    输入摘要与上次相同、且输出文件仍是上次写出的内容时，阶段可以跳过并沿用上次的输出。
+    """
+
+    def __init__(self, path=MANIFEST_FILE, force=False):
+        self.path = path
+        self.force = force
+        self.stages = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stages = json.load(f).get('stages', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"运行清单 {path} 读取失败，所有阶段将重新执行: {e}")
+
+    def is_fresh(self, stage, inputs, outputs):
+        entry = self.stages.get(stage)
+        if self.force or entry is None or entry.get('inputs') != inputs:
+            return False
+        current = outputs()
+        return None not in current.values() and current == entry.get('outputs')
+
+    def record(self, stage, inputs, outputs):
+        self.stages[stage] = {'inputs': inputs, 'outputs': outputs, 'finished_at': int(time.time())}
+        self.save()
+
+    def forget(self, stage):
+        if self.stages.pop(stage, None) is not None:
+            self.save()
+
+    def run(self, stage, inputs, outputs, func):
+        """
+        inputs 为 {名称: 摘要}，outputs 为返回输出 {名称: 摘要} 的函数。
+        输入未变化时跳过并返回 None；否则执行 func()，func 返回 False 时视为失败，不记录。
+        """
+        if self.is_fresh(stage, inputs, outputs):
+            logger.info(f"阶段 {stage} 的输入没有变化，跳过并沿用上次的输出")
+            return None
+        result = func()
+        if result is False:
+            self.forget(stage)
+        else:
+            self.record(stage, inputs, outputs())
+        return result
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'stages': self.stages}, f, ensure_ascii=False, indent=1)
+        os.replace(self.path + '.tmp', self.path)
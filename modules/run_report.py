@@ -0,0 +1,145 @@
+# modules/run_report.py
+# 运行报告：记录每个阶段的耗时、CPU 时间、内存峰值和每秒处理的记录数，写出 output/run_report.json
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import tracemalloc
+
+try:
+    import resource  # Windows 上没有
+except ImportError:
+    resource = None
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RUN_REPORT_FILE = os.path.join("output", "run_report.json")
+PROFILE_DIR = os.path.join("output", "profile")
+CHUNK_SIZE = 1 << 20
+
+def peak_rss_kb():
+    """进程到目前为止的最大常驻内存（KB），无法获取时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位是字节，Linux 上是 KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def count_lines(paths):
+    """统计若干文件的行数之和（按字节块计数换行符，不解码），不存在的文件计 0"""
+    total = 0
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                total += chunk.count(b'\n')
+    return total
+
+def per_second(count, seconds):
+    if count is None or seconds <= 0:
+        return None
+    return round(count / seconds, 1)
+
+class RunReport:
+    """
+    按阶段记录：墙钟时间、CPU 时间（进程内所有线程）、常驻内存峰值及本阶段带来的增长、
+    tracemalloc 峰值（trace_memory=True 时）、输入/输出记录数及每秒记录数。
+    profile_stage 指定的阶段在 cProfile 下运行，结果写到 output/profile/<阶段>.prof。
+    """
+
+    def __init__(self, trace_memory=False, profile_stage=None):
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.stages = []
+        self.started_at = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __contains__(self, name):
+        return any(stage['name'] == name for stage in self.stages)
+
+    def skip(self, name):
+        """记录一个因输入未变化而跳过的阶段"""
+        self.stages.append({'name': name, 'status': 'skipped'})
+
+    def measure(self, name, func, records_in=None, records_out=None):
+        """
+        执行 func() 并记录本阶段的统计，返回 func 的返回值。
+        records_in / records_out 为返回记录数的函数，分别在执行前后调用。
+        """
+        stage = {'name': name, 'status': 'ok'}
+        count_in = records_in() if records_in else None
+        rss_before = peak_rss_kb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            if profiler is not None:
+                result = profiler.runcall(func)
+            else:
+                result = func()
+        except BaseException:
+            stage['status'] = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            stage['wall_s'] = round(wall, 3)
+            stage['cpu_s'] = round(time.process_time() - cpu_start, 3)
+            rss_after = peak_rss_kb()
+            stage['peak_rss_kb'] = rss_after
+            stage['peak_rss_growth_kb'] = rss_after - rss_before if rss_after is not None else None
+            if self.trace_memory:
+                stage['tracemalloc_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+            if profiler is not None:
+                stage['profile'] = self.dump_profile(name, profiler)
+            self.stages.append(stage)
+
+        count_out = records_out() if records_out else None
+        stage.update({
+            'records_in': count_in,
+            'records_out': count_out,
+            'records_in_per_s': per_second(count_in, wall),
+            'records_out_per_s': per_second(count_out, wall),
+        })
+        logger.info(f"阶段 {name}: 耗时 {stage['wall_s']}s，CPU {stage['cpu_s']}s，"
+                    f"内存峰值 {stage['peak_rss_kb']} KB，输入 {count_in} 条，输出 {count_out} 条")
+        return result
+
+    def dump_profile(self, name, profiler, top=20):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        profiler.dump_stats(path)
+        logger.info(f"阶段 {name} 的 cProfile 结果已保存至 {path}（按累计耗时前 {top} 项如下）")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+        return path
+
+    def to_dict(self):
+        return {
+            'version': 1,
+            'started_at': int(self.started_at),
+            'argv': sys.argv[1:],
+            'wall_s': round(time.perf_counter() - self.wall_start, 3),
+            'cpu_s': round(time.process_time() - self.cpu_start, 3),
+            'peak_rss_kb': peak_rss_kb(),
+            'tracemalloc': self.trace_memory,
+            'stages': self.stages,
+        }
+
+    def save(self, path=RUN_REPORT_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(path + '.tmp', path)
+        logger.info(f"运行报告已保存至 {path}")
@@ -0,0 +1,293 @@
+# modules/source_catalog.py
+# 源目录：以规范化 URL 为键的 SQLite 库，记录每个源的频道、来源、首次/最近出现时间和探测统计。
+# 每次运行增量更新（upsert），allsource.txt / netsource.txt 由查询本次运行出现的记录导出。
+#
+# 用法（在项目根目录运行）:
+#   python modules/source_catalog.py channel CCTV-1     # 某频道当前的源及探测统计
+#   python modules/source_catalog.py host 1.2.3.4:9901  # 某主机的全部源
+#   python modules/source_catalog.py stats              # 总体统计
+
+import os
+import csv
+import sys
+import time
+import sqlite3
+import logging
+
+try:
+    from modules.module2_combine import canonical_url, atomic_writer
+    from modules.module4_split import load_channel_dict, build_alias_index
+    from modules.circuit_breaker import url_host
+    from modules.binfmt import write_records, binary_path
+except ImportError:  # 直接运行本脚本时
+    from module2_combine import canonical_url, atomic_writer
+    from module4_split import load_channel_dict, build_alias_index
+    from circuit_breaker import url_host
+    from binfmt import write_records, binary_path
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CATALOG_DB = os.path.join("output", "cache", "sources.sqlite3")
+# 本地源的来源名，其余来源为订阅地址
+LOCAL_ORIGINS = ('user_result', 'localsource', 'ownsource')
+# 每批写入的行数
+WRITE_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at INTEGER NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS urls (
+    canonical_url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    probe_ok INTEGER,             -- 最近一次探测是否可用
+    probe_ttfb_ms INTEGER,
+    probe_throughput_kbps REAL,
+    probe_checked_at INTEGER,
+    probe_ok_count INTEGER NOT NULL DEFAULT 0,
+    probe_fail_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    canonical_url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,            -- 最近一次出现时的写法
+    channel TEXT,                 -- 按 othernames.txt 别名归入的频道，没有对应频道时为空
+    origin TEXT NOT NULL,         -- 最近一次出现时的来源：本地源文件名或订阅地址
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    position INTEGER NOT NULL,    -- 在最近一次运行中的顺序（与 allsource.txt 相同）
+    seen_runs INTEGER NOT NULL DEFAULT 1,
+    net_url TEXT,                 -- 在订阅源中首次出现时的写法（netsource.txt 中的写法）
+    extra TEXT,                   -- 同一条订阅源记录的 extra
+    net_run INTEGER,              -- 最近一次出现在订阅源中的运行
+    net_position INTEGER,         -- 在该次运行的订阅源记录中的顺序（与 netsource.txt 相同）
+    PRIMARY KEY (canonical_url, name)
+);
+CREATE INDEX IF NOT EXISTS idx_urls_host ON urls(host);
+CREATE INDEX IF NOT EXISTS idx_entries_channel ON entries(channel);
+CREATE INDEX IF NOT EXISTS idx_entries_run ON entries(last_run, position);
+"""
+# 旧版本建的库缺少的列，打开时补上
+ADDED_COLUMNS = [('entries', 'net_url', 'TEXT'), ('entries', 'extra', 'TEXT'),
+                 ('entries', 'net_run', 'INTEGER'), ('entries', 'net_position', 'INTEGER')]
+NET_INDEX = "CREATE INDEX IF NOT EXISTS idx_entries_net_run ON entries(net_run, net_position)"
+
+UPSERT_URL = """
+INSERT INTO urls (canonical_url, host, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT(canonical_url) DO UPDATE SET last_seen = excluded.last_seen
+"""
+UPSERT_ENTRY = """
+INSERT INTO entries (canonical_url, name, url, channel, origin, first_seen, last_seen, last_run, position)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(canonical_url, name) DO UPDATE SET
+    url = excluded.url, channel = excluded.channel, origin = excluded.origin,
+    last_seen = excluded.last_seen, last_run = excluded.last_run, position = excluded.position,
+    seen_runs = entries.seen_runs + 1
+"""
+UPDATE_NET = """
+UPDATE entries SET net_url = ?, extra = ?, net_run = ?, net_position = ? WHERE canonical_url = ? AND name = ?
+"""
+UPDATE_PROBE = """
+UPDATE urls SET probe_ok = ?, probe_ttfb_ms = ?, probe_throughput_kbps = ?, probe_checked_at = ?,
+    probe_ok_count = probe_ok_count + ?, probe_fail_count = probe_fail_count + ?
+WHERE canonical_url = ? AND (probe_checked_at IS NULL OR probe_checked_at < ?)
+"""
+
+class SourceCatalog:
+    """
+    urls 表以规范化 URL 为主键（主机、首次/最近出现时间、探测统计），
+    entries 表以 (规范化 URL, 频道名) 为主键（与模块2的去重键相同），记录频道和来源，
+    以及订阅源中的写法、extra 和顺序（netsource.txt 只包含订阅源的记录，与本地源无关）。
+    """
+
+    def __init__(self, path=CATALOG_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        with self.conn:
+            for table, column, column_type in ADDED_COLUMNS:
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            self.conn.execute(NET_INDEX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def last_run(self):
+        row = self.conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def update(self, records, channel_of=None, now=None):
+        """
+        records 为按优先级排列的 (name, url, extra, 来源)（module2_combine.iter_origin_records），
+        同一 (名称, 规范化 URL) 只取第一次出现的记录；订阅源的记录另外在订阅源之间去重，
+        记下首次出现时的写法、extra 和顺序（与模块2的 netsource.txt 相同）。
+        channel_of(名称) 返回频道或 None。返回本次运行的 run_id。
+        """
+        now = int(time.time()) if now is None else now
+        with self.conn:
+            run_id = self.conn.execute("INSERT INTO runs (started_at) VALUES (?)", (now,)).lastrowid
+        seen, net_seen = set(), set()
+        url_rows, entry_rows, net_rows = [], [], []
+        position = net_position = 0
+        for name, url, extra, origin in records:
+            canonical = canonical_url(url)
+            key = (canonical, name)
+            if key not in seen:
+                seen.add(key)
+                url_rows.append((canonical, url_host(url), now, now))
+                entry_rows.append((canonical, name, url, channel_of(name) if channel_of else None, origin,
+                                   now, now, run_id, position))
+                position += 1
+            if origin not in LOCAL_ORIGINS and key not in net_seen:
+                net_seen.add(key)
+                net_rows.append((url, extra, run_id, net_position, canonical, name))
+                net_position += 1
+            if len(entry_rows) + len(net_rows) >= WRITE_BATCH:
+                self._write(url_rows, entry_rows, net_rows)
+                url_rows, entry_rows, net_rows = [], [], []
+        self._write(url_rows, entry_rows, net_rows)
+        with self.conn:
+            self.conn.execute("UPDATE runs SET records = ? WHERE run_id = ?", (position, run_id))
+        new = self.conn.execute("SELECT COUNT(*) FROM entries WHERE first_seen = ? AND last_run = ?",
+                                (now, run_id)).fetchone()[0]
+        logger.info(f"源目录已更新: 本次 {position} 条，其中新出现 {new} 条")
+        return run_id
+
+    def _write(self, url_rows, entry_rows, net_rows):
+        # 订阅源记录所属的条目在同一批或更早的批次中写入，先写条目再更新订阅源字段
+        with self.conn:
+            self.conn.executemany(UPSERT_URL, url_rows)
+            self.conn.executemany(UPSERT_ENTRY, entry_rows)
+            self.conn.executemany(UPDATE_NET, net_rows)
+
+    def record_probe(self, results):
+        """
+        把探测结果 {URL: 结果} 计入 urls 表；因熔断跳过的 URL 不计入，
+        已经计入过的结果（来自探测缓存、checked_at 没有变化）不重复计数。
+        """
+        rows = []
+        for url, result in results.items():
+            if result.get('skipped'):
+                continue
+            ok = bool(result.get('ok'))
+            checked_at = result.get('checked_at', int(time.time()))
+            rows.append((int(ok), result.get('ttfb_ms'), result.get('throughput_kbps'), checked_at,
+                         int(ok), int(not ok), canonical_url(url), checked_at))
+        with self.conn:
+            self.conn.executemany(UPDATE_PROBE, rows)
+
+    def current_records(self, run_id=None, net_only=False):
+        """
+        某次运行（默认最近一次）出现的 (name, url)，顺序与 allsource.txt 相同；
+        net_only=True 时为该次运行订阅源中的 (name, url, extra)，写法和顺序与 netsource.txt 相同
+        """
+        run_id = self.last_run() if run_id is None else run_id
+        if net_only:
+            return self.conn.execute(
+                "SELECT name, net_url, extra FROM entries WHERE net_run = ? ORDER BY net_position", (run_id,))
+        return self.conn.execute("SELECT name, url FROM entries WHERE last_run = ? ORDER BY position", (run_id,))
+
+    def export(self, path, run_id=None, net_only=False):
+        """把本次运行的记录导出为文本（格式与模块2写出的相同），返回行数"""
+        count = 0
+        with atomic_writer(path) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            for row in self.current_records(run_id, net_only):
+                writer.writerow(row)
+                count += 1
+        logger.info(f"已从源目录导出 {count} 条到 {path}")
+        return count
+
+    def export_outputs(self, output_dir="output", binary=False):
+        """导出 allsource.txt（binary=True 时另有 allsource.bin）和 netsource.txt，代替模块2的写出"""
+        all_path = os.path.join(output_dir, "allsource.txt")
+        self.export(all_path)
+        self.export(os.path.join(output_dir, "netsource.txt"), net_only=True)
+        if binary:
+            write_records(binary_path(all_path), self.current_records())
+        return True
+
+    def channel_sources(self, channel, current_only=True):
+        """某频道的源（含探测统计），当前可用的在前"""
+        sql = """
+            SELECT e.name, e.url, e.origin, e.first_seen, e.last_seen, u.probe_ok, u.probe_ttfb_ms,
+                   u.probe_ok_count, u.probe_fail_count
+            FROM entries e JOIN urls u ON u.canonical_url = e.canonical_url
+            WHERE e.channel = ?"""
+        params = [channel]
+        if current_only:
+            sql += " AND e.last_run = ?"
+            params.append(self.last_run())
+        sql += " ORDER BY u.probe_ok DESC, u.probe_ttfb_ms, e.first_seen"
+        return self.conn.execute(sql, params).fetchall()
+
+    def host_sources(self, host):
+        """某主机（主机:端口）的全部源"""
+        return self.conn.execute("""
+            SELECT e.channel, e.name, e.url, e.origin, e.first_seen, e.last_seen, u.probe_ok
+            FROM urls u JOIN entries e ON e.canonical_url = u.canonical_url
+            WHERE u.host = ? ORDER BY e.channel, e.first_seen""", (host.lower(),)).fetchall()
+
+    def stats(self):
+        run_id = self.last_run()
+
+        def query(sql, *params):
+            return self.conn.execute(sql, params).fetchone()[0]
+
+        return {
+            'runs': query("SELECT COUNT(*) FROM runs"),
+            'urls': query("SELECT COUNT(*) FROM urls"),
+            'entries': query("SELECT COUNT(*) FROM entries"),
+            'current_entries': query("SELECT COUNT(*) FROM entries WHERE last_run = ?", run_id),
+            'hosts': query("SELECT COUNT(DISTINCT host) FROM urls"),
+            'probed_ok': query("SELECT COUNT(*) FROM urls WHERE probe_ok = 1"),
+        }
+
+def load_channel_lookup(othernames_path=os.path.join("config", "othernames.txt")):
+    """返回 channel_of(名称)：按 othernames.txt 的别名查频道（属于多个频道时取第一个），查不到返回 None"""
+    alias_channels = build_alias_index(load_channel_dict(othernames_path) or {})
+    return lambda name: alias_channels[name][0] if name in alias_channels else None
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ('channel', 'host', 'stats') or (argv[0] != 'stats' and len(argv) < 2):
+        print("用法: python modules/source_catalog.py channel 频道名 | host 主机[:端口] | stats")
+        return
+    with SourceCatalog() as catalog:
+        if argv[0] == 'stats':
+            for key, value in catalog.stats().items():
+                print(f"{key}: {value}")
+        elif argv[0] == 'channel':
+            for name, url, origin, first_seen, last_seen, ok, ttfb, ok_count, fail_count in catalog.channel_sources(argv[1]):
+                status = '-' if ok is None else ('OK' if ok else '失败')
+                print(f"{status:<4} {ttfb if ttfb is not None else '-':>6} {ok_count}/{ok_count + fail_count:<4} "
+                      f"{format_time(first_seen)} {name},{url}  [{origin}]")
+        else:
+            for channel, name, url, origin, first_seen, last_seen, ok in catalog.host_sources(argv[1]):
+                print(f"{channel or '-'}  {name},{url}  [{origin}] {format_time(first_seen)} ~ {format_time(last_seen)}")
+
+if __name__ == '__main__':
+    main()
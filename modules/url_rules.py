@@ -0,0 +1,160 @@
+# modules/url_rules.py
+# 黑名单/白名单规则的 主机 + 路径前缀 索引
+
+import os
+import re
+import logging
+
+try:
+    from modules.keyword_matcher import KeywordMatcher, load_keywords
+except ImportError:  # 直接运行脚本时
+    from keyword_matcher import KeywordMatcher, load_keywords
+
+# --- 配置日志 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 规则中的主机部分：域名或 IPv4（可带 :端口），前导 . 表示只匹配子域名
+HOST_RULE_PATTERN = re.compile(r'^(\.)?((?:[a-z0-9-]+\.)+[a-z0-9-]+)(?::(\d+))?$')
+IPV4_PATTERN = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+# 只有以这些顶级域名结尾（或是完整 IPv4）的规则才按主机解析，
+# 否则像 fjtv.php、live.ts 这样的文件名会被误当成主机
+KNOWN_TLDS = frozenset('''
+    com net org info biz edu gov top xyz cc tv site club vip fun work ltd app buzz online live shop
+    store tech cloud icu link pro me io co cn hk tw mo jp kr us uk de fr ru hu nl eu in sg my th vn
+    ph id au ca br it es pl se ch at be cz ua tr ir za ar mx nz la kh mm
+'''.split())
+# URL 拆分：[用户信息@]主机[:端口] 以及主机之后的部分
+URL_PATTERN = re.compile(r'^[a-z][a-z0-9+.-]*://(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]*)(?::(\d*))?([/?#].*)?$', re.S)
+# 前缀树中标记规则结束的键
+_END = None
+
+def parse_rule(rule):
+    """
+    解析规则：
+    - 主机[:端口]/路径 形式返回 ('path', 主机, 端口, 只匹配子域名, 路径前缀)
+    - 只有主机[:端口] 的返回 ('host', 主机[:端口])，在 URL 的主机部分中做子串匹配
+    - 其它规则（如 .ctv、tvbus://、/audio/、fjtv.php，以及 ukzy.ukubf 这类
+      不以已知顶级域名结尾的不完整主机名）返回 None，仍在整行中做子串匹配
+    """
+    rest = rule.split('://', 1)[1] if '://' in rule else rule
+    cut = min((i for i in (rest.find('/'), rest.find('?')) if i != -1), default=len(rest))
+    host_part, path = rest[:cut], rest[cut:]
+    match = HOST_RULE_PATTERN.match(host_part)
+    if not match:
+        return None
+    subdomain_only, host, port = match.group(1) is not None, match.group(2), match.group(3) or ''
+    # 单个标签的后缀（如 .fm、.ctv）含义不明确，仍按子串匹配
+    if subdomain_only and '.' not in host:
+        return None
+    if not IPV4_PATTERN.match(host) and host.rsplit('.', 1)[-1] not in KNOWN_TLDS:
+        return None
+    if not path:
+        return ('host', host_part)
+    return ('path', host, port, subdomain_only, path)
+
+def split_url(url):
+    """把小写 URL 拆成 (主机, 端口, 主机之后的部分)，无法解析时返回 None"""
+    match = URL_PATTERN.match(url)
+    if match is None:
+        return None
+    host, port, tail = match.groups()
+    return host, port or '', tail or ''
+
+class UrlRuleIndex:
+    """
+    以 (主机, 端口) 为键、路径前缀树为值的规则索引。
+    每个 URL 只解析一次主机，再只检查该主机（及其上级域名）下的规则；
+    无法解析为主机规则的关键词仍由 KeywordMatcher 在整行中做子串匹配。
+    search() 与 KeywordMatcher 接口一致，返回命中的规则。
+    """
+
+    def __init__(self, rules):
+        self.rules = sorted({rule.lower() for rule in rules if rule})
+        self.tries = {}  # (主机, 端口, 只匹配子域名) -> 路径前缀树
+        self.trie_hosts = set()
+        host_rules = {}  # 主机[:端口] -> 规则
+        keywords = []
+        for rule in self.rules:
+            parsed = parse_rule(rule)
+            if parsed is None:
+                keywords.append(rule)
+            elif parsed[0] == 'host':
+                host_rules.setdefault(parsed[1], rule)
+            else:
+                _, host, port, subdomain_only, path = parsed
+                self.trie_hosts.add(host)
+                node = self.tries.setdefault((host, port, subdomain_only), {})
+                for ch in path:
+                    node = node.setdefault(ch, {})
+                node.setdefault(_END, rule)
+        self.host_rules = host_rules
+        self.host_matcher = KeywordMatcher(host_rules)
+        self.fallback = KeywordMatcher(keywords)
+        self.host_rule_count = len(self.rules) - len(keywords)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def _walk(self, key, tail):
+        node = self.tries.get(key)
+        if node is None:
+            return None
+        for ch in tail:
+            if _END in node:
+                break
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node.get(_END)
+
+    def search_url(self, url):
+        """按主机索引查找 URL 命中的规则"""
+        parts = split_url(url.lower())
+        if parts is None:
+            return None
+        host, port, tail = parts
+        if self.host_rules:
+            hit = self.host_matcher.search(f"{host}:{port}" if port else host)
+            if hit is not None:
+                return self.host_rules[hit]
+        if host in self.trie_hosts:
+            rule = self._walk((host, port, False), tail)
+            if rule is not None:
+                return rule
+        # 域名再依次检查上级域名，IP 只检查自身
+        if IPV4_PATTERN.match(host):
+            return None
+        i = host.find('.')
+        while i != -1:
+            suffix = host[i + 1:]
+            if suffix in self.trie_hosts:
+                rule = self._walk((suffix, port, False), tail) or self._walk((suffix, port, True), tail)
+                if rule is not None:
+                    return rule
+            i = host.find('.', i + 1)
+        return None
+
+    def search(self, line):
+        """line 为 "频道名,URL" 或单独的 URL；返回命中的规则，没有命中返回 None"""
+        url = line.split(',', 1)[1] if ',' in line else line
+        rule = self.search_url(url) if self.tries or self.host_rules else None
+        if rule is None:
+            rule = self.fallback.search(line)
+        return rule
+
+_index_cache = {}
+
+def load_rules(path):
+    """按文件构建规则索引，文件未修改时复用；文件不存在时抛出 FileNotFoundError"""
+    mtime = os.path.getmtime(path)
+    cached = _index_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    index = UrlRuleIndex(load_keywords(path))
+    logger.debug(f"{path}: {index.host_rule_count} 条主机规则，{len(index) - index.host_rule_count} 条关键词规则")
+    _index_cache[path] = (mtime, index)
+    return index
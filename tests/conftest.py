@@ -0,0 +1,9 @@
+# tests/conftest.py
+# 让测试可以 from modules import ...（在项目根目录运行 python -m pytest）
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
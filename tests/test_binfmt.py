@@ -0,0 +1,42 @@
+# tests/test_binfmt.py
+
+from modules.binfmt import RecordFile, RecordWriter, binary_path, is_binary_file, write_records
+
+RECORDS = [('CCTV-1', 'http://a.cn/1'), ('CCTV-2', 'http://b.cn/2'), ('CCTV-1', 'http://c.cn/中文')]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'allsource.bin')
+    assert write_records(path, RECORDS) == 3
+    assert is_binary_file(path)
+    with RecordFile(path) as records:
+        assert len(records) == 3
+        assert list(records) == RECORDS
+        assert records.names == ['CCTV-1', 'CCTV-2']
+        assert list(records.iter_rows({1})) == [RECORDS[1]]
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.bin')
+    assert write_records(path, []) == 0
+    with RecordFile(path) as records:
+        assert list(records) == []
+
+
+def test_truncate_matches_writing_fewer_records(tmp_path):
+    writer = RecordWriter(str(tmp_path / 'a.bin'))
+    writer.add(*RECORDS[0])
+    mark = writer.mark()
+    writer.add(*RECORDS[1])
+    writer.add('新频道', 'http://d.cn/4')
+    writer.truncate(mark)
+    writer.close()
+    write_records(str(tmp_path / 'b.bin'), RECORDS[:1])
+    assert (tmp_path / 'a.bin').read_bytes() == (tmp_path / 'b.bin').read_bytes()
+
+
+def test_not_a_record_file(tmp_path):
+    path = tmp_path / 'allsource.txt'
+    path.write_text('CCTV-1,http://a.cn/1\n', encoding='utf-8')
+    assert not is_binary_file(str(path))
+    assert binary_path(str(path)).endswith('allsource.bin')
@@ -0,0 +1,33 @@
+# tests/test_circuit_breaker.py
+
+import json
+
+from modules.circuit_breaker import HostCircuitBreaker, url_host
+
+
+def test_url_host():
+    assert url_host('http://Example.COM:8080/a') == 'example.com:8080'
+    assert url_host('not a url') == ''
+
+
+def test_opens_after_threshold_and_counts_skips(tmp_path):
+    breaker = HostCircuitBreaker(threshold=3)
+    assert not breaker.record_failure('a:80', 'connect', 'probe')
+    assert not breaker.record_failure('a:80', 'connect', 'probe')
+    assert breaker.record_failure('a:80', 'connect', 'probe')
+    assert not breaker.allow('a:80')
+    assert not breaker.allow('a:80')
+    assert breaker.allow('b:80')
+    assert breaker.report()['a:80']['skipped'] == 2
+
+    path = tmp_path / 'circuit_report.json'
+    breaker.save_report(str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['hosts']['a:80']['failures'] == 3
+
+
+def test_success_resets_consecutive_failures():
+    breaker = HostCircuitBreaker(threshold=2)
+    breaker.record_failure('a:80', 'connect', 'fetch')
+    breaker.record_success('a:80')
+    assert not breaker.record_failure('a:80', 'connect', 'fetch')
+    assert breaker.allow('a:80')
@@ -0,0 +1,15 @@
+# tests/test_probe.py
+# 用 benchmarks/check_probe.py 的本地替身服务器检查探测阶段（不需要外网）
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+check_probe = pytest.importorskip('check_probe')
+
+
+def test_probe_against_stand_in_server():
+    assert asyncio.run(check_probe.run_checks())
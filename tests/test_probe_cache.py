@@ -0,0 +1,45 @@
+# tests/test_probe_cache.py
+
+from modules.probe_cache import (ProbeCache, FAIL_TTL, FAIL_TTL_MAX, OK_TTL, STABLE_TTL, next_streak,
+                                 result_ttl, load_probe_results, save_probe_results)
+
+NOW = 1_700_000_000
+
+
+def test_ttl_policy():
+    assert next_streak(0, True) == 1 and next_streak(2, True) == 3 and next_streak(2, False) == -1
+    assert result_ttl({'ok': False}, -1) == FAIL_TTL
+    assert result_ttl({'ok': False}, -2) == 2 * FAIL_TTL
+    assert result_ttl({'ok': False}, -20) == FAIL_TTL_MAX
+    assert result_ttl({'ok': True, 'ttfb_ms': 200}, 1) == OK_TTL
+    assert result_ttl({'ok': True, 'ttfb_ms': 200}, 2) == STABLE_TTL
+    assert result_ttl({'ok': True, 'ttfb_ms': 5000}, 5) == OK_TTL
+
+
+def test_fresh_results_and_expiry(tmp_path):
+    with ProbeCache(str(tmp_path / 'probe.sqlite3')) as cache:
+        cache.put_many({
+            'http://a.cn/ok': {'ok': True, 'ttfb_ms': 100},
+            'http://a.cn/dead': {'ok': False},
+            'http://b.cn/skipped': {'ok': False, 'skipped': True},
+        }, now=NOW)
+        urls = ['http://a.cn/ok', 'http://a.cn/dead', 'http://b.cn/skipped']
+        assert set(cache.get_fresh(urls, now=NOW + 60)) == {'http://a.cn/ok', 'http://a.cn/dead'}
+        # 失败结果比可用结果先过期
+        assert set(cache.get_fresh(urls, now=NOW + FAIL_TTL * 2)) == {'http://a.cn/ok'}
+        assert cache.get_fresh(urls, now=NOW + OK_TTL * 2) == {}
+
+
+def test_normal_result_does_not_satisfy_deep_probe(tmp_path):
+    with ProbeCache(str(tmp_path / 'probe.sqlite3')) as cache:
+        cache.put_many({'http://a.cn/1': {'ok': True}, 'http://a.cn/2': {'ok': True, 'deep': True}}, now=NOW)
+        urls = ['http://a.cn/1', 'http://a.cn/2']
+        assert set(cache.get_fresh(urls, now=NOW, deep=True)) == {'http://a.cn/2'}
+        assert set(cache.get_fresh(urls, now=NOW)) == set(urls)
+
+
+def test_results_file_round_trip(tmp_path):
+    path = str(tmp_path / 'probe_results.json')
+    assert load_probe_results(path) == {}
+    save_probe_results({'http://a.cn/1': {'ok': True}}, path)
+    assert load_probe_results(path) == {'http://a.cn/1': {'ok': True}}
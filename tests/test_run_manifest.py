@@ -0,0 +1,59 @@
+# tests/test_run_manifest.py
+
+from modules.run_manifest import RunManifest, files_digest, value_digest
+
+
+def make_stage(output):
+    calls = []
+
+    def func(result=None):
+        calls.append(1)
+        output.write_text(f"run {len(calls)}", encoding='utf-8')
+        return result
+
+    return calls, func
+
+
+def test_skips_when_inputs_and_outputs_unchanged(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    output = tmp_path / 'out.txt'
+    calls, func = make_stage(output)
+    inputs = {'params': value_digest({'a': 1})}
+    outputs = lambda: files_digest([str(output)])
+
+    RunManifest(path).run('stage', inputs, outputs, func)
+    RunManifest(path).run('stage', inputs, outputs, func)
+    assert len(calls) == 1
+
+    # 输入变化、输出被改动、--force 时都重新执行
+    RunManifest(path).run('stage', {'params': value_digest({'a': 2})}, outputs, func)
+    assert len(calls) == 2
+    output.write_text('edited', encoding='utf-8')
+    RunManifest(path).run('stage', {'params': value_digest({'a': 2})}, outputs, func)
+    assert len(calls) == 3
+    RunManifest(path, force=True).run('stage', {'params': value_digest({'a': 2})}, outputs, func)
+    assert len(calls) == 4
+
+
+def test_failed_stage_is_not_recorded(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    output = tmp_path / 'out.txt'
+    calls, func = make_stage(output)
+    outputs = lambda: files_digest([str(output)])
+
+    RunManifest(path).run('stage', {}, outputs, func)
+    RunManifest(path).run('stage', {'x': '1'}, outputs, lambda: func(False))
+    RunManifest(path).run('stage', {'x': '1'}, outputs, func)
+    assert len(calls) == 3
+    assert 'stage' in RunManifest(path).stages
+
+
+def test_missing_output_reruns(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    output = tmp_path / 'out.txt'
+    calls, func = make_stage(output)
+    outputs = lambda: files_digest([str(output)])
+    RunManifest(path).run('stage', {}, outputs, func)
+    output.unlink()
+    RunManifest(path).run('stage', {}, outputs, func)
+    assert len(calls) == 2
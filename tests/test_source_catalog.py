@@ -0,0 +1,75 @@
+# tests/test_source_catalog.py
+
+import os
+
+import pytest
+
+from modules import module2_combine
+from modules.source_catalog import SourceCatalog
+
+FEED_URLS = ['http://feed-a/list.txt', 'http://feed-b/list.txt']
+FEEDS = [
+    [['CCTV1', 'http://a.cn/1', 'x'], ['CCTV2', 'http://a.cn/2', ''], ['CCTV1', 'http://A.cn:80/1', 'dup']],
+    [['CCTV2', 'http://a.cn/2', 'again'], ['CCTV3', 'http://b.cn/3', 'y'], ['CCTV4', 'http://b.cn/4', '']],
+]
+# 与订阅源重叠的本地源：同一个流的不同写法、订阅源中也有的记录和只在本地的记录
+LOCAL = "CCTV1,HTTP://a.cn/1\nCCTV3,http://b.cn/3\n本地,http://local.cn/1\n"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / 'config')
+    os.makedirs(tmp_path / 'output')
+    (tmp_path / 'config' / 'user_result.txt').write_text(LOCAL, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_export_matches_module2(workdir):
+    assert not module2_combine.combine_sources(feeds=[list(feed) for feed in FEEDS])
+    expected = {name: read(os.path.join('output', name)) for name in ('allsource.txt', 'netsource.txt')}
+
+    for name in expected:
+        os.remove(os.path.join('output', name))
+    with SourceCatalog(os.path.join('output', 'cache', 'sources.sqlite3')) as catalog:
+        catalog.update(module2_combine.iter_origin_records(FEEDS, FEED_URLS))
+        assert catalog.export_outputs()
+
+    for name, content in expected.items():
+        assert read(os.path.join('output', name)) == content, name
+    # netsource.txt 包含本地源里也有的订阅源记录，并保留 extra 列
+    assert expected['netsource.txt'].decode('utf-8').splitlines() == [
+        'CCTV1,http://a.cn/1,x', 'CCTV2,http://a.cn/2,', 'CCTV3,http://b.cn/3,y', 'CCTV4,http://b.cn/4,']
+
+
+def test_only_current_run_is_exported(workdir):
+    path = os.path.join('output', 'cache', 'sources.sqlite3')
+    with SourceCatalog(path) as catalog:
+        catalog.update(module2_combine.iter_origin_records(FEEDS, FEED_URLS), now=100)
+        os.remove(os.path.join('config', 'user_result.txt'))
+        catalog.update(module2_combine.iter_origin_records([FEEDS[1], []], FEED_URLS), now=200)
+        assert list(catalog.current_records()) == [('CCTV2', 'http://a.cn/2'), ('CCTV3', 'http://b.cn/3'),
+                                                   ('CCTV4', 'http://b.cn/4')]
+        assert [row[0] for row in catalog.current_records(net_only=True)] == ['CCTV2', 'CCTV3', 'CCTV4']
+        stats = catalog.stats()
+    assert stats['runs'] == 2
+    assert stats['entries'] == 5
+    assert stats['current_entries'] == 3
+
+
+def test_probe_statistics(workdir):
+    with SourceCatalog(os.path.join('output', 'cache', 'sources.sqlite3')) as catalog:
+        catalog.update(module2_combine.iter_origin_records(FEEDS, FEED_URLS), lambda name: name)
+        catalog.record_probe({'http://a.cn/1': {'ok': True, 'ttfb_ms': 120, 'checked_at': 10},
+                              'http://b.cn/3': {'ok': False, 'checked_at': 10},
+                              'http://b.cn/4': {'ok': False, 'skipped': True}})
+        # 同一个结果（来自探测缓存）不重复计数
+        catalog.record_probe({'http://a.cn/1': {'ok': True, 'ttfb_ms': 120, 'checked_at': 10}})
+        rows = {row[1]: row for row in catalog.channel_sources('CCTV1') + catalog.channel_sources('CCTV3')}
+    assert rows['HTTP://a.cn/1'][5:] == (1, 120, 1, 0)
+    assert rows['http://b.cn/3'][5:] == (0, None, 0, 1)
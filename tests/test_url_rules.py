@@ -0,0 +1,63 @@
+# tests/test_url_rules.py
+
+from modules.url_rules import UrlRuleIndex, parse_rule
+from modules.keyword_matcher import KeywordMatcher
+
+
+def test_parse_rule_kinds():
+    assert parse_rule('example.com') == ('host', 'example.com')
+    assert parse_rule('1.2.3.4:8080') == ('host', '1.2.3.4:8080')
+    assert parse_rule('example.com:81/live') == ('path', 'example.com', '81', False, '/live')
+    assert parse_rule('.cnr.cn/live') == ('path', 'cnr.cn', '', True, '/live')
+    # 文件名、不完整的主机名、单标签后缀、协议和路径片段都按整行关键词匹配
+    for rule in ('fjtv.php', 'live.ts', 'ukzy.ukubf', '.ctv', 'tvbus://', '/audio/', '1.2.3'):
+        assert parse_rule(rule) is None, rule
+
+
+def test_host_only_rules_match():
+    index = UrlRuleIndex(['example.com'])
+    assert index.search('x,http://example.com/a') == 'example.com'
+    assert index.search('x,http://cdn.example.com:8080/a') == 'example.com'
+    assert index.search('x,http://other.org/a') is None
+
+
+def test_host_rule_ignores_channel_name_and_query():
+    index = UrlRuleIndex(['example.com', 'example.com/live'])
+    assert index.search('example.com,http://a.cn/') is None
+    assert index.search('x,http://a.cn/play?u=http://example.com/live') is None
+
+
+def test_file_name_rule_matches_anywhere():
+    index = UrlRuleIndex(['fjtv.php', 'example.com/live'])
+    assert index.search('x,http://a.b/fjtv.php?id=1') == 'fjtv.php'
+    assert UrlRuleIndex(['fjtv.php']).search('x,http://a.b/fjtv.php?id=1') == 'fjtv.php'
+
+
+def test_partial_host_rule_matches_as_keyword():
+    assert UrlRuleIndex(['ukzy.ukubf']).search('x,http://ukzy.ukubf.cn/a.m3u8') == 'ukzy.ukubf'
+
+
+def test_path_prefix_rules():
+    index = UrlRuleIndex(['example.com/live', '.cnr.cn/hls', '1.2.3.4:9901/tsfile'])
+    assert index.search('x,http://example.com/live/1.m3u8') == 'example.com/live'
+    assert index.search('x,http://www.example.com/live/1.m3u8') == 'example.com/live'
+    assert index.search('x,http://example.com/vod/1.m3u8') is None
+    # 前导 . 只匹配子域名
+    assert index.search('x,http://ngcdn.cnr.cn/hls/a.m3u8') == '.cnr.cn/hls'
+    assert index.search('x,http://cnr.cn/hls/a.m3u8') is None
+    # 端口必须一致
+    assert index.search('x,http://1.2.3.4:9901/tsfile/live/1.m3u8') == '1.2.3.4:9901/tsfile'
+    assert index.search('x,http://1.2.3.4:9902/tsfile/live/1.m3u8') is None
+
+
+def test_same_hits_as_substring_matching():
+    rules = ['example.com', 'example.com/live', 'fjtv.php', '.ctv', 'tvbus://', '/audio/', 'ukzy.ukubf',
+             '1.2.3.4:9901']
+    lines = [
+        'a,http://example.com/x', 'b,http://www.example.com/live/1', 'c,http://a.b/fjtv.php?id=1',
+        'd,http://a.ctv/1', 'e,tvbus://abc', 'f,http://a.cn/audio/1', 'g,http://ukzy.ukubf.cn/1',
+        'h,http://1.2.3.4:9901/x', 'i,http://other.cn/1', 'j,http://1.2.3.4:9902/x',
+    ]
+    index, matcher = UrlRuleIndex(rules), KeywordMatcher(rules)
+    for line in lines:
+        assert (index.search(line) is None) == (matcher.search(line) is None), line